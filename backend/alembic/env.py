@@ -1,5 +1,6 @@
 import asyncio
 import os
+import re
 from logging.config import fileConfig
 
 from sqlalchemy import pool
@@ -28,6 +29,18 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# Partitions of partitioned tables are not modelled. Daily partitions are created and dropped by
+# componentsdb.maintenance and the default partition is created by a migration. All are excluded
+# from autogeneration.
+PARTITION_TABLE_NAME_PATTERN = re.compile(r"^federated_user_credential_uses_(p[0-9]{8}|default)$")
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return PARTITION_TABLE_NAME_PATTERN.match(name) is None
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -50,6 +63,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -59,7 +73,9 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection, target_metadata=target_metadata, include_name=include_name
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,138 @@
+"""add_default_credential_use_partition
+
+Revision ID: 27d458a15fa6
+Revises: 5effabd52f67
+Create Date: 2026-10-19 18:31:52.240917
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "27d458a15fa6"
+down_revision: Union[str, None] = "5effabd52f67"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Uses are written to the default partition if no partition exists for their day, for example
+    # if partitions have not been created for some time, rather than failing to be inserted.
+    op.execute(
+        """
+        CREATE TABLE federated_user_credential_uses_default
+        PARTITION OF federated_user_credential_uses DEFAULT
+        """
+    )
+
+    # Create one partition per UTC day in the half-open range [from_date, to_date). Partitions
+    # which already exist are left alone. Returns the number of partitions created.
+    #
+    # Concurrent callers are serialised by an advisory lock so that each partition is created
+    # once. Postgres refuses to create a partition while the default partition holds rows which
+    # belong in it and so any such rows are moved into the new partition before it is attached.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION create_federated_user_credential_uses_partitions(
+            from_date date, to_date date
+        ) RETURNS integer AS $$
+            DECLARE
+                partition_date date := from_date;
+                partition_name text;
+                partition_start timestamp with time zone;
+                partition_end timestamp with time zone;
+                created_count integer := 0;
+            BEGIN
+                PERFORM pg_advisory_xact_lock(
+                    hashtext('create_federated_user_credential_uses_partitions')
+                );
+                WHILE partition_date < to_date LOOP
+                    partition_name := format(
+                        'federated_user_credential_uses_p%s',
+                        to_char(partition_date, 'YYYYMMDD')
+                    );
+                    IF to_regclass(partition_name) IS NULL THEN
+                        partition_start := partition_date::timestamp AT TIME ZONE 'UTC';
+                        partition_end := (partition_date + 1)::timestamp AT TIME ZONE 'UTC';
+                        LOCK TABLE federated_user_credential_uses_default
+                            IN ACCESS EXCLUSIVE MODE;
+                        EXECUTE format(
+                            'CREATE TABLE %I '
+                            '(LIKE federated_user_credential_uses INCLUDING DEFAULTS)',
+                            partition_name
+                        );
+                        EXECUTE format(
+                            'WITH moved AS ('
+                            '  DELETE FROM federated_user_credential_uses_default'
+                            '  WHERE created_at >= %L AND created_at < %L RETURNING *'
+                            ') INSERT INTO %I SELECT * FROM moved',
+                            partition_start,
+                            partition_end,
+                            partition_name
+                        );
+                        EXECUTE format(
+                            'ALTER TABLE federated_user_credential_uses '
+                            'ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                            partition_name,
+                            partition_start,
+                            partition_end
+                        );
+                        created_count := created_count + 1;
+                    END IF;
+                    partition_date := partition_date + 1;
+                END LOOP;
+                RETURN created_count;
+            END
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+
+def downgrade() -> None:
+    # Move any uses in the default partition into daily partitions of their own before it is
+    # dropped.
+    op.execute(
+        """
+        SELECT create_federated_user_credential_uses_partitions(
+            (min(created_at) AT TIME ZONE 'UTC')::date,
+            (max(created_at) AT TIME ZONE 'UTC')::date + 1
+        )
+        FROM federated_user_credential_uses_default
+        HAVING count(*) > 0
+        """
+    )
+    op.execute("DROP TABLE federated_user_credential_uses_default")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION create_federated_user_credential_uses_partitions(
+            from_date date, to_date date
+        ) RETURNS integer AS $$
+            DECLARE
+                partition_date date := from_date;
+                partition_name text;
+                created_count integer := 0;
+            BEGIN
+                WHILE partition_date < to_date LOOP
+                    partition_name := format(
+                        'federated_user_credential_uses_p%s',
+                        to_char(partition_date, 'YYYYMMDD')
+                    );
+                    IF to_regclass(partition_name) IS NULL THEN
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF federated_user_credential_uses '
+                            'FOR VALUES FROM (%L) TO (%L)',
+                            partition_name,
+                            partition_date::timestamp AT TIME ZONE 'UTC',
+                            (partition_date + 1)::timestamp AT TIME ZONE 'UTC'
+                        );
+                        created_count := created_count + 1;
+                    END IF;
+                    partition_date := partition_date + 1;
+                END LOOP;
+                RETURN created_count;
+            END
+        $$ LANGUAGE plpgsql;
+        """
+    )
@@ -0,0 +1,51 @@
+"""remember_jtis_without_expiry
+
+Revision ID: 5effabd52f67
+Revises: 5f3a8e2c7b16
+Create Date: 2026-10-19 18:02:13.518406
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5effabd52f67"
+down_revision: Union[str, None] = "5f3a8e2c7b16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Credentials without an "exp" claim never expire and so their jti is remembered forever.
+    op.alter_column(
+        "federated_user_credential_jtis",
+        "expires_at",
+        existing_type=sa.DateTime(timezone=True),
+        nullable=True,
+    )
+
+    # Uses of credentials without an "exp" claim which have not yet been dropped with their
+    # partition were not carried over when the table was created.
+    op.execute(
+        """
+        INSERT INTO federated_user_credential_jtis (issuer, jti, expires_at)
+        SELECT claims->>'iss', claims->>'jti', NULL
+        FROM federated_user_credential_uses
+        WHERE claims ? 'iss' AND claims ? 'jti' AND NOT claims ? 'exp'
+        ON CONFLICT (issuer, jti) DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM federated_user_credential_jtis WHERE expires_at IS NULL")
+    op.alter_column(
+        "federated_user_credential_jtis",
+        "expires_at",
+        existing_type=sa.DateTime(timezone=True),
+        nullable=False,
+    )
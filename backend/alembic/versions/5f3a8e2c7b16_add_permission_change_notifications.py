@@ -0,0 +1,90 @@
+"""add_permission_change_notifications
+
+Revision ID: 5f3a8e2c7b16
+Revises: 2b7e5c1d9a40
+Create Date: 2026-10-19 17:21:47.093318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f3a8e2c7b16"
+down_revision: Union[str, None] = "2b7e5c1d9a40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match componentsdb.rbac.PERMISSION_CHANGE_CHANNEL.
+_CHANNEL = "componentsdb_permission_changes"
+
+# Trigger events along with the transition tables available for them.
+_TRIGGER_EVENTS = {
+    "insert": "NEW TABLE AS new_rows",
+    "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "delete": "OLD TABLE AS old_rows",
+}
+
+
+def upgrade() -> None:
+    # Publish the ids of users whose effective permissions changed so that processes caching them
+    # can discard stale permissions. Notifications are only delivered once the change is committed
+    # and duplicates within a transaction are collapsed. Large changes, such as a rebuild, publish
+    # "*" rather than flooding the notification queue.
+    op.execute(
+        f"""
+        CREATE FUNCTION user_effective_permissions_changed() RETURNS trigger AS $$
+        DECLARE
+            changed_user_ids bigint[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                changed_user_ids := ARRAY(SELECT DISTINCT user_id FROM new_rows);
+            ELSIF TG_OP = 'UPDATE' THEN
+                changed_user_ids := ARRAY(
+                    SELECT user_id FROM old_rows UNION SELECT user_id FROM new_rows
+                );
+            ELSIF TG_OP = 'DELETE' THEN
+                changed_user_ids := ARRAY(SELECT DISTINCT user_id FROM old_rows);
+            END IF;
+            IF changed_user_ids IS NULL OR cardinality(changed_user_ids) > 100 THEN
+                PERFORM pg_notify('{_CHANNEL}', '*');
+            ELSE
+                PERFORM pg_notify('{_CHANNEL}', user_id::text)
+                FROM unnest(changed_user_ids) AS user_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    for event, referencing in _TRIGGER_EVENTS.items():
+        op.execute(
+            f"""
+            CREATE TRIGGER user_effective_permissions_{event}_notify_trigger
+                AFTER {event.upper()} ON user_effective_permissions
+                REFERENCING {referencing}
+                FOR EACH STATEMENT EXECUTE PROCEDURE user_effective_permissions_changed()
+            ;
+            """
+        )
+    op.execute(
+        """
+        CREATE TRIGGER user_effective_permissions_truncate_notify_trigger
+            AFTER TRUNCATE ON user_effective_permissions
+            FOR EACH STATEMENT EXECUTE PROCEDURE user_effective_permissions_changed()
+        ;
+        """
+    )
+
+
+def downgrade() -> None:
+    for event in list(_TRIGGER_EVENTS) + ["truncate"]:
+        op.execute(
+            f"""
+            DROP TRIGGER user_effective_permissions_{event}_notify_trigger
+                ON user_effective_permissions
+            ;
+            """
+        )
+    op.execute("DROP FUNCTION user_effective_permissions_changed()")
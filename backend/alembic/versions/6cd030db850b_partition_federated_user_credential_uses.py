@@ -0,0 +1,217 @@
+"""partition_federated_user_credential_uses
+
+Revision ID: 6cd030db850b
+Revises: 109f4991cac4
+Create Date: 2026-10-19 15:12:40.118245
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6cd030db850b"
+down_revision: Union[str, None] = "109f4991cac4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Number of days of partitions to create ahead of time. The maintenance sweep keeps creating
+# partitions ahead of time once the application is running.
+PARTITIONS_AHEAD_DAYS = 14
+
+
+def upgrade() -> None:
+    # Create one partition per UTC day in the half-open range [from_date, to_date). Partitions
+    # which already exist are left alone. Returns the number of partitions created.
+    op.execute(
+        """
+        CREATE FUNCTION create_federated_user_credential_uses_partitions(
+            from_date date, to_date date
+        ) RETURNS integer AS $$
+            DECLARE
+                partition_date date := from_date;
+                partition_name text;
+                created_count integer := 0;
+            BEGIN
+                WHILE partition_date < to_date LOOP
+                    partition_name := format(
+                        'federated_user_credential_uses_p%s',
+                        to_char(partition_date, 'YYYYMMDD')
+                    );
+                    IF to_regclass(partition_name) IS NULL THEN
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF federated_user_credential_uses '
+                            'FOR VALUES FROM (%L) TO (%L)',
+                            partition_name,
+                            partition_date::timestamp AT TIME ZONE 'UTC',
+                            (partition_date + 1)::timestamp AT TIME ZONE 'UTC'
+                        );
+                        created_count := created_count + 1;
+                    END IF;
+                    partition_date := partition_date + 1;
+                END LOOP;
+                RETURN created_count;
+            END
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+    op.execute(
+        "ALTER TABLE federated_user_credential_uses RENAME TO federated_user_credential_uses_old"
+    )
+    op.execute(
+        """
+        ALTER INDEX idx_federated_user_credential_uses_claims
+        RENAME TO idx_federated_user_credential_uses_old_claims
+        """
+    )
+    op.execute(
+        """
+        ALTER INDEX idx_federated_user_credential_uses_created_at
+        RENAME TO idx_federated_user_credential_uses_old_created_at
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE federated_user_credential_uses_old
+        RENAME CONSTRAINT federated_user_credential_uses_pkey
+        TO federated_user_credential_uses_old_pkey
+        """
+    )
+
+    op.execute(
+        """
+        CREATE TABLE federated_user_credential_uses (
+            id BIGINT NOT NULL DEFAULT nextval('federated_user_credential_uses_id_seq'),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            claims JSONB NOT NULL DEFAULT json_build_object(),
+            CONSTRAINT federated_user_credential_uses_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute(
+        """
+        ALTER SEQUENCE federated_user_credential_uses_id_seq
+        OWNED BY federated_user_credential_uses.id
+        """
+    )
+
+    # Create partitions for all existing uses and for the days ahead before copying existing uses
+    # into the partitioned table.
+    op.execute(
+        f"""
+        SELECT create_federated_user_credential_uses_partitions(
+            (
+                LEAST(
+                    (SELECT min(created_at) FROM federated_user_credential_uses_old),
+                    now()
+                ) AT TIME ZONE 'UTC'
+            )::date,
+            ((now() AT TIME ZONE 'UTC') + interval '{PARTITIONS_AHEAD_DAYS} days')::date
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO federated_user_credential_uses (id, created_at, updated_at, claims)
+        SELECT id, created_at, updated_at, claims FROM federated_user_credential_uses_old
+        """
+    )
+    op.execute("DROP TABLE federated_user_credential_uses_old")
+
+    op.create_index(
+        "idx_federated_user_credential_uses_claims",
+        "federated_user_credential_uses",
+        ["claims"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "idx_federated_user_credential_uses_created_at",
+        "federated_user_credential_uses",
+        ["created_at"],
+        unique=False,
+    )
+    op.execute(
+        """
+        CREATE TRIGGER update_federated_user_credential_uses_updated_at_trigger
+            BEFORE UPDATE ON federated_user_credential_uses
+            FOR EACH ROW EXECUTE PROCEDURE update_updated_at_col()
+        ;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "ALTER TABLE federated_user_credential_uses RENAME TO federated_user_credential_uses_old"
+    )
+    op.execute(
+        """
+        ALTER TABLE federated_user_credential_uses_old
+        RENAME CONSTRAINT federated_user_credential_uses_pkey
+        TO federated_user_credential_uses_old_pkey
+        """
+    )
+    op.execute(
+        """
+        ALTER INDEX idx_federated_user_credential_uses_claims
+        RENAME TO idx_federated_user_credential_uses_old_claims
+        """
+    )
+    op.execute(
+        """
+        ALTER INDEX idx_federated_user_credential_uses_created_at
+        RENAME TO idx_federated_user_credential_uses_old_created_at
+        """
+    )
+    op.execute(
+        """
+        CREATE TABLE federated_user_credential_uses (
+            claims JSONB NOT NULL DEFAULT json_build_object(),
+            id BIGINT NOT NULL DEFAULT nextval('federated_user_credential_uses_id_seq'),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT federated_user_credential_uses_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(
+        """
+        ALTER SEQUENCE federated_user_credential_uses_id_seq
+        OWNED BY federated_user_credential_uses.id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO federated_user_credential_uses (id, created_at, updated_at, claims)
+        SELECT id, created_at, updated_at, claims FROM federated_user_credential_uses_old
+        """
+    )
+    # Dropping the partitioned table drops all of its partitions.
+    op.execute("DROP TABLE federated_user_credential_uses_old")
+    op.execute("DROP FUNCTION create_federated_user_credential_uses_partitions(date, date)")
+
+    op.create_index(
+        "idx_federated_user_credential_uses_claims",
+        "federated_user_credential_uses",
+        ["claims"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "idx_federated_user_credential_uses_created_at",
+        "federated_user_credential_uses",
+        ["created_at"],
+        unique=False,
+    )
+    op.execute(
+        """
+        CREATE TRIGGER update_federated_user_credential_uses_updated_at_trigger
+            BEFORE UPDATE ON federated_user_credential_uses
+            FOR EACH ROW EXECUTE PROCEDURE update_updated_at_col()
+        ;
+        """
+    )
@@ -31,7 +31,7 @@ def upgrade() -> None:
 def downgrade() -> None:
     op.execute(
         """
-            DROP TRIGGER update_userg_role_bindings_updated_at_trigger
-            ON userg_role_bindings;
+            DROP TRIGGER update_user_role_bindings_updated_at_trigger
+            ON user_role_bindings;
         """
     )
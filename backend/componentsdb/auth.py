@@ -3,25 +3,43 @@ The componentsdb.auth module provides logic for signing up new users and authent
 ones.
 """
 
+import asyncio
 import dataclasses
 import secrets
+import uuid
 from collections.abc import Mapping
-from datetime import timedelta
+from datetime import UTC, datetime, timedelta
 from typing import Any, Optional
 
 import sqlalchemy as sa
+import structlog
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import raiseload
+from sqlalchemy.orm import aliased, raiseload
 from sqlalchemy.sql.expression import bindparam
 
 from .db.models import (
     AccessToken,
     FederatedUserCredential,
+    FederatedUserCredentialJti,
     FederatedUserCredentialUse,
     RefreshToken,
     User,
 )
-from .federatedidentity import AsyncOIDCTokenIssuer, FederatedIdentityError
+from .federatedidentity import (
+    AsyncOIDCTokenIssuer,
+    CircuitBreaker,
+    FederatedIdentityError,
+    KeySetSnapshotStore,
+    TokenValidationCache,
+    VerificationExecutor,
+    circuitbreaker,
+    oidc,
+    tokencache,
+)
+from .federatedidentity.transport import AsyncRequestBase
+
+LOG = structlog.get_logger()
 
 
 @dataclasses.dataclass
@@ -30,6 +48,74 @@ class FederatedIdentityProvider:
     audience: str
 
 
+class FederatedIdentityIssuerRegistry:
+    """
+    Process-wide registry of issuers for federated identity providers. Issuers retain their
+    fetched key sets and so sharing a registry between requests means that issuer key sets are
+    fetched once per process rather than once per request.
+
+    Args:
+        federated_identity_providers: mapping from provider name to federated identity provider.
+        request: HTTP transport used by all issuers to fetch key sets. Defaults to the issuers'
+            default transport.
+        verification_executor: executor shared by all issuers on which token signatures are
+            verified. If omitted, signatures are verified on the event loop.
+        token_cache_max_size: maximum number of validation results cached by each issuer.
+        token_cache_rejected_ttl: time in seconds for which each issuer remembers rejected tokens.
+        snapshot_store: store shared by all issuers in which fetched key sets are saved so that
+            they are available immediately when the process next starts.
+        fetch_timeout: time in seconds allowed for each issuer to fetch its OIDC discovery
+            document and key set.
+        circuit_breaker_failure_threshold: number of consecutive failed fetches after which an
+            issuer stops contacting its identity provider for a backoff period.
+    """
+
+    issuers: Mapping[str, AsyncOIDCTokenIssuer]
+    verification_executor: Optional[VerificationExecutor]
+
+    def __init__(
+        self,
+        federated_identity_providers: Mapping[str, FederatedIdentityProvider],
+        request: Optional[AsyncRequestBase] = None,
+        verification_executor: Optional[VerificationExecutor] = None,
+        token_cache_max_size: int = tokencache.DEFAULT_MAX_SIZE,
+        token_cache_rejected_ttl: float = tokencache.DEFAULT_REJECTED_TTL,
+        snapshot_store: Optional[KeySetSnapshotStore] = None,
+        fetch_timeout: float = oidc.DEFAULT_FETCH_TIMEOUT,
+        circuit_breaker_failure_threshold: int = circuitbreaker.DEFAULT_FAILURE_THRESHOLD,
+    ):
+        self.verification_executor = verification_executor
+        self.issuers = {
+            k: AsyncOIDCTokenIssuer(
+                issuer=v.issuer,
+                audience=v.audience,
+                request=request,
+                verification_executor=verification_executor,
+                token_cache=TokenValidationCache(
+                    max_size=token_cache_max_size, rejected_ttl=token_cache_rejected_ttl
+                ),
+                snapshot_store=snapshot_store,
+                fetch_timeout=fetch_timeout,
+                circuit_breaker=CircuitBreaker(
+                    failure_threshold=circuit_breaker_failure_threshold
+                ),
+            )
+            for k, v in federated_identity_providers.items()
+        }
+
+    async def prepare_all(self) -> None:
+        """
+        Prepare all issuers concurrently. Failures are logged but otherwise ignored since
+        preparation will be re-attempted when an issuer is next used.
+        """
+        results = await asyncio.gather(
+            *(issuer.prepare() for issuer in self.issuers.values()), return_exceptions=True
+        )
+        for name, result in zip(self.issuers.keys(), results):
+            if isinstance(result, Exception):
+                LOG.warning("Error preparing federated identity issuer", name=name, error=result)
+
+
 @dataclasses.dataclass
 class UserCredentials:
     user: User
@@ -47,7 +133,9 @@ class AuthenticationProvider:
         db_session: the database session to use to perform all operations
         federated_identity_providers: list of federated identity providers to use for federated
             credential authentication. The .prepare() method will be called on each provider prior
-            to use.
+            to use. Ignored if issuer_registry is passed.
+        issuer_registry: registry of issuers to use for federated credential authentication. If
+            omitted, a registry is created from federated_identity_providers.
         access_token_lifetime: the lifetime of access tokens generated for users
         refresh_token_lifetime: the lifetime of refresh tokens generated for users
     """
@@ -66,17 +154,16 @@ class AuthenticationProvider:
         federated_identity_providers: Optional[Mapping[str, FederatedIdentityProvider]] = None,
         access_token_lifetime: int = DEFAULT_ACCESS_TOKEN_LIFETIME,
         refresh_token_lifetime: int = DEFAULT_REFRESH_TOKEN_LIFETIME,
+        issuer_registry: Optional[FederatedIdentityIssuerRegistry] = None,
     ):
-        federated_identity_providers = (
-            federated_identity_providers if federated_identity_providers is not None else dict()
-        )
+        if issuer_registry is None:
+            issuer_registry = FederatedIdentityIssuerRegistry(
+                federated_identity_providers if federated_identity_providers is not None else {}
+            )
         self.db_session = db_session
         self.access_token_lifetime = access_token_lifetime
         self.refresh_token_lifetime = refresh_token_lifetime
-        self.federated_identity_providers = {
-            k: AsyncOIDCTokenIssuer(issuer=v.issuer, audience=v.audience)
-            for k, v in federated_identity_providers.items()
-        }
+        self.federated_identity_providers = issuer_registry.issuers
 
     async def create_user_from_federated_credential(
         self, provider: str, credential: str
@@ -97,12 +184,12 @@ class AuthenticationProvider:
             InvalidProvider: the selected provider does not exist
             UserAlreadySignedUp: the user was already signed up
         """
-        user, claims = await self._query_user_from_federated_credential(provider, credential)
+        claims = await self._validate_federated_credential(provider, credential)
+        user, _ = await self._query_user_from_federated_credential(claims)
         if user is not None:
             raise UserAlreadySignedUp("user already registered with that identity")
 
-        new_user = await self._create_user_for_federated_credential_claims(claims)
-        return await self.create_user_credentials(new_user)
+        return await self._create_user_for_federated_credential_claims(claims)
 
     async def user_credentials_from_federated_credential(
         self, provider: str, credential: str
@@ -124,11 +211,15 @@ class AuthenticationProvider:
             InvalidProvider: the selected provider does not exist
             NoSuchUser: no user matching the federated identity provider credentials was found
         """
-        user, _ = await self._query_user_from_federated_credential(provider, credential)
+        claims = await self._validate_federated_credential(provider, credential)
+        user, credentials = await self._query_user_from_federated_credential(
+            claims, issue_credentials=True
+        )
         if user is None:
             raise NoSuchUser("no user matches the provided federated credential")
 
-        return await self.create_user_credentials(user)
+        assert credentials is not None
+        return credentials
 
     async def user_credentials_from_refresh_token(self, refresh_token: str) -> UserCredentials:
         """
@@ -145,27 +236,38 @@ class AuthenticationProvider:
             InvalidRefreshTokenError: the refresh token provided does not exist, has expired or was
                 previously used.
         """
-        user_id = (
+        # Marking the old refresh token as used, issuing the new access and refresh tokens and
+        # fetching the user happen in a single statement. Concurrent uses of the same refresh token
+        # are serialised by the row lock taken by the UPDATE and so at most one will succeed.
+        used_refresh_token = (
+            sa.update(RefreshToken)
+            .where(
+                RefreshToken.expires_at >= sa.func.now(),
+                RefreshToken.token == refresh_token,
+                RefreshToken.used_at.is_(None),
+            )
+            .values(used_at=sa.func.now())
+            .returning(RefreshToken.user_id)
+            .cte("used_refresh_token")
+        )
+        new_access_token, new_refresh_token = secrets.token_urlsafe(64), secrets.token_urlsafe(64)
+        access_token_insert, refresh_token_insert = self._insert_tokens_statements(
+            new_access_token, new_refresh_token, sa.select(used_refresh_token.c.user_id)
+        )
+        user = (
             await self.db_session.execute(
-                sa.update(RefreshToken)
-                .where(
-                    RefreshToken.expires_at >= sa.func.now(),
-                    RefreshToken.token == refresh_token,
-                    RefreshToken.used_at.is_(None),
+                sa.select(User)
+                .join(used_refresh_token, User.id == used_refresh_token.c.user_id)
+                .add_cte(
+                    access_token_insert.cte("access_token"),
+                    refresh_token_insert.cte("refresh_token"),
                 )
-                .values(used_at=sa.func.now())
-                .returning(RefreshToken.user_id)
+                .options(raiseload("*"))
             )
         ).scalar_one_or_none()
-        if user_id is None:
+        if user is None:
             raise InvalidRefreshTokenError("The refresh token could not be verified")
-        return await self.create_user_credentials(
-            (
-                await self.db_session.execute(
-                    sa.select(User).where(User.id == user_id).options(raiseload("*"))
-                )
-            ).scalar_one()
-        )
+        return self._user_credentials(user, new_access_token, new_refresh_token)
 
     async def authenticate_user_from_access_token(self, access_token: str) -> User:
         """
@@ -194,133 +296,292 @@ class AuthenticationProvider:
             raise InvalidAccessTokenError("The access token could not be verified")
         return user
 
+    async def revoke_user_tokens(self, user_uuid: uuid.UUID) -> int:
+        """
+        Revoke all access and refresh tokens for a user in a single statement. Tokens are not held
+        in memory and so revoked tokens are rejected as soon as the revocation is committed.
+
+        Args:
+            user_uuid: uuid of user whose tokens should be revoked.
+
+        Returns: the number of access and refresh tokens revoked.
+
+        Raises:
+            NoSuchUser: no user with the given uuid exists.
+        """
+        user_id = sa.select(User.id).where(User.uuid == user_uuid).scalar_subquery()
+        revoked_access_tokens = (
+            sa.delete(AccessToken)
+            .where(AccessToken.user_id == user_id)
+            .returning(AccessToken.token)
+            .cte("revoked_access_tokens")
+        )
+        revoked_refresh_tokens = (
+            sa.delete(RefreshToken)
+            .where(RefreshToken.user_id == user_id)
+            .returning(RefreshToken.token)
+            .cte("revoked_refresh_tokens")
+        )
+        user_exists, access_token_count, refresh_token_count = (
+            await self.db_session.execute(
+                sa.select(
+                    sa.exists(sa.select(User.id).where(User.uuid == user_uuid)),
+                    sa.select(sa.func.count())
+                    .select_from(revoked_access_tokens)
+                    .scalar_subquery(),
+                    sa.select(sa.func.count())
+                    .select_from(revoked_refresh_tokens)
+                    .scalar_subquery(),
+                )
+            )
+        ).one()
+        if not user_exists:
+            raise NoSuchUser(f"No user with id {user_uuid}")
+        return access_token_count + refresh_token_count
+
     async def create_user_credentials(self, user: User) -> UserCredentials:
         """
         Create access credentials for the passed user.
 
         Args:
-            user: user to create credentials for
+            user: user to create credentials for. The user must already exist in the database.
 
         Returns: access credentials for the user.
         """
-        access_token = AccessToken(
-            token=secrets.token_urlsafe(64),
-            user=user,
-            expires_at=sa.func.date_add(
-                sa.func.now(),
-                bindparam(
-                    "expires_in",
-                    timedelta(seconds=self.access_token_lifetime),
-                    sa.Interval(native=True),
-                ),
-            ),
+        access_token, refresh_token = secrets.token_urlsafe(64), secrets.token_urlsafe(64)
+        access_token_insert, refresh_token_insert = self._insert_tokens_statements(
+            access_token, refresh_token, sa.select(bindparam("user_id", user.id, sa.BigInteger))
         )
-        refresh_token = RefreshToken(
-            token=secrets.token_urlsafe(64),
-            user=user,
-            expires_at=sa.func.date_add(
-                sa.func.now(),
-                bindparam(
-                    "expires_in",
-                    timedelta(seconds=self.refresh_token_lifetime),
-                    sa.Interval(native=True),
-                ),
-            ),
+        await self.db_session.execute(
+            refresh_token_insert.add_cte(access_token_insert.cte("access_token"))
         )
-        self.db_session.add_all([access_token, refresh_token])
-        await self.db_session.flush([access_token, refresh_token])
+        return self._user_credentials(user, access_token, refresh_token)
+
+    def _user_credentials(self, user: User, access_token: str, refresh_token: str):
         return UserCredentials(
             user=user,
-            access_token=access_token.token,
-            refresh_token=refresh_token.token,
+            access_token=access_token,
+            refresh_token=refresh_token,
             access_token_lifetime=self.access_token_lifetime,
             refresh_token_lifetime=self.refresh_token_lifetime,
         )
 
-    async def _query_user_from_federated_credential(
+    def _insert_tokens_statements(
+        self, access_token: str, refresh_token: str, user_ids: sa.Select
+    ) -> tuple[sa.Insert, sa.Insert]:
+        """
+        Return INSERT statements for an access and refresh token. The tokens are created for each
+        user id returned by the user_ids select which allows the statements to be used as part of
+        a CTE which creates or looks up the user.
+        """
+        (user_id,) = user_ids.selected_columns
+
+        def insert_token(model, token: str, lifetime: int, expires_in_param_name: str):
+            expires_in = bindparam(
+                expires_in_param_name, timedelta(seconds=lifetime), sa.Interval(native=True)
+            )
+            return sa.insert(model).from_select(
+                ["token", "user_id", "expires_at"],
+                user_ids.with_only_columns(
+                    sa.literal(token),
+                    user_id,
+                    sa.func.date_add(sa.func.now(), expires_in),
+                    maintain_column_froms=True,
+                ),
+            )
+
+        return (
+            insert_token(
+                AccessToken, access_token, self.access_token_lifetime, "access_token_expires_in"
+            ),
+            insert_token(
+                RefreshToken,
+                refresh_token,
+                self.refresh_token_lifetime,
+                "refresh_token_expires_in",
+            ),
+        )
+
+    async def _validate_federated_credential(
         self, provider: str, credential: str
-    ) -> tuple[Optional[User], Mapping[str, Any]]:
+    ) -> Mapping[str, Any]:
         """
-        Find user in database given a federated identity provider credential. The federated
-        credential will be marked as used in the database meaning that, should a jti claim be
-        present, such federated credentials can only be used once and this method will rais
-        InvalidFederatedCredential if called again with that credential.
+        Validate a federated identity provider credential.
 
         Args:
             provider: federated identity provider to use. This must be one of the keys from the
                federated_identity_providers attribute.
             credential: an id token issued by the federated identity provider
 
-        Returns: the authenticated user, or None if no user could be found, and the verified claims
-            from the id token.
+        Returns: the verified claims from the id token.
 
         Raises:
             InvalidFederatedCredential: the provided id token was invalid
             InvalidProvider: the selected provider does not exist
         """
-        # TODO: use jti claim to mark when federated credentials are used
         try:
             fip = self.federated_identity_providers[provider]
         except KeyError:
             raise InvalidProvider(f"No such provider: {provider}")
 
+        # Errors preparing the issuer are not the fault of the credential and so are not reported
+        # as an invalid credential.
         await fip.prepare()
         try:
-            claims = fip.validate(credential)
+            return await fip.async_validate(credential)
         except FederatedIdentityError as e:
             raise InvalidFederatedCredential(f"The federated credential was invalid: {e}")
 
+    async def _query_user_from_federated_credential(
+        self, claims: Mapping[str, Any], *, issue_credentials: bool = False
+    ) -> tuple[Optional[User], Optional[UserCredentials]]:
+        """
+        Find user in database given the verified claims from a federated identity provider
+        credential. The federated credential will be marked as used in the database meaning that,
+        should a jti claim be present, such federated credentials can only be used once and this
+        method will raise InvalidFederatedCredential if called again with that credential.
+
+        Recording the use of the credential, looking up the user and, optionally, issuing new
+        credentials for them happens in a single statement.
+
+        Args:
+            claims: verified claims from the federated credential
+            issue_credentials: if True, create access and refresh tokens for the user
+
+        Returns: the authenticated user, or None if no user could be found, and newly issued
+            credentials for the user if issue_credentials is True and the user was found.
+
+        Raises:
+            InvalidFederatedCredential: the credential has already been used
+        """
+        ctes = []
+        first_use: sa.ColumnElement[bool] = sa.true()
+
         # If the jti claim is set, ensure that we haven't previously used this credential.
+        # Recording the jti and checking for previous use is atomic and backed by a unique index.
         if "jti" in claims:
-            credential_is_reused = (
-                await self.db_session.execute(
-                    sa.select(
-                        sa.exists().where(
-                            FederatedUserCredentialUse.claims["jti"].astext == claims["jti"]
-                        )
-                    )
+            jti_insert = (
+                postgresql.insert(FederatedUserCredentialJti)
+                .values(
+                    issuer=claims["iss"],
+                    jti=claims["jti"],
+                    expires_at=_federated_credential_expires_at(claims),
                 )
-            ).scalar_one()
-            if credential_is_reused:
-                raise InvalidFederatedCredential("The federated credential has already been used")
+                .on_conflict_do_nothing(index_elements=["issuer", "jti"])
+                .returning(FederatedUserCredentialJti.id)
+                .cte("federated_credential_jti")
+            )
+            ctes.append(jti_insert)
+            first_use = sa.exists(sa.select(jti_insert.c.id))
 
         # Record this credential as having been used irrespective of whether there is a matching
         # user.
-        fed_cred_use = FederatedUserCredentialUse(claims=claims)
-        self.db_session.add(fed_cred_use)
-        await self.db_session.flush([fed_cred_use])
+        ctes.append(
+            sa.insert(FederatedUserCredentialUse)
+            .from_select(
+                ["claims"], sa.select(sa.literal(dict(claims), postgresql.JSONB)).where(first_use)
+            )
+            .cte("federated_credential_use")
+        )
 
-        user = (
+        user_select = (
+            sa.select(User)
+            .join(FederatedUserCredential)
+            .where(
+                FederatedUserCredential.audience == claims["aud"],
+                FederatedUserCredential.issuer == claims["iss"],
+                FederatedUserCredential.subject == claims["sub"],
+            )
+            .cte("federated_user")
+        )
+        user_alias = aliased(User, user_select)
+
+        if issue_credentials:
+            access_token, refresh_token = secrets.token_urlsafe(64), secrets.token_urlsafe(64)
+            access_token_insert, refresh_token_insert = self._insert_tokens_statements(
+                access_token, refresh_token, sa.select(user_alias.id).where(first_use)
+            )
+            ctes.extend(
+                [
+                    access_token_insert.cte("access_token"),
+                    refresh_token_insert.cte("refresh_token"),
+                ]
+            )
+
+        # Always return exactly one row so that a re-used credential can be distinguished from
+        # there being no matching user.
+        status = sa.select(first_use.label("first_use")).subquery("status")
+        is_first_use, user = (
             await self.db_session.execute(
-                sa.select(User)
-                .join(FederatedUserCredential)
-                .where(
-                    FederatedUserCredential.audience == claims["aud"],
-                    FederatedUserCredential.issuer == claims["iss"],
-                    FederatedUserCredential.subject == claims["sub"],
-                )
+                sa.select(status.c.first_use, user_alias)
+                .select_from(status)
+                .outerjoin(user_alias, sa.true())
+                .add_cte(*ctes)
                 .options(raiseload("*"))
             )
-        ).scalar_one_or_none()
+        ).one()
+        if not is_first_use:
+            raise InvalidFederatedCredential("The federated credential has already been used")
 
-        return user, claims
+        if user is None or not issue_credentials:
+            return user, None
+        return user, self._user_credentials(user, access_token, refresh_token)
 
-    async def _create_user_for_federated_credential_claims(self, claims: Mapping[str, Any]):
-        user = User(
-            email=claims.get("email", None),
-            email_verified=bool(claims.get("email_verified", False)),
-            display_name=claims.get("name", claims["sub"]),
-            avatar_url=claims.get("picture", None),
+    async def _create_user_for_federated_credential_claims(
+        self, claims: Mapping[str, Any]
+    ) -> UserCredentials:
+        """
+        Create a new user, a federated credential for them and their access credentials in a
+        single statement.
+        """
+        user_insert = (
+            sa.insert(User)
+            .values(
+                email=claims.get("email", None),
+                email_verified=bool(claims.get("email_verified", False)),
+                display_name=claims.get("name", claims["sub"]),
+                avatar_url=claims.get("picture", None),
+            )
+            .returning(*User.__table__.columns)
+            .cte("new_user")
         )
-        cred = FederatedUserCredential(
-            user=user,
-            audience=claims["aud"],
-            issuer=claims["iss"],
-            subject=claims["sub"],
+        credential_insert = sa.insert(FederatedUserCredential).from_select(
+            ["user_id", "audience", "issuer", "subject"],
+            sa.select(
+                user_insert.c.id,
+                sa.literal(claims["aud"]),
+                sa.literal(claims["iss"]),
+                sa.literal(claims["sub"]),
+            ),
         )
-        self.db_session.add_all([user, cred])
-        await self.db_session.flush([user, cred])
-        return user
+        user_alias = aliased(User, user_insert)
+        access_token, refresh_token = secrets.token_urlsafe(64), secrets.token_urlsafe(64)
+        access_token_insert, refresh_token_insert = self._insert_tokens_statements(
+            access_token, refresh_token, sa.select(user_insert.c.id)
+        )
+        user = (
+            await self.db_session.execute(
+                sa.select(user_alias)
+                .add_cte(
+                    credential_insert.cte("new_federated_credential"),
+                    access_token_insert.cte("access_token"),
+                    refresh_token_insert.cte("refresh_token"),
+                )
+                .options(raiseload("*"))
+            )
+        ).scalar_one()
+        return self._user_credentials(user, access_token, refresh_token)
+
+
+def _federated_credential_expires_at(claims: Mapping[str, Any]) -> Optional[datetime]:
+    """
+    Time until which the jti of a federated credential is remembered. This is the credential's
+    "exp" claim. Credentials without one may be presented at any time and so their jti is
+    remembered forever, indicated by None.
+    """
+    if "exp" not in claims:
+        return None
+    return datetime.fromtimestamp(claims["exp"], UTC)
 
 
 class AuthError(RuntimeError):
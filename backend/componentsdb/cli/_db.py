@@ -1,12 +1,33 @@
 import contextlib
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import NullPool
+
+
+def _create_engine(sqlalchemy_db_url: str) -> AsyncEngine:
+    # Commands are short-lived and use at most a handful of connections in turn and so there is
+    # nothing to gain from keeping connections open in a pool.
+    return create_async_engine(sqlalchemy_db_url, poolclass=NullPool)
 
 
 @contextlib.asynccontextmanager
 async def db_session(sqlalchemy_db_url: str) -> AsyncGenerator[AsyncSession, None]:
-    db_engine = create_async_engine(sqlalchemy_db_url)
-    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
-    async with session_maker.begin() as session:
-        yield session
+    async with db_engine(sqlalchemy_db_url) as engine:
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_maker.begin() as session:
+            yield session
+
+
+@contextlib.asynccontextmanager
+async def db_engine(sqlalchemy_db_url: str) -> AsyncGenerator[AsyncEngine, None]:
+    engine = _create_engine(sqlalchemy_db_url)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
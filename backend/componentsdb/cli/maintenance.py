@@ -0,0 +1,57 @@
+import asyncio
+from datetime import timedelta
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from .. import maintenance, rbac
+from ._db import db_engine, db_session
+
+app = typer.Typer()
+console = Console()
+
+
+async def _sweep(sqlalchemy_db_url: str, retention: timedelta, batch_size: int):
+    async with db_engine(sqlalchemy_db_url) as engine:
+        result = await maintenance.sweep(engine, retention=retention, batch_size=batch_size)
+
+    table = Table("Table", "Rows removed")
+    for table_name, rows_removed in result.rows_removed.items():
+        table.add_row(table_name, str(rows_removed))
+    console.print(table)
+    console.print(f"Partitions created: {result.partitions_created}")
+    console.print(f"Partitions dropped: {', '.join(result.partitions_dropped) or 'none'}")
+
+
+@app.command()
+def sweep(
+    sqlalchemy_db_url: Annotated[str, typer.Option(envvar="SQLALCHEMY_DB_URL")],
+    retention: Annotated[
+        int, typer.Option(help="Seconds to retain expired rows for before removing them.")
+    ] = int(maintenance.DEFAULT_RETENTION.total_seconds()),
+    batch_size: Annotated[
+        int, typer.Option(help="Maximum number of rows to remove in a single transaction.")
+    ] = maintenance.DEFAULT_BATCH_SIZE,
+):
+    """
+    Remove expired tokens and old federated credential uses from the database.
+    """
+    asyncio.run(_sweep(sqlalchemy_db_url, timedelta(seconds=retention), batch_size))
+
+
+async def _rebuild_permissions(sqlalchemy_db_url: str):
+    async with db_session(sqlalchemy_db_url) as session:
+        permission_count = await rbac.rebuild_effective_permissions(session)
+    console.print(f"Effective permissions: {permission_count}")
+
+
+@app.command()
+def rebuild_permissions(
+    sqlalchemy_db_url: Annotated[str, typer.Option(envvar="SQLALCHEMY_DB_URL")],
+):
+    """
+    Recompute the effective permissions of all users from their role bindings.
+    """
+    asyncio.run(_rebuild_permissions(sqlalchemy_db_url))
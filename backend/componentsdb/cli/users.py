@@ -1,4 +1,5 @@
 import asyncio
+import uuid
 from typing import Annotated
 
 import sqlalchemy as sa
@@ -7,6 +8,7 @@ from rich.console import Console
 from rich.table import Table
 from sqlalchemy.orm import raiseload
 
+from ..auth import AuthenticationProvider, NoSuchUser
 from ..db import models as dbm
 from ._db import db_session
 
@@ -40,3 +42,24 @@ def search(
     search: Annotated[str, typer.Argument()],
 ):
     asyncio.run(_search(sqlalchemy_db_url, search))
+
+
+async def _revoke(sqlalchemy_db_url: str, user_id: uuid.UUID):
+    async with db_session(sqlalchemy_db_url) as session:
+        revoked_token_count = await AuthenticationProvider(session).revoke_user_tokens(user_id)
+    console.print(f"Revoked {revoked_token_count} token(s)")
+
+
+@app.command()
+def revoke(
+    sqlalchemy_db_url: Annotated[str, typer.Option(envvar="SQLALCHEMY_DB_URL")],
+    user_id: Annotated[uuid.UUID, typer.Argument(help="Id of user as shown by 'search'.")],
+):
+    """
+    Revoke all access and refresh tokens for a user, signing them out everywhere.
+    """
+    try:
+        asyncio.run(_revoke(sqlalchemy_db_url, user_id))
+    except NoSuchUser as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
@@ -23,7 +23,7 @@ from sqlalchemy.orm import (
 # The 'type:ignore' is required because mypy doesn't understand that "kw_only" can be passed to
 # MappedAsDataclass.
 class Base(MappedAsDataclass, AsyncAttrs, DeclarativeBase, kw_only=True):
-    # type:ignore[call-arg]
+    # type: ignore[call-arg]
     pass
 
 
@@ -180,6 +180,11 @@ class RefreshToken(Base, _TimestampsMixin):
 
 
 sa.Index("idx_refresh_tokens_expires_at", RefreshToken.expires_at)
+sa.Index(
+    "idx_refresh_tokens_used_at",
+    RefreshToken.used_at,
+    postgresql_where=RefreshToken.used_at.is_not(None),
+)
 
 
 class FederatedUserCredential(Base, ResourceMixin):
@@ -205,9 +210,30 @@ sa.Index(
 )
 
 
-class FederatedUserCredentialUse(Base, _IdMixin, _TimestampsMixin):
+class FederatedUserCredentialUse(Base):
     __tablename__ = "federated_user_credential_uses"
 
+    # Uses are range partitioned by day on created_at so that old uses can be removed by dropping
+    # partitions. Partitions are created ahead of time by componentsdb.maintenance and uses for a
+    # day without a partition are written to a default partition. Postgres requires that the
+    # partition key be part of the primary key.
+    #
+    # Replay checks never search this table. Instead they use FederatedUserCredentialJti since
+    # Postgres cannot enforce uniqueness of a jti across partitions.
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id: Mapped[int] = mapped_column(
+        sa.BigInteger, primary_key=True, autoincrement=True, default=None
+    )
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        sa.DateTime(timezone=True),
+        primary_key=True,
+        server_default=sa.Function("now"),
+        default=None,
+    )
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        sa.DateTime(timezone=True), server_default=sa.Function("now"), default=None
+    )
     claims: Mapped[dict] = mapped_column(
         MutableDict.as_mutable(postgresql.JSONB),
         server_default=sa.func.json_build_object(),
@@ -220,6 +246,32 @@ sa.Index(
     FederatedUserCredentialUse.claims,
     postgresql_using="gin",
 )
+sa.Index(
+    "idx_federated_user_credential_uses_created_at",
+    FederatedUserCredentialUse.created_at,
+)
+
+
+class FederatedUserCredentialJti(Base, _IdMixin, _TimestampsMixin):
+    __tablename__ = "federated_user_credential_jtis"
+
+    # Records the "jti" claim of federated credentials which have been used so that they cannot be
+    # replayed. Uniqueness cannot be enforced on the partitioned federated_user_credential_uses
+    # table since Postgres requires unique indexes on partitioned tables to include the partition
+    # key. Rows are only needed until the credential expires. Credentials without an "exp" claim
+    # never expire and so their expires_at is NULL and they are never removed.
+    issuer: Mapped[str]
+    jti: Mapped[str]
+    expires_at: Mapped[Optional[datetime.datetime]] = mapped_column(sa.DateTime(timezone=True))
+
+
+sa.Index(
+    "idx_federated_user_credential_jtis_issuer_jti",
+    FederatedUserCredentialJti.issuer,
+    FederatedUserCredentialJti.jti,
+    unique=True,
+)
+sa.Index("idx_federated_user_credential_jtis_expires_at", FederatedUserCredentialJti.expires_at)
 
 
 class Role(Base, _UUIDMixin):
@@ -283,10 +335,52 @@ class UserRoleBinding(Base, _TimestampsMixin):
         sa.BigInteger, sa.ForeignKey("users.id"), default=None, primary_key=True
     )
     role_id: Mapped[str] = mapped_column(sa.ForeignKey("roles.id"), default=None, primary_key=True)
+    # Targets name resources hierarchically, for example "cabinet/<uuid>/drawer/<uuid>", and a
+    # binding applies to its target and all targets beneath it. See componentsdb.rbac.
     target: Mapped[str] = mapped_column()
 
     user: Mapped[User] = relationship(default=None, repr=False, cascade="all, delete")
     role: Mapped[Role] = relationship(default=None, repr=False, cascade="all, delete")
 
 
-sa.Index("idx_use_role_binding_target", UserRoleBinding.target)
+# Using text_pattern_ops allows the index to be used both for equality and for prefix matches
+# which find the bindings beneath a target.
+sa.Index(
+    "idx_user_role_bindings_target",
+    UserRoleBinding.target,
+    postgresql_ops={"target": "text_pattern_ops"},
+)
+
+
+class UserEffectivePermission(Base, _IdMixin):
+    __tablename__ = "user_effective_permissions"
+
+    # Denormalised permissions granted to each user by their global, cabinet and target role
+    # bindings so that authorization is a single index probe. Rows are maintained by triggers on
+    # the role binding tables and must not be modified directly. Global permissions have neither a
+    # cabinet nor a target.
+    user_id: Mapped[int] = mapped_column(sa.BigInteger, sa.ForeignKey("users.id"))
+    permission_id: Mapped[str] = mapped_column(sa.ForeignKey("permissions.id"))
+    cabinet_id: Mapped[Optional[int]] = mapped_column(
+        sa.BigInteger, sa.ForeignKey("cabinets.id"), default=None
+    )
+    target: Mapped[Optional[str]] = mapped_column(default=None)
+
+
+sa.Index(
+    "idx_user_effective_permissions_user_permission_cabinet",
+    UserEffectivePermission.user_id,
+    UserEffectivePermission.permission_id,
+    UserEffectivePermission.cabinet_id,
+    postgresql_include=["target"],
+)
+# Checking whether a target or any of its ancestors is bound is an equality probe for each
+# ancestor.
+sa.Index(
+    "idx_user_effective_permissions_user_target",
+    UserEffectivePermission.user_id,
+    UserEffectivePermission.target,
+    postgresql_ops={"target": "text_pattern_ops"},
+    postgresql_include=["permission_id"],
+    postgresql_where=UserEffectivePermission.target.is_not(None),
+)
@@ -1,13 +1,22 @@
+import asyncio
 import secrets
 import time
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 import structlog
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from ..auth import FederatedIdentityIssuerRegistry
+from ..federatedidentity import KeySetSnapshotStore, VerificationExecutor
+from ..federatedidentity.transport.native import AsyncHTTPSession
 from ..logging import configure_logging
-from . import graphql, healthcheck
+from ..rbac import EffectivePermissionsCache
+from . import graphql, healthcheck, metrics
+from .db import engine_for_settings, listener_engine_for_settings
+from .eventloop import EventLoopLagMonitor
+from .maintenance import run_periodic_partition_creation, run_periodic_sweep
+from .permissions import PermissionChangeListener
 from .settings import load_settings
 
 LOG = structlog.get_logger()
@@ -17,7 +26,73 @@ LOG = structlog.get_logger()
 async def lifespan(app: FastAPI):
     settings = load_settings()
     configure_logging(json_logging=settings.json_logging)
+
+    # Federated identity issuers are shared by all requests so that their key sets are fetched
+    # once per process. Key sets are fetched in the background so that an unavailable identity
+    # provider does not delay start up. Issuers share a pool of keep-alive connections and verify
+    # signatures on a bounded pool of threads so that a burst of sign-ins does not stall the event
+    # loop.
+    http_session = AsyncHTTPSession(connect_timeout=settings.jwks_connect_timeout)
+    verification_executor = (
+        VerificationExecutor(
+            max_workers=settings.token_verification_workers,
+            max_pending=settings.token_verification_max_pending,
+            max_queued=settings.token_verification_max_queued,
+        )
+        if settings.token_verification_workers > 0
+        else None
+    )
+    app.state.issuer_registry = FederatedIdentityIssuerRegistry(
+        settings.federated_identity_providers,
+        request=http_session,
+        verification_executor=verification_executor,
+        token_cache_max_size=settings.token_cache_max_size,
+        token_cache_rejected_ttl=settings.token_cache_rejected_ttl,
+        snapshot_store=(
+            KeySetSnapshotStore(settings.jwks_snapshot_dir)
+            if settings.jwks_snapshot_dir is not None
+            else None
+        ),
+        fetch_timeout=settings.jwks_fetch_timeout,
+        circuit_breaker_failure_threshold=settings.jwks_circuit_breaker_failure_threshold,
+    )
+    background_tasks = [
+        asyncio.create_task(app.state.issuer_registry.prepare_all()),
+        asyncio.create_task(
+            run_periodic_partition_creation(engine_for_settings(settings), settings)
+        ),
+        asyncio.create_task(run_periodic_sweep(engine_for_settings(settings), settings)),
+    ]
+    if settings.permissions_cache_max_size > 0:
+        # Effective permissions are cached across requests and discarded when role bindings
+        # change.
+        app.state.permissions_cache = EffectivePermissionsCache(
+            max_size=settings.permissions_cache_max_size
+        )
+        app.state.permission_change_listener = PermissionChangeListener(
+            app.state.permissions_cache,
+            health_check_interval=settings.permission_change_health_check_interval,
+            reconnect_interval=settings.permission_change_reconnect_interval,
+        )
+        background_tasks.append(
+            asyncio.create_task(
+                app.state.permission_change_listener.run(listener_engine_for_settings(settings))
+            )
+        )
+    if settings.event_loop_lag_sample_interval is not None:
+        app.state.event_loop_lag_monitor = EventLoopLagMonitor(
+            sample_interval=settings.event_loop_lag_sample_interval,
+            warning_threshold=settings.event_loop_lag_warning_threshold,
+        )
+        background_tasks.append(asyncio.create_task(app.state.event_loop_lag_monitor.run()))
     yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await http_session.aclose()
+    if verification_executor is not None:
+        verification_executor.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -51,4 +126,5 @@ app.add_middleware(
 )
 
 app.include_router(healthcheck.router)
+app.include_router(metrics.router)
 app.include_router(graphql.router, prefix="/graphql")
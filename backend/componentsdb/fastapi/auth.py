@@ -1,33 +1,53 @@
 from typing import Annotated, Optional
 
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..auth import AuthenticationProvider, AuthError
+from ..auth import AuthenticationProvider, AuthError, FederatedIdentityIssuerRegistry
 from ..db.models import User
 from .db import get_db_session
 from .settings import Settings, load_settings
 
 
+def get_issuer_registry(
+    request: Request, settings: Settings = Depends(load_settings)
+) -> FederatedIdentityIssuerRegistry:
+    # The application lifespan creates a process-wide registry. Should the lifespan not have run,
+    # fall back to a registry which lives only as long as the request.
+    issuer_registry = getattr(request.app.state, "issuer_registry", None)
+    if issuer_registry is None:
+        issuer_registry = FederatedIdentityIssuerRegistry(settings.federated_identity_providers)
+    return issuer_registry
+
+
 def get_auth_provider(
-    session: AsyncSession = Depends(get_db_session), settings: Settings = Depends(load_settings)
+    session: AsyncSession = Depends(get_db_session),
+    settings: Settings = Depends(load_settings),
+    issuer_registry: FederatedIdentityIssuerRegistry = Depends(get_issuer_registry),
 ) -> AuthenticationProvider:
     return AuthenticationProvider(
         db_session=session,
-        federated_identity_providers=settings.federated_identity_providers,
+        issuer_registry=issuer_registry,
         access_token_lifetime=settings.access_token_lifetime,
     )
 
 
-async def get_authenticated_user(
-    auth_provider: AuthenticationProvider = Depends(get_auth_provider),
+def get_access_token(
     authorization: Annotated[Optional[str], Header()] = None,
-) -> Optional[User]:
+) -> Optional[str]:
     if authorization is None:
         return None
     if not authorization.lower().startswith("bearer "):
         raise HTTPException(403, detail="bearer token required")
-    access_token = authorization.split(" ")[1]
+    return authorization.split(" ")[1]
+
+
+async def get_authenticated_user(
+    auth_provider: AuthenticationProvider = Depends(get_auth_provider),
+    access_token: Optional[str] = Depends(get_access_token),
+) -> Optional[User]:
+    if access_token is None:
+        return None
     try:
         user = await auth_provider.authenticate_user_from_access_token(access_token)
     except AuthError as e:
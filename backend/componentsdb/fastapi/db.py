@@ -1,10 +1,20 @@
+import dataclasses
 import time
+from collections.abc import Awaitable, Callable
 from functools import cache
+from typing import Any, NamedTuple, Optional
 
 import structlog
 from fastapi import Depends, Request
 from sqlalchemy import event
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, PoolProxiedConnection
 
 from .settings import Settings, load_settings
 
@@ -14,9 +24,97 @@ SLOW_QUERY_THRESHOLD_MS = 100
 QUERY_COUNT_THRESHOLD = 10
 
 
+class PoolOptions(NamedTuple):
+    "Connection pool and driver options for the database engine. See Settings."
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: Optional[float] = None
+    pool_pre_ping: bool = False
+    statement_cache_size: int = 100
+    command_timeout: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "PoolOptions":
+        return cls(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            statement_cache_size=settings.db_statement_cache_size,
+            command_timeout=settings.db_command_timeout,
+        )
+
+
+@dataclasses.dataclass
+class PoolMetrics:
+    "Metrics describing connection checkouts from an InstrumentedPool."
+
+    # Number of connections checked out.
+    checkouts: int = 0
+    # Number of checkouts which timed out waiting for a connection.
+    checkout_timeouts: int = 0
+    # Total time in seconds spent waiting for connections, including connecting and pre-pinging.
+    total_checkout_wait: float = 0.0
+    # Longest time in seconds spent waiting for a connection.
+    max_checkout_wait: float = 0.0
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool which records how long checkouts wait for a connection. Combined with the
+    number of connections in use and in overflow, this shows whether the pool is sized correctly
+    for the load on a worker.
+    """
+
+    metrics: PoolMetrics
+    # Number of connections which may be opened beyond the pool size.
+    max_overflow: int
+
+    def __init__(self, creator: Any, *, max_overflow: int = 10, **kwargs: Any):
+        super().__init__(creator, max_overflow=max_overflow, **kwargs)
+        self.metrics = PoolMetrics()
+        self.max_overflow = max_overflow
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.monotonic()
+        try:
+            connection = super().connect()
+        except sa_exc.TimeoutError:
+            self.metrics.checkout_timeouts += 1
+            raise
+        finally:
+            wait = time.monotonic() - start
+            self.metrics.total_checkout_wait += wait
+            self.metrics.max_checkout_wait = max(self.metrics.max_checkout_wait, wait)
+        self.metrics.checkouts += 1
+        return connection
+
+
 @cache
-def _get_db_engine(sqlalchemy_db_url: str) -> AsyncEngine:
-    engine = create_async_engine(sqlalchemy_db_url)
+def _get_db_engine(
+    sqlalchemy_db_url: str, pool_options: PoolOptions = PoolOptions()
+) -> AsyncEngine:
+    connect_args: dict[str, Any] = {
+        # The first is the cache of prepared statements used by SQLAlchemy and the second is the
+        # cache used by asyncpg itself.
+        "prepared_statement_cache_size": pool_options.statement_cache_size,
+        "statement_cache_size": pool_options.statement_cache_size,
+    }
+    if pool_options.command_timeout is not None:
+        connect_args["command_timeout"] = pool_options.command_timeout
+    engine = create_async_engine(
+        sqlalchemy_db_url,
+        poolclass=InstrumentedPool,
+        pool_size=pool_options.pool_size,
+        max_overflow=pool_options.max_overflow,
+        pool_timeout=pool_options.pool_timeout,
+        pool_recycle=pool_options.pool_recycle if pool_options.pool_recycle is not None else -1,
+        pool_pre_ping=pool_options.pool_pre_ping,
+        connect_args=connect_args,
+    )
 
     @event.listens_for(engine.sync_engine, "before_cursor_execute")
     def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
@@ -40,8 +138,27 @@ def _get_db_engine(sqlalchemy_db_url: str) -> AsyncEngine:
     return engine
 
 
+@cache
+def _get_listener_db_engine(sqlalchemy_db_url: str) -> AsyncEngine:
+    return create_async_engine(sqlalchemy_db_url, poolclass=NullPool)
+
+
+def engine_for_settings(settings: Settings) -> AsyncEngine:
+    "Return the engine shared by everything in this process which uses the database."
+    return _get_db_engine(settings.sqlalchemy_db_url, PoolOptions.from_settings(settings))
+
+
+def listener_engine_for_settings(settings: Settings) -> AsyncEngine:
+    """
+    Return the engine used by background tasks which hold a connection for as long as they run,
+    such as notification listeners. Its connections are opened on demand rather than taken from
+    the pool used by requests and so do not reduce the number of connections available to them.
+    """
+    return _get_listener_db_engine(settings.sqlalchemy_db_url)
+
+
 def get_db_engine(settings: Settings = Depends(load_settings)):
-    return _get_db_engine(settings.sqlalchemy_db_url)
+    return engine_for_settings(settings)
 
 
 def get_session_maker(engine: AsyncEngine = Depends(get_db_engine)):
@@ -49,14 +166,18 @@ def get_session_maker(engine: AsyncEngine = Depends(get_db_engine)):
 
 
 async def get_db_session(request: Request, session_maker=Depends(get_session_maker)):
+    # A connection is only checked out from the pool when the first statement is executed and is
+    # returned when the transaction ends. The transaction may be ended before the request finishes
+    # by get_db_session_release(). Should the request fail, closing the session rolls back.
     request.state.sql_execution_count = 0
 
     def on_do_orm_execute(orm_execute_state):
         request.state.sql_execution_count += 1
 
-    async with session_maker() as session, session.begin():
+    async with session_maker() as session:
         event.listen(session.sync_session, "do_orm_execute", on_do_orm_execute)
         yield session
+        await session.commit()
     event.remove(session.sync_session, "do_orm_execute", on_do_orm_execute)
 
     if request.state.sql_execution_count > QUERY_COUNT_THRESHOLD:
@@ -65,3 +186,13 @@ async def get_db_session(request: Request, session_maker=Depends(get_session_mak
             threshold=QUERY_COUNT_THRESHOLD,
             count=request.state.sql_execution_count,
         )
+
+
+def get_db_session_release(
+    session: AsyncSession = Depends(get_db_session),
+) -> Callable[[], Awaitable[None]]:
+    """
+    Return a callable which commits the transaction of the request's database session so that its
+    connection is returned to the pool before the request finishes.
+    """
+    return session.commit
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from typing import Optional
+
+import structlog
+
+LOG = structlog.get_logger()
+
+
+class EventLoopLagMonitor:
+    """
+    Measure event loop lag by repeatedly sleeping for a fixed interval and recording how much
+    later than requested the loop woke us. Lag above the warning threshold means that some
+    callback held the event loop for that long and stalled every other request on the worker.
+
+    Args:
+        sample_interval: interval in seconds between samples.
+        warning_threshold: lag in seconds above which a warning is logged.
+    """
+
+    sample_interval: float
+    warning_threshold: float
+    # Lag measured by the most recent sample in seconds.
+    last_lag: Optional[float]
+    # Maximum lag measured by any sample in seconds.
+    max_lag: float
+    # Number of samples where the lag exceeded the warning threshold.
+    threshold_exceeded_count: int
+
+    def __init__(self, *, sample_interval: float = 0.5, warning_threshold: float = 0.1):
+        self.sample_interval = sample_interval
+        self.warning_threshold = warning_threshold
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.threshold_exceeded_count = 0
+
+    async def run(self):
+        "Sample event loop lag until cancelled."
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.sample_interval)
+            self.record_lag(max(0.0, time.monotonic() - start - self.sample_interval))
+
+    def record_lag(self, lag: float):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag > self.warning_threshold:
+            self.threshold_exceeded_count += 1
+            LOG.warning(
+                "Event loop lag exceeded threshold",
+                lag_ms=lag * 1e3,
+                threshold_ms=self.warning_threshold * 1e3,
+            )
@@ -1,26 +1,31 @@
+from collections.abc import Awaitable, Callable
 from typing import Optional
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.routing import APIRouter
 from sqlalchemy.ext.asyncio import AsyncSession
 from strawberry.fastapi import GraphQLRouter
 
 from ..auth import AuthenticationProvider
-from ..db.models import User
 from ..graphql import make_context, schema
-from .auth import get_auth_provider, get_authenticated_user
-from .db import get_db_session
+from .auth import get_access_token, get_auth_provider
+from .db import get_db_session, get_db_session_release
 
 
 def get_graphql_context(
+    request: Request,
     session: AsyncSession = Depends(get_db_session),
     auth_provider: AuthenticationProvider = Depends(get_auth_provider),
-    authenticated_user: Optional[User] = Depends(get_authenticated_user),
+    access_token: Optional[str] = Depends(get_access_token),
+    release_db_session: Callable[[], Awaitable[None]] = Depends(get_db_session_release),
 ):
+    # The access token is only verified if a resolver needs the authenticated user.
     return make_context(
         db_session=session,
         authentication_provider=auth_provider,
-        authenticated_user=authenticated_user,
+        access_token=access_token,
+        permissions_cache=getattr(request.app.state, "permissions_cache", None),
+        release_db_session=release_db_session,
     )
 
 
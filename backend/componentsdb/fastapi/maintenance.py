@@ -0,0 +1,67 @@
+import asyncio
+import random
+from datetime import timedelta
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .. import maintenance
+from .settings import Settings
+
+LOG = structlog.get_logger()
+
+
+async def run_periodic_partition_creation(engine: AsyncEngine, settings: Settings):
+    """
+    Create partitions for recording federated credential uses immediately and then every
+    settings.maintenance_partition_interval seconds until cancelled. Federated sign-ins fail if
+    the partition for the current day is missing and so this runs whether or not background
+    sweeping is enabled.
+    """
+    while True:
+        try:
+            partitions_created = await maintenance.create_credential_use_partitions(engine)
+        except Exception:
+            LOG.exception("Error creating federated credential use partitions")
+        else:
+            if partitions_created > 0:
+                LOG.info(
+                    "Created federated credential use partitions",
+                    partitions_created=partitions_created,
+                )
+        await asyncio.sleep(settings.maintenance_partition_interval)
+
+
+async def run_periodic_sweep(engine: AsyncEngine, settings: Settings):
+    """
+    Sweep expired rows from the database every settings.maintenance_sweep_interval seconds until
+    cancelled. The first sweep happens after a random fraction of the interval so that multiple
+    workers started at the same time don't all sweep in lock-step.
+
+    Sweeping also creates partitions for recording federated credential uses but these are created
+    independently by run_periodic_partition_creation() so that disabling sweeping does not stop
+    them being created.
+    """
+    interval = settings.maintenance_sweep_interval
+    if interval is None:
+        return
+
+    await asyncio.sleep(random.uniform(0, interval))
+    while True:
+        try:
+            result = await maintenance.sweep(
+                engine,
+                retention=timedelta(seconds=settings.maintenance_sweep_retention),
+                batch_size=settings.maintenance_sweep_batch_size,
+            )
+        except Exception:
+            LOG.exception("Error sweeping expired rows from database")
+        else:
+            LOG.info(
+                "Swept expired rows from database",
+                rows_removed=result.rows_removed,
+                total_rows_removed=result.total_rows_removed,
+                partitions_created=result.partitions_created,
+                partitions_dropped=result.partitions_dropped,
+            )
+        await asyncio.sleep(interval)
@@ -0,0 +1,199 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..auth import FederatedIdentityIssuerRegistry
+from .auth import get_issuer_registry
+from .db import InstrumentedPool, get_db_engine
+
+router = APIRouter()
+
+
+class JWKSFetchMetrics(BaseModel):
+    issuer: str
+    prepared: bool
+    fetches: int
+    failures: int
+    total_duration_seconds: float
+    last_duration_seconds: Optional[float]
+    last_success_at: Optional[float]
+    background_refreshes: int
+    kid_miss_refetches: int
+    coalesced_fetches: int
+    snapshot_loads: int
+    snapshot_save_failures: int
+
+
+class CircuitBreakerMetrics(BaseModel):
+    state: str
+    consecutive_failures: int
+    retry_after_seconds: float
+    opened: int
+    rejected: int
+
+
+class TokenCacheMetrics(BaseModel):
+    size: int
+    verified_hits: int
+    rejected_hits: int
+    misses: int
+    evictions: int
+
+
+class TokenVerificationMetrics(BaseModel):
+    max_workers: int
+    max_pending: int
+    max_queued: int
+    in_flight: int
+    waiting: int
+    max_waiting: int
+    completed: int
+    rejected: int
+
+
+class EventLoopLagMetrics(BaseModel):
+    last_lag_seconds: Optional[float]
+    max_lag_seconds: float
+    warning_threshold_seconds: float
+    threshold_exceeded_count: int
+
+
+class PermissionsCacheMetrics(BaseModel):
+    size: int
+    enabled: bool
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    notifications_received: int
+    connections: int
+
+
+class DbPoolMetrics(BaseModel):
+    size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    checkout_timeouts: int
+    total_checkout_wait_seconds: float
+    max_checkout_wait_seconds: float
+
+
+class MetricsResponse(BaseModel):
+    jwks_fetches: dict[str, JWKSFetchMetrics]
+    circuit_breakers: dict[str, CircuitBreakerMetrics]
+    token_caches: dict[str, TokenCacheMetrics]
+    token_verification: Optional[TokenVerificationMetrics] = None
+    event_loop_lag: Optional[EventLoopLagMetrics] = None
+    permissions_cache: Optional[PermissionsCacheMetrics] = None
+    db_pool: Optional[DbPoolMetrics] = None
+
+
+@router.get("/metrics")
+def metrics(
+    request: Request,
+    issuer_registry: FederatedIdentityIssuerRegistry = Depends(get_issuer_registry),
+    db_engine: AsyncEngine = Depends(get_db_engine),
+) -> MetricsResponse:
+    verification_executor = issuer_registry.verification_executor
+    event_loop_lag_monitor = getattr(request.app.state, "event_loop_lag_monitor", None)
+    permission_change_listener = getattr(request.app.state, "permission_change_listener", None)
+    db_pool = db_engine.sync_engine.pool
+    return MetricsResponse(
+        jwks_fetches={
+            name: JWKSFetchMetrics(
+                issuer=issuer.issuer,
+                prepared=issuer.is_prepared,
+                fetches=issuer.jwks_fetch_metrics.fetches,
+                failures=issuer.jwks_fetch_metrics.failures,
+                total_duration_seconds=issuer.jwks_fetch_metrics.total_duration,
+                last_duration_seconds=issuer.jwks_fetch_metrics.last_duration,
+                last_success_at=issuer.jwks_fetch_metrics.last_success_at,
+                background_refreshes=issuer.jwks_fetch_metrics.background_refreshes,
+                kid_miss_refetches=issuer.jwks_fetch_metrics.kid_miss_refetches,
+                coalesced_fetches=issuer.jwks_fetch_metrics.coalesced_fetches,
+                snapshot_loads=issuer.jwks_fetch_metrics.snapshot_loads,
+                snapshot_save_failures=issuer.jwks_fetch_metrics.snapshot_save_failures,
+            )
+            for name, issuer in issuer_registry.issuers.items()
+        },
+        circuit_breakers={
+            name: CircuitBreakerMetrics(
+                state=issuer.circuit_breaker.state.value,
+                consecutive_failures=issuer.circuit_breaker.consecutive_failures,
+                retry_after_seconds=issuer.circuit_breaker.retry_after(),
+                opened=issuer.circuit_breaker.metrics.opened,
+                rejected=issuer.circuit_breaker.metrics.rejected,
+            )
+            for name, issuer in issuer_registry.issuers.items()
+        },
+        token_caches={
+            name: TokenCacheMetrics(
+                size=len(issuer.token_cache),
+                verified_hits=issuer.token_cache.metrics.verified_hits,
+                rejected_hits=issuer.token_cache.metrics.rejected_hits,
+                misses=issuer.token_cache.metrics.misses,
+                evictions=issuer.token_cache.metrics.evictions,
+            )
+            for name, issuer in issuer_registry.issuers.items()
+        },
+        token_verification=(
+            TokenVerificationMetrics(
+                max_workers=verification_executor.max_workers,
+                max_pending=verification_executor.max_pending,
+                max_queued=verification_executor.max_queued,
+                in_flight=verification_executor.metrics.in_flight,
+                waiting=verification_executor.metrics.waiting,
+                max_waiting=verification_executor.metrics.max_waiting,
+                completed=verification_executor.metrics.completed,
+                rejected=verification_executor.metrics.rejected,
+            )
+            if verification_executor is not None
+            else None
+        ),
+        event_loop_lag=(
+            EventLoopLagMetrics(
+                last_lag_seconds=event_loop_lag_monitor.last_lag,
+                max_lag_seconds=event_loop_lag_monitor.max_lag,
+                warning_threshold_seconds=event_loop_lag_monitor.warning_threshold,
+                threshold_exceeded_count=event_loop_lag_monitor.threshold_exceeded_count,
+            )
+            if event_loop_lag_monitor is not None
+            else None
+        ),
+        permissions_cache=(
+            PermissionsCacheMetrics(
+                size=len(permission_change_listener.cache),
+                enabled=permission_change_listener.cache.enabled,
+                hits=permission_change_listener.cache.metrics.hits,
+                misses=permission_change_listener.cache.metrics.misses,
+                evictions=permission_change_listener.cache.metrics.evictions,
+                invalidations=permission_change_listener.cache.metrics.invalidations,
+                notifications_received=permission_change_listener.notifications_received,
+                connections=permission_change_listener.connections,
+            )
+            if permission_change_listener is not None
+            else None
+        ),
+        db_pool=(
+            DbPoolMetrics(
+                size=db_pool.size(),
+                max_overflow=db_pool.max_overflow,
+                checked_in=db_pool.checkedin(),
+                checked_out=db_pool.checkedout(),
+                # The pool reports overflow as negative while it has not opened pool_size
+                # connections.
+                overflow=max(0, db_pool.overflow()),
+                checkouts=db_pool.metrics.checkouts,
+                checkout_timeouts=db_pool.metrics.checkout_timeouts,
+                total_checkout_wait_seconds=db_pool.metrics.total_checkout_wait,
+                max_checkout_wait_seconds=db_pool.metrics.max_checkout_wait,
+            )
+            if isinstance(db_pool, InstrumentedPool)
+            else None
+        ),
+    )
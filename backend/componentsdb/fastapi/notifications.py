@@ -0,0 +1,121 @@
+import asyncio
+from collections.abc import Callable
+from contextlib import suppress
+from typing import Any, Generic, Optional, TypeVar
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LOG = structlog.get_logger()
+
+_P = TypeVar("_P")
+
+
+class NotificationListener(Generic[_P]):
+    """
+    Listen for notifications on a database channel using a dedicated connection and pass their
+    parsed payloads on to subscribers which hold state in memory.
+
+    Notifications published while the listener is not connected are lost. Subscribers are
+    therefore passed None, meaning that all in-memory state must be discarded, whenever the
+    listener starts listening and whenever the connection is lost. Subscribers should not serve
+    state from memory while is_listening is False. Together these bound the time for which stale
+    state can be served from memory to the delay in delivering the notification.
+
+    Args:
+        channel: channel to listen on.
+        health_check_interval: interval in seconds between checks that the connection is still
+            alive.
+        reconnect_interval: time in seconds to wait before reconnecting after losing the
+            connection.
+    """
+
+    channel: str
+    health_check_interval: float
+    reconnect_interval: float
+    # True if the listener is connected and listening for notifications.
+    is_listening: bool
+    # Number of notifications received.
+    notifications_received: int
+    # Number of times the listener has started listening.
+    connections: int
+
+    def __init__(
+        self,
+        channel: str,
+        *,
+        health_check_interval: float = 10.0,
+        reconnect_interval: float = 5.0,
+    ):
+        self.channel = channel
+        self.health_check_interval = health_check_interval
+        self.reconnect_interval = reconnect_interval
+        self.is_listening = False
+        self.notifications_received = 0
+        self.connections = 0
+        self._subscribers: list[Callable[[Optional[_P]], None]] = []
+
+    def subscribe(self, subscriber: Callable[[Optional[_P]], None]):
+        self._subscribers.append(subscriber)
+
+    def parse_payload(self, payload: str) -> _P:
+        """
+        Return the value passed to subscribers for a notification payload. Raise ValueError to
+        ignore malformed payloads.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    async def run(self, engine: AsyncEngine):
+        "Listen for notifications until cancelled, reconnecting if the connection is lost."
+        while True:
+            try:
+                await self._listen(engine)
+            except Exception:
+                LOG.exception("Error listening for notifications", channel=self.channel)
+            await asyncio.sleep(self.reconnect_interval)
+
+    async def _listen(self, engine: AsyncEngine):
+        async with engine.connect() as connection:
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+            assert driver_connection is not None
+            lost = asyncio.Event()
+            driver_connection.add_termination_listener(lambda _: lost.set())
+            await driver_connection.add_listener(self.channel, self._on_notification)
+            self.is_listening = True
+            self.connections += 1
+            self._publish(None)
+            try:
+                while not lost.is_set():
+                    with suppress(TimeoutError):
+                        await asyncio.wait_for(lost.wait(), self.health_check_interval)
+                    if not lost.is_set():
+                        await driver_connection.execute(
+                            "SELECT 1", timeout=self.health_check_interval
+                        )
+                LOG.warning(
+                    "Lost connection used to listen for notifications", channel=self.channel
+                )
+            finally:
+                self.is_listening = False
+                self._publish(None)
+                if not lost.is_set():
+                    with suppress(Exception):
+                        await driver_connection.remove_listener(
+                            self.channel, self._on_notification
+                        )
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str):
+        self.notifications_received += 1
+        try:
+            value = self.parse_payload(payload)
+        except ValueError:
+            LOG.warning("Ignoring malformed notification", channel=channel, payload=payload)
+            return
+        self._publish(value)
+
+    def _publish(self, value: Optional[_P]):
+        for subscriber in self._subscribers:
+            try:
+                subscriber(value)
+            except Exception:
+                LOG.exception("Error passing notification to subscriber", channel=self.channel)
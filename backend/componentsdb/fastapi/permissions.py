@@ -0,0 +1,46 @@
+from typing import Optional
+
+from ..rbac import PERMISSION_CHANGE_CHANNEL, EffectivePermissionsCache
+from .notifications import NotificationListener
+
+
+class PermissionChangeListener(NotificationListener[Optional[int]]):
+    """
+    Listen for changes to users' effective permissions and invalidate a cache of permissions held
+    by this process. The cache is only enabled while listening so that a lost connection cannot
+    cause stale permissions to be served. See NotificationListener.
+
+    Args:
+        cache: cache of effective permissions.
+        health_check_interval: interval in seconds between checks that the connection is still
+            alive.
+        reconnect_interval: time in seconds to wait before reconnecting after losing the
+            connection.
+    """
+
+    cache: EffectivePermissionsCache
+
+    def __init__(
+        self,
+        cache: EffectivePermissionsCache,
+        *,
+        health_check_interval: float = 10.0,
+        reconnect_interval: float = 5.0,
+    ):
+        super().__init__(
+            PERMISSION_CHANGE_CHANNEL,
+            health_check_interval=health_check_interval,
+            reconnect_interval=reconnect_interval,
+        )
+        self.cache = cache
+        self.subscribe(self._on_change)
+
+    def parse_payload(self, payload: str) -> Optional[int]:
+        # "*" means that the permissions of any user may have changed.
+        return None if payload == "*" else int(payload)
+
+    def _on_change(self, user_id: Optional[int]):
+        # Subscribers are also passed None when listening starts or stops.
+        self.cache.invalidate(user_id)
+        if user_id is None:
+            self.cache.enabled = self.is_listening
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -13,6 +15,81 @@ class Settings(BaseSettings):
     json_logging: bool = False
     verbose_logging: bool = False
 
+    # Number of database connections kept open by each worker for handling requests. Each
+    # notification listener additionally holds one connection outside the pool for as long as it
+    # runs. Size the pool so that the pool size plus overflow plus listener connections summed
+    # across all workers stays below the server's max_connections.
+    db_pool_size: int = 5
+    # Number of connections which may be opened beyond db_pool_size under load. Overflow
+    # connections are closed when returned to the pool.
+    db_max_overflow: int = 10
+    # Time in seconds to wait for a connection from the pool before failing.
+    db_pool_timeout: float = 30.0
+    # Age in seconds after which connections are replaced. Set to None to never replace them.
+    db_pool_recycle: Optional[float] = None
+    # Check that connections are alive before using them at the cost of a round trip per checkout.
+    db_pool_pre_ping: bool = False
+    # Number of prepared statements cached per connection. Set to 0 when connecting via a
+    # transaction pooling proxy such as PgBouncer.
+    db_statement_cache_size: int = 100
+    # Time in seconds after which database statements are cancelled. Set to None for no limit.
+    db_command_timeout: Optional[float] = None
+
+    # Interval in seconds between creating any missing daily partitions used to record federated
+    # credential uses. Partitions are created two weeks ahead, at start up and at this interval.
+    # Federated sign-ins fail once no partition exists for the current day and so partition
+    # creation cannot be disabled.
+    maintenance_partition_interval: int = 3600
+    # Interval in seconds between background sweeps of expired tokens and federated credential
+    # uses. Set to None to disable background sweeping. Partitions continue to be created when
+    # sweeping is disabled but expired partitions are not dropped.
+    maintenance_sweep_interval: Optional[int] = 3600
+    # Time in seconds which expired rows are retained for before being swept.
+    maintenance_sweep_retention: int = 7 * 24 * 3600
+    # Maximum number of rows deleted in a single transaction when sweeping.
+    maintenance_sweep_batch_size: int = 500
+
+    # Number of worker threads used to verify federated credential signatures off the event loop.
+    # Set to 0 to verify signatures on the event loop.
+    token_verification_workers: int = 4
+    # Maximum number of verifications submitted to the worker threads at once. Further sign-ins
+    # wait for a free slot.
+    token_verification_max_pending: int = 64
+    # Maximum number of sign-ins waiting for a free slot. Further sign-ins are rejected until the
+    # backlog clears.
+    token_verification_max_queued: int = 64
+    # Maximum number of token validation results cached by each federated identity provider. Set
+    # to 0 to disable caching.
+    token_cache_max_size: int = 10000
+    # Time in seconds for which rejected tokens are remembered.
+    token_cache_rejected_ttl: float = 30.0
+    # Directory in which snapshots of federated identity provider key sets are saved so that they
+    # can be used immediately on start up. Set to None to disable snapshots.
+    jwks_snapshot_dir: Optional[str] = None
+    # Time in seconds allowed for fetching a federated identity provider's OIDC discovery document
+    # and key set.
+    jwks_fetch_timeout: float = 10.0
+    # Time in seconds allowed to connect to a federated identity provider.
+    jwks_connect_timeout: float = 5.0
+    # Number of consecutive failed key set fetches after which no further fetches are made to a
+    # federated identity provider for a backoff period. The cached key set is used meanwhile.
+    jwks_circuit_breaker_failure_threshold: int = 1
+
+    # Maximum number of users whose effective permissions are cached by each process. Set to 0 to
+    # disable caching. Cached permissions are invalidated by notifications received on a dedicated
+    # connection and so disabling caching also closes that connection.
+    permissions_cache_max_size: int = 10000
+    # Interval in seconds between checks that the connection used to listen for permission changes
+    # is alive. Cached permissions are not used while the connection is lost.
+    permission_change_health_check_interval: float = 10.0
+    # Time in seconds to wait before reconnecting after losing the permission change connection.
+    permission_change_reconnect_interval: float = 5.0
+
+    # Interval in seconds at which event loop lag is sampled. Set to None to disable sampling.
+    event_loop_lag_sample_interval: Optional[float] = 0.5
+    # Event loop lag in seconds above which a warning is logged.
+    event_loop_lag_warning_threshold: float = 0.1
+
 
 def load_settings() -> Settings:
     return Settings()
@@ -1,22 +1,43 @@
+from .circuitbreaker import CircuitBreaker, CircuitBreakerMetrics, CircuitState
 from .exceptions import (
     FederatedIdentityError,
     InvalidClaimsError,
     InvalidIssuerError,
+    InvalidJWKSError,
     InvalidJWKSUrlError,
     InvalidOIDCDiscoveryDocumentError,
     InvalidTokenError,
+    NoMatchingKeyError,
+    TokenNotYetValidError,
     TransportError,
+    VerificationOverloadedError,
 )
-from .oidc import AsyncOIDCTokenIssuer, OIDCTokenIssuer
+from .oidc import AsyncOIDCTokenIssuer, JWKSFetchMetrics, OIDCTokenIssuer
+from .snapshot import KeySetSnapshotStore
+from .tokencache import TokenCacheMetrics, TokenValidationCache
+from .verification import VerificationExecutor, VerificationExecutorMetrics
 
 __all__ = [
+    "CircuitBreaker",
+    "CircuitBreakerMetrics",
+    "CircuitState",
     "FederatedIdentityError",
     "InvalidClaimsError",
     "InvalidIssuerError",
+    "InvalidJWKSError",
     "InvalidJWKSUrlError",
     "InvalidOIDCDiscoveryDocumentError",
     "InvalidTokenError",
+    "NoMatchingKeyError",
+    "TokenNotYetValidError",
     "TransportError",
+    "VerificationOverloadedError",
     "OIDCTokenIssuer",
     "AsyncOIDCTokenIssuer",
+    "JWKSFetchMetrics",
+    "KeySetSnapshotStore",
+    "TokenCacheMetrics",
+    "TokenValidationCache",
+    "VerificationExecutor",
+    "VerificationExecutorMetrics",
 ]
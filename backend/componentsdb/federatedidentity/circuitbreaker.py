@@ -0,0 +1,105 @@
+"""
+Circuit breaking of key set fetches from identity providers which are failing.
+
+"""
+
+import dataclasses
+import enum
+import time
+from collections.abc import Callable
+from typing import Optional
+
+from .keysetcache import fetch_failure_backoff
+
+#: Default number of consecutive failures after which the circuit opens.
+DEFAULT_FAILURE_THRESHOLD = 1
+
+
+class CircuitState(enum.Enum):
+    # Requests are made as normal.
+    CLOSED = "closed"
+    # Requests fail immediately without being made.
+    OPEN = "open"
+    # The open period has passed. The next request is a trial which closes the circuit if it
+    # succeeds or re-opens it if it fails.
+    HALF_OPEN = "half_open"
+
+
+@dataclasses.dataclass
+class CircuitBreakerMetrics:
+    "Metrics describing the use of a CircuitBreaker."
+
+    # Number of times the circuit has opened, including re-opening after a failed trial request.
+    opened: int = 0
+    # Number of requests refused without being made because the circuit was open.
+    rejected: int = 0
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker guarding requests to a single identity provider. Once failure_threshold
+    consecutive requests have failed the circuit opens and further requests are refused without
+    contacting the provider. After a jittered, exponentially increasing period the circuit becomes
+    half open and the next request is allowed through as a trial.
+
+    Args:
+        failure_threshold: number of consecutive failures after which the circuit opens.
+        open_duration: callable which is passed the number of times the circuit has opened since
+            it was last closed and returns the time in seconds for which it stays open. Defaults
+            to the key set fetch failure backoff.
+    """
+
+    failure_threshold: int
+    metrics: CircuitBreakerMetrics
+    # Number of consecutive failed requests.
+    consecutive_failures: int
+    # Time after which the circuit is half open as reported by time.monotonic() or None if the
+    # circuit is closed.
+    open_until: Optional[float]
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_duration: Callable[[int], float] = fetch_failure_backoff,
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.metrics = CircuitBreakerMetrics()
+        self.consecutive_failures = 0
+        self.open_until = None
+        self._open_duration = open_duration
+
+    @property
+    def state(self) -> CircuitState:
+        if self.open_until is None:
+            return CircuitState.CLOSED
+        if time.monotonic() < self.open_until:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def retry_after(self) -> float:
+        "Time in seconds until the circuit is half open or zero if it is not open."
+        if self.open_until is None:
+            return 0.0
+        return max(0.0, self.open_until - time.monotonic())
+
+    def allow_request(self) -> bool:
+        "True if a request may be made. Refused requests are counted in the metrics."
+        if self.state is CircuitState.OPEN:
+            self.metrics.rejected += 1
+            return False
+        return True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.open_until = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.metrics.opened += 1
+            self.open_until = time.monotonic() + self._open_duration(
+                self.consecutive_failures - self.failure_threshold + 1
+            )
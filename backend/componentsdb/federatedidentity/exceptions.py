@@ -10,6 +10,10 @@ class InvalidJWKSUrlError(FederatedIdentityError):
     "The JWKS URL in the OIDC discovery document was not correctly formed."
 
 
+class InvalidJWKSError(FederatedIdentityError):
+    "The JWK set fetched from the JWKS URL was malformed."
+
+
 class InvalidOIDCDiscoveryDocumentError(FederatedIdentityError):
     "The OIDC discovery document was malformed."
 
@@ -22,5 +26,17 @@ class TransportError(FederatedIdentityError):
     "There was an error fetching a URL."
 
 
+class VerificationOverloadedError(FederatedIdentityError):
+    "Too many tokens were already waiting to be verified. The token may be retried later."
+
+
 class InvalidClaimsError(FederatedIdentityError):
     "The claims in the token did not match policy."
+
+
+class NoMatchingKeyError(InvalidTokenError):
+    "No key in the issuer's key set matches the token. The issuer may since have added the key."
+
+
+class TokenNotYetValidError(InvalidTokenError):
+    "The token's 'nbf' claim is in the future."
@@ -0,0 +1,159 @@
+"""
+Caching of issuer key sets following the HTTP caching headers sent with the key set.
+
+"""
+
+import dataclasses
+import email.utils
+import random
+import time
+from collections.abc import Mapping
+from typing import Optional
+
+from jwcrypto.jwk import JWK, JWKSet
+
+#: Lifetime in seconds of key sets fetched without any caching headers.
+DEFAULT_MAX_AGE = 3600.0
+
+#: Bounds in seconds on the lifetime of cached key sets. The lower bound stops us fetching the key
+#: set on every validation should the issuer mark their key set as uncacheable and the upper
+#: bound ensures that we notice keys being removed from the key set in reasonable time.
+MIN_MAX_AGE = 60.0
+MAX_MAX_AGE = 24 * 3600.0
+
+#: Fraction of the lifetime of a cached key set after which it is refreshed in the background.
+REFRESH_AHEAD_FRACTION = 0.8
+
+#: Minimum interval in seconds between re-fetches of a key set triggered by a token signed with an
+#: unknown key.
+MIN_KID_MISS_REFETCH_INTERVAL = 30.0
+
+#: Bounds in seconds on the delay before a key set is re-fetched after a failed fetch. The delay
+#: doubles with each consecutive failure.
+MIN_FETCH_FAILURE_BACKOFF = 1.0
+MAX_FETCH_FAILURE_BACKOFF = 60.0
+
+# Key type required by each family of signature algorithms.
+_KEY_TYPE_BY_ALG_PREFIX = {"RS": "RSA", "PS": "RSA", "ES": "EC"}
+
+
+@dataclasses.dataclass
+class CachedKeySet:
+    """
+    A key set along with when it was fetched and how long it may be cached for. The keys are
+    indexed by key id so that the key for a token can be found without scanning the key set.
+    """
+
+    key_set: JWKSet
+    # Time the key set was fetched as reported by time.monotonic().
+    fetched_at: float
+    # Lifetime of the cached key set in seconds.
+    max_age: float
+    # JWKS URL advertised by the issuer's OIDC discovery document.
+    jwks_uri: Optional[str] = None
+    _keys_by_kid: dict[str, JWK] = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._keys_by_kid = {
+            key["kid"]: key for key in self.key_set["keys"] if key.get("kid") is not None
+        }
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.monotonic()) - self.fetched_at
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        "True if the key set has outlived its lifetime."
+        return self.age(now) >= self.max_age
+
+    def needs_refresh(self, now: Optional[float] = None) -> bool:
+        "True if the key set is close enough to expiry that it should be refreshed."
+        return self.age(now) >= REFRESH_AHEAD_FRACTION * self.max_age
+
+    def has_key(self, kid: Optional[str]) -> bool:
+        "True if the key set contains a key with the passed key id."
+        if kid is None:
+            return True
+        return kid in self._keys_by_kid
+
+    def signing_keys(self, kid: Optional[str], alg: str) -> list[JWK]:
+        """
+        Keys which may have been used to sign a token with the passed key id and algorithm. If
+        the token has a key id there is at most one such key. Otherwise all signing keys of the
+        type required by the algorithm are candidates.
+        """
+        if kid is not None:
+            key = self._keys_by_kid.get(kid)
+            candidates = [key] if key is not None else []
+        else:
+            candidates = list(self.key_set["keys"])
+        kty = _KEY_TYPE_BY_ALG_PREFIX.get(alg[:2])
+        return [
+            key
+            for key in candidates
+            if key.get("kty") == kty
+            and key.get("use", "sig") == "sig"
+            and key.get("alg", alg) == alg
+        ]
+
+
+def max_age_from_headers(headers: Mapping[str, str], now: Optional[float] = None) -> float:
+    """
+    Determine how long a response may be cached for from its Cache-Control, Age, Expires and Date
+    headers. The result is clamped to lie within [MIN_MAX_AGE, MAX_MAX_AGE].
+
+    Args:
+        headers: response headers. Header names are matched case-insensitively.
+        now: current time as seconds since the epoch. Used for the Expires header if the response
+            has no Date header. Defaults to the current time.
+
+    Returns:
+        The lifetime of the response in seconds.
+    """
+    headers = {k.lower(): v for k, v in headers.items()}
+
+    directives: dict[str, str] = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name != "":
+            directives[name.lower()] = value.strip().strip('"')
+
+    if "no-store" in directives or "no-cache" in directives:
+        return MIN_MAX_AGE
+
+    if "max-age" in directives:
+        try:
+            return _clamp_max_age(
+                float(directives["max-age"]) - float(headers.get("age", "0").strip() or 0)
+            )
+        except ValueError:
+            pass
+
+    if "expires" in headers:
+        try:
+            expires = email.utils.parsedate_to_datetime(headers["expires"]).timestamp()
+        except (TypeError, ValueError):
+            # An invalid Expires header means the response has already expired.
+            return MIN_MAX_AGE
+        try:
+            date = email.utils.parsedate_to_datetime(headers["date"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            date = now if now is not None else time.time()
+        return _clamp_max_age(expires - date)
+
+    return DEFAULT_MAX_AGE
+
+
+def fetch_failure_backoff(consecutive_failures: int) -> float:
+    """
+    Delay in seconds before re-fetching a key set after some number of consecutive failed
+    fetches. The delay is jittered so that workers which failed together do not retry together.
+    """
+    delay = min(
+        MAX_FETCH_FAILURE_BACKOFF,
+        MIN_FETCH_FAILURE_BACKOFF * 2 ** max(0, consecutive_failures - 1),
+    )
+    return random.uniform(0.5 * delay, delay)
+
+
+def _clamp_max_age(max_age: float) -> float:
+    return min(MAX_MAX_AGE, max(MIN_MAX_AGE, max_age))
@@ -1,29 +1,57 @@
+import asyncio
+import dataclasses
 import json
-from collections.abc import Mapping
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
 from typing import Any, NewType, Optional, cast
 from urllib.parse import urlparse
 
 from jwcrypto.common import JWException
 from jwcrypto.jwk import JWKSet
+from jwcrypto.jws import JWS
 from jwcrypto.jwt import JWT
 from validators.url import url as validate_url
 
 from .baseprovider import AsyncBaseProvider, BaseProvider
+from .circuitbreaker import CircuitBreaker
 from .exceptions import (
+    FederatedIdentityError,
     InvalidClaimsError,
     InvalidIssuerError,
+    InvalidJWKSError,
     InvalidJWKSUrlError,
     InvalidOIDCDiscoveryDocumentError,
     InvalidTokenError,
+    NoMatchingKeyError,
+    TokenNotYetValidError,
     TransportError,
+    VerificationOverloadedError,
 )
-from .transport import AsyncRequestBase, RequestBase
+from .keysetcache import (
+    MIN_KID_MISS_REFETCH_INTERVAL,
+    CachedKeySet,
+    max_age_from_headers,
+)
+from .snapshot import KeySetSnapshotStore
+from .tokencache import TokenValidationCache
+from .transport import AsyncRequestBase, RequestBase, Response
 from .transport import requests as requests_transport
+from .verification import VerificationExecutor
 
 ValidatedIssuer = NewType("ValidatedIssuer", str)
 ValidatedJWKSUrl = NewType("ValidatedJWKSUrl", str)
 UnvalidatedClaims = NewType("UnvalidatedClaims", dict[str, Any])
 
+#: Signature algorithms accepted for tokens.
+ALLOWED_ALGS = ["RS256", "ES256"]
+
+#: Clock skew in seconds allowed when checking the "exp" and "nbf" claims.
+CLOCK_SKEW_LEEWAY = 60
+
+#: Default time in seconds allowed for fetching an issuer's OIDC discovery document and key set.
+DEFAULT_FETCH_TIMEOUT = 10.0
+
 
 def validate_issuer(unvalidated_issuer: str) -> ValidatedIssuer:
     """
@@ -99,67 +127,163 @@ def _jwks_uri_from_oidc_discovery_document(
     return jwks_uri
 
 
-def _request_json(url: str, request: RequestBase) -> bytes:
+def _remaining_time(url: str, deadline: Optional[float]) -> Optional[float]:
+    "Time in seconds remaining before a deadline as reported by time.monotonic()."
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TransportError(f"Deadline passed before requesting {url!r}")
+    return remaining
+
+
+def _request_json(url: str, request: RequestBase, deadline: Optional[float] = None) -> Response:
     """
     Wrapper arround RequestBase which requests a JSON document and raises TransportError on an
     error status code. The requested JSON document is not parsed.
 
     Returns:
-        The response contents.
+        The response.
     """
-    r = request(url, headers={"Accept": "application/json"})
+    r = request(
+        url, headers={"Accept": "application/json"}, timeout=_remaining_time(url, deadline)
+    )
     if r.status_code >= 400:
         raise TransportError(
             f"Error status when requesting {url!r}: {r.status_code}",
         )
-    return r.content
+    return r
 
 
-async def _async_request_json(url: str, request: AsyncRequestBase) -> bytes:
+async def _async_request_json(
+    url: str, request: AsyncRequestBase, deadline: Optional[float] = None
+) -> Response:
     """
     Wrapper arround RequestBase which requests a JSON document and raises TransportError on an
     error status code. The requested JSON document is not parsed.
 
     Returns:
-        The response contents.
+        The response.
     """
-    r = await request(url, headers={"Accept": "application/json"})
+    r = await request(
+        url, headers={"Accept": "application/json"}, timeout=_remaining_time(url, deadline)
+    )
     if r.status_code >= 400:
         raise TransportError(
             f"Error status when requesting {url!r}: {r.status_code}",
         )
-    return r.content
+    return r
 
 
-def fetch_jwks(unvalidated_issuer: str, request: RequestBase) -> JWKSet:
-    "Fetch a JWK set from an unvalidated issuer."
-    oidc_discovery_doc = _request_json(
-        oidc_discovery_document_url(validate_issuer(unvalidated_issuer)), request
+def _cached_key_set_from_response(r: Response, jwks_uri: str) -> CachedKeySet:
+    try:
+        key_set = JWKSet.from_json(r.content)
+    except (JWException, ValueError, TypeError, AttributeError) as e:
+        raise InvalidJWKSError(f"Error decoding JWK set from {jwks_uri!r}: {e!r}")
+    return CachedKeySet(
+        key_set=key_set,
+        fetched_at=time.monotonic(),
+        max_age=max_age_from_headers(r.headers),
+        jwks_uri=jwks_uri,
     )
+
+
+def fetch_cached_jwks(
+    unvalidated_issuer: str, request: RequestBase, timeout: Optional[float] = None
+) -> CachedKeySet:
+    """
+    Fetch a JWK set from an unvalidated issuer along with how long it may be cached for as
+    indicated by the caching headers on the JWK set response.
+
+    If timeout is not None, it is the time in seconds allowed for fetching both the OIDC discovery
+    document and the JWK set. Each request is passed whatever time remains.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    oidc_discovery_doc = _request_json(
+        oidc_discovery_document_url(validate_issuer(unvalidated_issuer)), request, deadline
+    ).content
     jwks_uri = _jwks_uri_from_oidc_discovery_document(unvalidated_issuer, oidc_discovery_doc)
-    return JWKSet.from_json(_request_json(jwks_uri, request))
+    return _cached_key_set_from_response(_request_json(jwks_uri, request, deadline), jwks_uri)
+
+
+async def async_fetch_cached_jwks(
+    unvalidated_issuer: str, request: AsyncRequestBase, timeout: Optional[float] = None
+) -> CachedKeySet:
+    "Asynchronous version of fetch_cached_jwks()."
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    try:
+        # The overall timeout is enforced here as well as by the transport so that the deadline
+        # holds even for transports which take longer than they were asked to.
+        async with asyncio.timeout(timeout):
+            oidc_discovery_doc = (
+                await _async_request_json(
+                    oidc_discovery_document_url(validate_issuer(unvalidated_issuer)),
+                    request,
+                    deadline,
+                )
+            ).content
+            jwks_uri = _jwks_uri_from_oidc_discovery_document(
+                unvalidated_issuer, oidc_discovery_doc
+            )
+            r = await _async_request_json(jwks_uri, request, deadline)
+    except TimeoutError:
+        raise TransportError(f"Timed out fetching key set for {unvalidated_issuer!r}")
+    return _cached_key_set_from_response(r, jwks_uri)
+
+
+def fetch_jwks(unvalidated_issuer: str, request: RequestBase) -> JWKSet:
+    "Fetch a JWK set from an unvalidated issuer."
+    return fetch_cached_jwks(unvalidated_issuer, request).key_set
 
 
 async def async_fetch_jwks(unvalidated_issuer: str, request: AsyncRequestBase) -> JWKSet:
     "Fetch a JWK set from an unvalidated issuer using an asynchronous fetcher."
-    oidc_discovery_doc = await _async_request_json(
-        oidc_discovery_document_url(validate_issuer(unvalidated_issuer)), request
-    )
-    jwks_uri = _jwks_uri_from_oidc_discovery_document(unvalidated_issuer, oidc_discovery_doc)
-    return JWKSet.from_json(await _async_request_json(jwks_uri, request))
+    return (await async_fetch_cached_jwks(unvalidated_issuer, request)).key_set
 
 
-def unvalidated_claims_from_token(unvalidated_token: str) -> UnvalidatedClaims:
-    "Parse and extract unverified claims from the token."
+@dataclasses.dataclass
+class ParsedToken:
+    """
+    A token parsed from its compact serialization. Neither the signature nor the claims have been
+    validated.
+    """
+
+    jws: JWS
+    header: Mapping[str, Any]
+    claims: UnvalidatedClaims
+
+
+def parse_token(unvalidated_token: str) -> ParsedToken:
+    """
+    Parse a token from its compact serialization, decoding the protected header and payload.
+
+    Raises:
+        InvalidTokenError: if the token is not a JWS or the payload is not a JSON object.
+    """
     try:
-        jwt = JWT.from_jose_token(unvalidated_token)
+        jws = JWS()
+        jws.allowed_algs = ALLOWED_ALGS
+        jws.deserialize(unvalidated_token)
+        header = jws.jose_header
     except Exception:
         raise InvalidTokenError("Could not parse token as JWT")
     try:
-        payload = json.loads(jwt.token.objects["payload"])
-    except (json.JSONDecodeError, KeyError):
+        claims = json.loads(jws.objects["payload"])
+    except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
         raise InvalidTokenError("Could not decode token payload as JSON.")
-    return cast(UnvalidatedClaims, payload)
+    if not isinstance(claims, dict):
+        raise InvalidTokenError("Token payload is not a JSON object.")
+    return ParsedToken(jws=jws, header=header, claims=cast(UnvalidatedClaims, claims))
+
+
+def unvalidated_header_from_token(unvalidated_token: str) -> Mapping[str, Any]:
+    "Parse and extract the unverified protected header from the token."
+    return parse_token(unvalidated_token).header
+
+
+def unvalidated_claims_from_token(unvalidated_token: str) -> UnvalidatedClaims:
+    "Parse and extract unverified claims from the token."
+    return parse_token(unvalidated_token).claims
 
 
 def unvalidated_claim_from_token(unvalidated_token: str, claim: str) -> str:
@@ -173,23 +297,166 @@ def unvalidated_claim_from_token(unvalidated_token: str, claim: str) -> str:
 
 def validate_token(unvalidated_token: str, jwk_set: JWKSet) -> JWT:
     try:
-        jwt = JWT(algs=["RS256", "ES256"], expected_type="JWS")
+        jwt = JWT(algs=ALLOWED_ALGS, expected_type="JWS")
         jwt.deserialize(unvalidated_token, jwk_set)
     except JWException as e:
         raise InvalidTokenError(f"Invalid token: {e}")
     return jwt
 
 
+def verify_parsed_token(token: ParsedToken, cached_key_set: CachedKeySet) -> Mapping[str, Any]:
+    """
+    Verify the signature of a parsed token against a key set and check the registered claims
+    which do not depend on the issuer. The "exp" and "nbf" claims are checked against the current
+    time allowing for some clock skew.
+
+    Returns the verified claims as a mapping.
+
+    Raises:
+        InvalidTokenError: if the signature or claims are invalid.
+    """
+    alg = token.header.get("alg")
+    if alg not in ALLOWED_ALGS:
+        raise InvalidTokenError(f"Invalid token: algorithm {alg!r} is not allowed")
+    keys = cached_key_set.signing_keys(token.header.get("kid"), alg)
+    if len(keys) == 0:
+        raise NoMatchingKeyError("Invalid token: no matching key found in key set")
+    for key in keys:
+        try:
+            token.jws.verify(key, alg=alg)
+            break
+        except JWException:
+            continue
+    else:
+        raise InvalidTokenError("Invalid token: signature verification failed")
+
+    claims = token.claims
+    for name in ["iss", "sub", "jti", "typ"]:
+        if name in claims and not isinstance(claims[name], str):
+            raise InvalidTokenError(f"Invalid token: '{name}' claim is not a string")
+    if "aud" in claims and not (
+        isinstance(claims["aud"], str)
+        or (isinstance(claims["aud"], list) and all(isinstance(v, str) for v in claims["aud"]))
+    ):
+        raise InvalidTokenError("Invalid token: 'aud' claim is not a string or list of strings")
+    for name in ["exp", "nbf", "iat"]:
+        if name in claims and (
+            not isinstance(claims[name], (int, float)) or isinstance(claims[name], bool)
+        ):
+            raise InvalidTokenError(f"Invalid token: '{name}' claim is not a number")
+
+    now = time.time()
+    if "exp" in claims and claims["exp"] < now - CLOCK_SKEW_LEEWAY:
+        raise InvalidTokenError(f"Invalid token: expired at {claims['exp']}")
+    if "nbf" in claims and claims["nbf"] > now + CLOCK_SKEW_LEEWAY:
+        raise TokenNotYetValidError(f"Invalid token: not valid before {claims['nbf']}")
+    return claims
+
+
+@dataclasses.dataclass
+class JWKSFetchMetrics:
+    "Metrics describing attempts to fetch an issuer's JWK set."
+
+    # Number of attempts to fetch the JWK set including failed attempts.
+    fetches: int = 0
+    # Number of attempts which failed.
+    failures: int = 0
+    # Total wall-clock time spent fetching in seconds.
+    total_duration: float = 0.0
+    # Duration of the most recent attempt in seconds.
+    last_duration: Optional[float] = None
+    # Time of the most recent successful fetch as seconds since the epoch.
+    last_success_at: Optional[float] = None
+    # Number of fetches made in the background because the key set was close to expiry.
+    background_refreshes: int = 0
+    # Number of fetches made because a token was signed by a key not in the key set.
+    kid_miss_refetches: int = 0
+    # Number of fetches which waited on an already in-flight fetch rather than starting their own.
+    coalesced_fetches: int = 0
+    # Number of times the key set was loaded from a snapshot rather than fetched.
+    snapshot_loads: int = 0
+    # Number of failed attempts to save a snapshot of the key set.
+    snapshot_save_failures: int = 0
+
+
 class _BaseOIDCTokenIssuer:
 
     issuer: str
     audience: str
-    _key_set: Optional[JWKSet]
-
-    def __init__(self, issuer: str, audience: str):
+    jwks_fetch_metrics: JWKSFetchMetrics
+    token_cache: TokenValidationCache
+    fetch_timeout: float
+    circuit_breaker: CircuitBreaker
+    _cached_key_set: Optional[CachedKeySet]
+    _last_kid_miss_refetch_at: Optional[float]
+
+    def __init__(
+        self,
+        issuer: str,
+        audience: str,
+        token_cache: Optional[TokenValidationCache] = None,
+        fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
         self.issuer = issuer
         self.audience = audience
-        self._key_set = None
+        self.jwks_fetch_metrics = JWKSFetchMetrics()
+        self.token_cache = token_cache if token_cache is not None else TokenValidationCache()
+        self.fetch_timeout = fetch_timeout
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self._cached_key_set = None
+        self._last_kid_miss_refetch_at = None
+
+    @property
+    def is_prepared(self) -> bool:
+        "True if the issuer's key set has been fetched."
+        return self._cached_key_set is not None
+
+    def _should_refetch_for_kid_miss(self, token: ParsedToken) -> bool:
+        """
+        True if the token is signed with a key which is not in our key set and we have not
+        re-fetched the key set for this reason recently. Issuers may rotate keys before our cached
+        key set expires.
+        """
+        if self._cached_key_set is None:
+            return False
+        if self._cached_key_set.has_key(token.header.get("kid")):
+            return False
+        now = time.monotonic()
+        if (
+            self._last_kid_miss_refetch_at is not None
+            and now - self._last_kid_miss_refetch_at < MIN_KID_MISS_REFETCH_INTERVAL
+        ):
+            return False
+        self._last_kid_miss_refetch_at = now
+        self.jwks_fetch_metrics.kid_miss_refetches += 1
+        return True
+
+    def _check_circuit(self):
+        "Raise TransportError if the circuit breaker for this issuer is refusing fetches."
+        if not self.circuit_breaker.allow_request():
+            raise TransportError(
+                f"Not fetching key set for {self.issuer!r} for "
+                f"{self.circuit_breaker.retry_after():.1f}s after previous failure"
+            )
+
+    @contextmanager
+    def _record_jwks_fetch(self) -> Iterator[None]:
+        metrics = self.jwks_fetch_metrics
+        start = time.monotonic()
+        metrics.fetches += 1
+        try:
+            yield
+        except FederatedIdentityError:
+            metrics.failures += 1
+            self.circuit_breaker.record_failure()
+            raise
+        else:
+            metrics.last_success_at = time.time()
+            self.circuit_breaker.record_success()
+        finally:
+            metrics.last_duration = time.monotonic() - start
+            metrics.total_duration += metrics.last_duration
 
     def validate(self, credential: str) -> Mapping[str, Any]:
         """
@@ -202,10 +469,34 @@ class _BaseOIDCTokenIssuer:
             FederatedIdentityError: if the token is invalid
             ValueError: if prepare() has not been called
         """
-        if self._key_set is None:
+        claims = self._cached_validation(credential)
+        if claims is not None:
+            return claims
+        try:
+            token = parse_token(credential)
+            claims = self._validate_parsed_token(token)
+        except FederatedIdentityError as e:
+            self.token_cache.put_rejected(credential, e)
+            raise
+        self.token_cache.put_verified(credential, claims, token.header.get("kid"))
+        return claims
+
+    def _cached_validation(self, credential: str) -> Optional[Mapping[str, Any]]:
+        """
+        Claims of the credential if it is known to be valid or None if it has not been validated
+        recently. Raises the original error if the credential is known to be invalid.
+        """
+        if self._cached_key_set is None:
+            return None
+        return self.token_cache.get(credential, has_key=self._cached_key_set.has_key)
+
+    def _validate_parsed_token(self, token: ParsedToken) -> Mapping[str, Any]:
+        # The token is parsed once by the caller. The issuer and audience are checked before the
+        # comparatively expensive signature verification.
+        if self._cached_key_set is None:
             raise ValueError("prepare() must have been called prior to validation")
 
-        unvalidated_claims = unvalidated_claims_from_token(credential)
+        unvalidated_claims = token.claims
 
         if "iss" not in unvalidated_claims:
             raise InvalidClaimsError("'iss' claim missing from token")
@@ -223,7 +514,7 @@ class _BaseOIDCTokenIssuer:
                 f"expected '{self.audience}'."
             )
 
-        return json.loads(validate_token(credential, self._key_set).claims)
+        return verify_parsed_token(token, self._cached_key_set)
 
 
 class OIDCTokenIssuer(_BaseOIDCTokenIssuer, BaseProvider):
@@ -241,49 +532,306 @@ class OIDCTokenIssuer(_BaseOIDCTokenIssuer, BaseProvider):
     Args:
         issuer: issuer of tokens as represented in the "iss" claim of the OIDC token.
         audience: expected audience of tokens as represented in the "aud" claim of the OIDC token.
+        request: HTTP transport used to fetch the issuer public key set. Defaults to a transport
+            based on the requests library.
+        token_cache: cache of validation results. Defaults to a cache of the default size.
+        fetch_timeout: time in seconds allowed for fetching the OIDC discovery document and key
+            set together.
+        circuit_breaker: circuit breaker which stops key set fetches after failures. Defaults to
+            a breaker which opens after a single failure.
     """
 
+    _request: Optional[RequestBase]
+
+    def __init__(
+        self,
+        issuer: str,
+        audience: str,
+        request: Optional[RequestBase] = None,
+        token_cache: Optional[TokenValidationCache] = None,
+        fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        super().__init__(
+            issuer,
+            audience,
+            token_cache=token_cache,
+            fetch_timeout=fetch_timeout,
+            circuit_breaker=circuit_breaker,
+        )
+        self._request = request
+
     def prepare(self, request: Optional[RequestBase] = None) -> None:
         """
         Prepare this issuer for token verification, fetching the issuer's public key if necessary.
-        The public key is only fetched once so it is safe to call this method repeatedly.
+        The public key set is cached for as long as the issuer's caching headers allow and so it
+        is safe to call this method repeatedly.
+
+        Should re-fetching an expired key set fail, the expired key set continues to be used.
+        While the circuit breaker is open, the expired key set is used without contacting the
+        issuer.
 
         Args:
-            request: HTTP transport to use to fetch the issuer public key set. Defaults to a
-                transport based on the requests library.
+            request: HTTP transport to use to fetch the issuer public key set. Defaults to the
+                transport passed to the constructor or, failing that, a transport based on the
+                requests library.
 
         Raises:
             FederatedIdentityError: if the issuer, OIDC discovery document or JWKS is invalid or
-                some transport error ocurred.
+                some transport error ocurred. TransportError is raised without making a request if
+                the circuit breaker is open.
         """
-        if self._key_set is not None:
+        if self._cached_key_set is not None and not self._cached_key_set.is_expired():
             return
-        request = request if request is not None else requests_transport.request
-        self._key_set = fetch_jwks(self.issuer, request)
+        try:
+            self._fetch(request)
+        except FederatedIdentityError:
+            if self._cached_key_set is None:
+                raise
+
+    def validate(self, credential: str) -> Mapping[str, Any]:
+        """
+        Validate a credential as being issued by this provider, having the required claims and
+        those claims having expected values. Should the credential be signed by a key not present
+        in the cached key set, the key set is re-fetched subject to a rate limit.
+
+        Returns the verified claims as a mapping.
+
+        Raises:
+            FederatedIdentityError: if the token is invalid
+            ValueError: if prepare() has not been called
+        """
+        claims = self._cached_validation(credential)
+        if claims is not None:
+            return claims
+        try:
+            token = parse_token(credential)
+            if self._should_refetch_for_kid_miss(token):
+                try:
+                    self._fetch()
+                except FederatedIdentityError:
+                    pass
+            claims = self._validate_parsed_token(token)
+        except FederatedIdentityError as e:
+            self.token_cache.put_rejected(credential, e)
+            raise
+        self.token_cache.put_verified(credential, claims, token.header.get("kid"))
+        return claims
+
+    def _fetch(self, request: Optional[RequestBase] = None):
+        request = (
+            request
+            if request is not None
+            else self._request if self._request is not None else requests_transport.request
+        )
+        self._check_circuit()
+        with self._record_jwks_fetch():
+            self._cached_key_set = fetch_cached_jwks(self.issuer, request, self.fetch_timeout)
 
 
 class AsyncOIDCTokenIssuer(_BaseOIDCTokenIssuer, AsyncBaseProvider):
     """
-    Asynchronous version of OIDCTokenIssuer. The only difference being that prepare() takes an
-    optional AsyncRequestBase and must be awaited.
+    Asynchronous version of OIDCTokenIssuer. The differences being that prepare() takes an
+    optional AsyncRequestBase and must be awaited and that async_validate() should be used in
+    preference to validate().
+
+    Key sets which are close to expiring are refreshed in the background so that, in the steady
+    state, validation never waits on the network.
 
+    At most one fetch of the key set is in flight at any one time. Concurrent callers wait on the
+    in-flight fetch rather than starting their own. After a failed fetch the circuit breaker
+    opens and no further fetches are made until a jittered, exponentially increasing backoff
+    period has passed. Any cached key set continues to be used in the meantime.
+
+    Args:
+        issuer: issuer of tokens as represented in the "iss" claim of the OIDC token.
+        audience: expected audience of tokens as represented in the "aud" claim of the OIDC token.
+        request: Asynchronous HTTP transport used to fetch the issuer public key set. Defaults to
+            a transport based on the requests library which runs in a separate thread.
+        verification_executor: if provided, tokens are parsed and their signatures verified by
+            async_validate() on the executor's worker threads rather than on the event loop.
+        token_cache: cache of validation results. Defaults to a cache of the default size.
+        snapshot_store: if provided, fetched key sets are saved to the store and, when the issuer
+            is first prepared, a saved key set is used immediately while a fresh key set is
+            fetched in the background.
+        fetch_timeout: time in seconds allowed for fetching the OIDC discovery document and key
+            set together.
+        circuit_breaker: circuit breaker which stops key set fetches after failures. Defaults to
+            a breaker which opens after a single failure.
     """
 
+    _request: Optional[AsyncRequestBase]
+    _verification_executor: Optional[VerificationExecutor]
+    _snapshot_store: Optional[KeySetSnapshotStore]
+    _snapshot_checked: bool
+    _refresh_task: Optional[asyncio.Task]
+    _fetch_task: Optional[asyncio.Task]
+
+    def __init__(
+        self,
+        issuer: str,
+        audience: str,
+        request: Optional[AsyncRequestBase] = None,
+        verification_executor: Optional[VerificationExecutor] = None,
+        token_cache: Optional[TokenValidationCache] = None,
+        snapshot_store: Optional[KeySetSnapshotStore] = None,
+        fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        super().__init__(
+            issuer,
+            audience,
+            token_cache=token_cache,
+            fetch_timeout=fetch_timeout,
+            circuit_breaker=circuit_breaker,
+        )
+        self._request = request
+        self._verification_executor = verification_executor
+        self._snapshot_store = snapshot_store
+        self._snapshot_checked = False
+        self._refresh_task = None
+        self._fetch_task = None
+
     async def prepare(self, request: Optional[AsyncRequestBase] = None) -> None:
         """
         Prepare this issuer for token verification, fetching the issuer's public key if necessary.
-        The public key is only fetched once so it is safe to call this method repeatedly.
+        The public key set is cached for as long as the issuer's caching headers allow and so it
+        is safe to call this method repeatedly. Cached key sets which are close to expiry are
+        refreshed in the background.
+
+        Should re-fetching an expired key set fail, the expired key set continues to be used.
+
+        If the issuer has a snapshot store, the first call uses any saved key set in the store
+        and re-validates it by fetching the key set in the background.
 
         Args:
             request: Asynchronous HTTP transport to use to fetch the issuer public key set.
-                Defaults to a transport based on the requests library which runs in a separate
-                thread.
+                Defaults to the transport passed to the constructor or, failing that, a transport
+                based on the requests library which runs in a separate thread.
 
         Raises:
             FederatedIdentityError: if the issuer, OIDC discovery document or JWKS is invalid or
-                some transport error ocurred.
+                some transport error ocurred. TransportError is raised without making a request if
+                the circuit breaker is open.
         """
-        if self._key_set is not None:
+        if self._cached_key_set is None and self._load_snapshot():
+            self._start_background_refresh(request)
             return
-        request = request if request is not None else requests_transport.async_request
-        self._key_set = await async_fetch_jwks(self.issuer, request)
+
+        cached_key_set = self._cached_key_set
+        if cached_key_set is None:
+            await self._fetch(request)
+        elif cached_key_set.is_expired():
+            try:
+                await self._fetch(request)
+            except FederatedIdentityError:
+                pass
+        elif cached_key_set.needs_refresh():
+            self._start_background_refresh(request)
+
+    async def async_validate(
+        self, credential: str, request: Optional[AsyncRequestBase] = None
+    ) -> Mapping[str, Any]:
+        """
+        Prepare this issuer if necessary and validate a credential. Should the credential be
+        signed by a key not present in the cached key set, the key set is re-fetched subject to a
+        rate limit. Recently validated credentials are answered from the token cache without
+        parsing or verifying them again.
+
+        Returns the verified claims as a mapping.
+
+        Raises:
+            FederatedIdentityError: if the token is invalid or the issuer could not be prepared
+        """
+        await self.prepare(request)
+        claims = self._cached_validation(credential)
+        if claims is not None:
+            return claims
+
+        executor = self._verification_executor
+        try:
+            token = (
+                await executor.run(parse_token, credential)
+                if executor is not None
+                else parse_token(credential)
+            )
+            if self._should_refetch_for_kid_miss(token):
+                try:
+                    await self._fetch(request)
+                except FederatedIdentityError:
+                    pass
+            claims = (
+                await executor.run(self._validate_parsed_token, token)
+                if executor is not None
+                else self._validate_parsed_token(token)
+            )
+        except VerificationOverloadedError:
+            # The token may be valid and so the rejection is not remembered.
+            raise
+        except FederatedIdentityError as e:
+            self.token_cache.put_rejected(credential, e)
+            raise
+        self.token_cache.put_verified(credential, claims, token.header.get("kid"))
+        return claims
+
+    def _load_snapshot(self) -> bool:
+        "Load the key set from the snapshot store if this has not yet been tried."
+        if self._snapshot_store is None or self._snapshot_checked:
+            return False
+        self._snapshot_checked = True
+        # Snapshots are small and only loaded once and so are read on the event loop.
+        snapshot = self._snapshot_store.load(self.issuer)
+        if snapshot is None:
+            return False
+        self._cached_key_set = snapshot.to_cached_key_set()
+        self.jwks_fetch_metrics.snapshot_loads += 1
+        return True
+
+    async def _save_snapshot(self, cached_key_set: CachedKeySet):
+        if self._snapshot_store is None:
+            return
+        try:
+            await asyncio.to_thread(self._snapshot_store.save, self.issuer, cached_key_set)
+        except OSError:
+            # Failing to save a snapshot only affects how quickly future processes start.
+            self.jwks_fetch_metrics.snapshot_save_failures += 1
+
+    def _start_background_refresh(self, request: Optional[AsyncRequestBase]):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self.jwks_fetch_metrics.background_refreshes += 1
+        self._refresh_task = asyncio.create_task(self._background_refresh(request))
+
+    async def _background_refresh(self, request: Optional[AsyncRequestBase]):
+        # Failures are recorded in the fetch metrics and the existing key set continues to be used
+        # until it expires.
+        try:
+            await self._fetch(request)
+        except FederatedIdentityError:
+            pass
+
+    async def _fetch(self, request: Optional[AsyncRequestBase] = None):
+        if self._fetch_task is not None:
+            self.jwks_fetch_metrics.coalesced_fetches += 1
+        else:
+            self._check_circuit()
+            self._fetch_task = asyncio.create_task(self._fetch_once(request))
+        # Shield the shared fetch so that one caller being cancelled does not cancel the fetch for
+        # everyone else.
+        await asyncio.shield(self._fetch_task)
+
+    async def _fetch_once(self, request: Optional[AsyncRequestBase]):
+        request = (
+            request
+            if request is not None
+            else self._request if self._request is not None else requests_transport.async_request
+        )
+        try:
+            with self._record_jwks_fetch():
+                cached_key_set = await async_fetch_cached_jwks(
+                    self.issuer, request, self.fetch_timeout
+                )
+            self._cached_key_set = cached_key_set
+            await self._save_snapshot(cached_key_set)
+        finally:
+            self._fetch_task = None
@@ -0,0 +1,137 @@
+"""
+Persistence of validated issuer key sets to a local directory so that they are available
+immediately when a process starts.
+
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Optional, Union
+
+from jwcrypto.jwk import JWKSet
+
+from .keysetcache import CachedKeySet
+
+#: Snapshots older than this many seconds are ignored when loaded.
+MAX_SNAPSHOT_AGE = 7 * 24 * 3600.0
+
+# Version of the snapshot file format.
+_SNAPSHOT_VERSION = 1
+
+
+@dataclasses.dataclass
+class KeySetSnapshot:
+    "A key set loaded from a snapshot."
+
+    issuer: str
+    # JWKS URL advertised by the issuer's OIDC discovery document.
+    jwks_uri: Optional[str]
+    key_set: JWKSet
+    # Time the key set was fetched as seconds since the epoch.
+    fetched_at: float
+    # Lifetime of the key set in seconds.
+    max_age: float
+
+    def to_cached_key_set(self) -> CachedKeySet:
+        "Convert to a cached key set preserving the age of the key set."
+        age = max(0.0, time.time() - self.fetched_at)
+        return CachedKeySet(
+            key_set=self.key_set,
+            fetched_at=time.monotonic() - age,
+            max_age=self.max_age,
+            jwks_uri=self.jwks_uri,
+        )
+
+
+class KeySetSnapshotStore:
+    """
+    Directory of key set snapshots with one file per issuer. Snapshots are written atomically by
+    writing to a temporary file in the same directory and renaming it over the previous snapshot.
+    Each snapshot includes a digest of its contents and snapshots which fail the integrity check,
+    are for some other issuer or are too old are ignored when loading.
+
+    Only public keys are stored.
+
+    Args:
+        directory: directory snapshots are stored in. It is created if it does not exist.
+    """
+
+    directory: Path
+
+    def __init__(self, directory: Union[str, os.PathLike]):
+        self.directory = Path(directory)
+
+    def path_for(self, issuer: str) -> Path:
+        "Path to the snapshot file for an issuer."
+        return self.directory / f"{hashlib.sha256(issuer.encode('utf8')).hexdigest()}.json"
+
+    def save(self, issuer: str, cached_key_set: CachedKeySet) -> None:
+        """
+        Save a snapshot of an issuer's key set.
+
+        Raises:
+            OSError: if the snapshot could not be written.
+        """
+        payload = {
+            "version": _SNAPSHOT_VERSION,
+            "issuer": issuer,
+            "jwks_uri": cached_key_set.jwks_uri,
+            "jwks": json.loads(cached_key_set.key_set.export(private_keys=False)),
+            "fetched_at": time.time() - cached_key_set.age(),
+            "max_age": cached_key_set.max_age,
+        }
+        document = json.dumps({"payload": payload, "sha256": _payload_digest(payload)})
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(issuer)
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(document)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(temp_path)
+            raise
+
+    def load(self, issuer: str) -> Optional[KeySetSnapshot]:
+        """
+        Load the snapshot of an issuer's key set. Returns None if there is no snapshot or the
+        snapshot is invalid, for some other issuer or too old.
+        """
+        try:
+            document = json.loads(self.path_for(issuer).read_text())
+            payload = document["payload"]
+            if document["sha256"] != _payload_digest(payload):
+                return None
+            if payload["version"] != _SNAPSHOT_VERSION or payload["issuer"] != issuer:
+                return None
+            fetched_at = float(payload["fetched_at"])
+            if time.time() - fetched_at > MAX_SNAPSHOT_AGE:
+                return None
+            return KeySetSnapshot(
+                issuer=issuer,
+                jwks_uri=payload["jwks_uri"],
+                key_set=JWKSet.from_json(json.dumps(payload["jwks"])),
+                fetched_at=fetched_at,
+                max_age=float(payload["max_age"]),
+            )
+        except Exception:
+            # Missing, unreadable or corrupt snapshots are no different from having no snapshot.
+            return None
+
+
+def _payload_digest(payload) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf8")
+    ).hexdigest()
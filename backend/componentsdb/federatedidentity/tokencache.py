@@ -0,0 +1,153 @@
+"""
+Caching of token validation results keyed by a digest of the raw token.
+
+"""
+
+import dataclasses
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from typing import Any, Optional
+
+from .exceptions import (
+    FederatedIdentityError,
+    NoMatchingKeyError,
+    TokenNotYetValidError,
+)
+
+#: Default maximum number of cached validation results.
+DEFAULT_MAX_SIZE = 10000
+
+#: Default time in seconds for which a rejected token is remembered.
+DEFAULT_REJECTED_TTL = 30.0
+
+# Rejections which may not hold should the token be presented again later. Tokens signed with an
+# unknown key may become valid once the issuer's key set is re-fetched and tokens which are not
+# yet valid become valid with time.
+_TRANSIENT_REJECTIONS = (NoMatchingKeyError, TokenNotYetValidError)
+
+
+@dataclasses.dataclass
+class TokenCacheMetrics:
+    "Metrics describing the use of a TokenValidationCache."
+
+    # Number of lookups which found a verified token.
+    verified_hits: int = 0
+    # Number of lookups which found a rejected token.
+    rejected_hits: int = 0
+    # Number of lookups which found nothing.
+    misses: int = 0
+    # Number of entries evicted to keep the cache within its maximum size.
+    evictions: int = 0
+
+
+@dataclasses.dataclass
+class _Entry:
+    # Time after which the entry is no longer valid as seconds since the epoch.
+    expires_at: float
+    # Verified claims if the token was verified.
+    claims: Optional[Mapping[str, Any]] = None
+    # Key id of the key which verified the token.
+    kid: Optional[str] = None
+    # Type and message of the error raised if the token was rejected.
+    error_type: Optional[type[FederatedIdentityError]] = None
+    error_message: str = ""
+
+
+class TokenValidationCache:
+    """
+    Bounded least-recently-used cache of token validation results keyed by a SHA-256 digest of
+    the raw token. Verified tokens are remembered until their "exp" claim. Tokens which were
+    definitively rejected, for example because their signature or issuer is wrong, are remembered
+    for a short time so that replaying an invalid token does not cost a signature verification.
+
+    Args:
+        max_size: maximum number of cached results. A size of zero disables caching.
+        rejected_ttl: time in seconds for which a rejected token is remembered.
+    """
+
+    metrics: TokenCacheMetrics
+
+    def __init__(
+        self, *, max_size: int = DEFAULT_MAX_SIZE, rejected_ttl: float = DEFAULT_REJECTED_TTL
+    ):
+        self.max_size = max_size
+        self.rejected_ttl = rejected_ttl
+        self.metrics = TokenCacheMetrics()
+        self._entries: OrderedDict[bytes, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, token: str, has_key: Optional[Callable[[Optional[str]], bool]] = None
+    ) -> Optional[Mapping[str, Any]]:
+        """
+        Look up a token. Returns the verified claims if the token is known to be valid or None if
+        the token is not in the cache.
+
+        Args:
+            token: raw token.
+            has_key: callable which is passed the key id which verified a cached token and returns
+                True if that key is still in the issuer's key set. Tokens verified by keys which
+                have since been removed are treated as not being in the cache.
+
+        Raises:
+            FederatedIdentityError: if the token is known to be invalid.
+        """
+        digest = _digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.metrics.misses += 1
+            return None
+        if time.time() >= entry.expires_at or (
+            entry.claims is not None and has_key is not None and not has_key(entry.kid)
+        ):
+            del self._entries[digest]
+            self.metrics.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        if entry.error_type is not None:
+            self.metrics.rejected_hits += 1
+            raise entry.error_type(entry.error_message)
+        self.metrics.verified_hits += 1
+        return entry.claims
+
+    def put_verified(self, token: str, claims: Mapping[str, Any], kid: Optional[str]):
+        "Remember a verified token until its 'exp' claim. Tokens without an 'exp' are not cached."
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            return
+        self._put(token, _Entry(expires_at=float(exp), claims=claims, kid=kid))
+
+    def put_rejected(self, token: str, error: FederatedIdentityError):
+        "Remember a rejected token for a short while unless the rejection may not hold later."
+        if isinstance(error, _TRANSIENT_REJECTIONS):
+            return
+        self._put(
+            token,
+            _Entry(
+                expires_at=time.time() + self.rejected_ttl,
+                error_type=type(error),
+                error_message=str(error),
+            ),
+        )
+
+    def clear(self):
+        self._entries.clear()
+
+    def _put(self, token: str, entry: _Entry):
+        if self.max_size <= 0:
+            return
+        digest = _digest(token)
+        self._entries[digest] = entry
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.metrics.evictions += 1
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf8", errors="surrogateescape")).digest()
@@ -22,6 +22,7 @@ class RequestBase(metaclass=ABCMeta):
         body: Optional[bytes] = None,
         method: Optional[str] = None,
         headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
         """
         Perform a HTTP request.
@@ -31,13 +32,15 @@ class RequestBase(metaclass=ABCMeta):
             body: Body of request. Defaults to an empty body.
             method: HTTP method for request. Defaults to 'GET'.
             headers: Map of headers to set on the request. Defaults to an empty mapping.
+            timeout: Time in seconds allowed for the request. Defaults to the transport's own
+                timeout. Transports may use a shorter timeout but never a longer one.
 
         Returns:
             The response from the resource server.
 
         Raises:
-            TransportError: on any transport error such as DNS resolution failure. Note that error
-                status codes from the server do not raise.
+            TransportError: on any transport error such as DNS resolution failure or the request
+                timing out. Note that error status codes from the server do not raise.
         """
 
 
@@ -53,6 +56,7 @@ class AsyncRequestBase(metaclass=ABCMeta):
         body: Optional[bytes] = None,
         method: Optional[str] = None,
         headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
         """
         Perform a HTTP request.
@@ -62,11 +66,13 @@ class AsyncRequestBase(metaclass=ABCMeta):
             body: Body of request. Defaults to an empty body.
             method: HTTP method for request. Defaults to 'GET'.
             headers: Map of headers to set on the request. Defaults to an empty mapping.
+            timeout: Time in seconds allowed for the request. Defaults to the transport's own
+                timeout. Transports may use a shorter timeout but never a longer one.
 
         Returns:
             The response from the resource server.
 
         Raises:
-            TransportError: on any transport error such as DNS resolution failure. Note that error
-                status codes from the server do not raise.
+            TransportError: on any transport error such as DNS resolution failure or the request
+                timing out. Note that error status codes from the server do not raise.
         """
@@ -0,0 +1,322 @@
+"""
+Native asyncio HTTP/1.1 transport with keep-alive connection pooling.
+
+"""
+
+import asyncio
+import dataclasses
+import ssl
+import time
+from collections.abc import Mapping
+from typing import Optional
+from urllib.parse import urlsplit
+
+from ..exceptions import TransportError
+from . import AsyncRequestBase, Response
+
+#: Default maximum number of simultaneous connections to a single host.
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+
+#: Default time in seconds an idle connection is kept open for re-use.
+DEFAULT_KEEP_ALIVE_TIMEOUT = 30.0
+
+#: Default time in seconds allowed for a complete request, including connecting.
+DEFAULT_TIMEOUT = 10.0
+
+#: Default time in seconds allowed to establish a connection.
+DEFAULT_CONNECT_TIMEOUT = 5.0
+
+#: Maximum size of a response status line or header line.
+_MAX_LINE_LENGTH = 64 * 1024
+
+#: Maximum number of headers in a response.
+_MAX_HEADERS = 100
+
+#: Methods which may be safely retried on a fresh connection if a re-used connection turns out to
+#: have been closed by the server.
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_PoolKey = tuple[str, str, int]
+
+
+class _ProtocolError(Exception):
+    "The server sent a malformed response."
+
+
+@dataclasses.dataclass
+class _Connection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    # Time the connection was last returned to the pool as reported by time.monotonic().
+    idle_since: float = 0.0
+    # Number of requests made over this connection.
+    request_count: int = 0
+
+    def is_usable(self, keep_alive_timeout: float) -> bool:
+        return (
+            not self.writer.is_closing()
+            and not self.reader.at_eof()
+            and time.monotonic() - self.idle_since < keep_alive_timeout
+        )
+
+    def close(self):
+        self.writer.close()
+
+
+@dataclasses.dataclass
+class _Pool:
+    semaphore: asyncio.Semaphore
+    idle: list[_Connection] = dataclasses.field(default_factory=list)
+
+
+class AsyncHTTPSession(AsyncRequestBase):
+    """
+    Asynchronous HTTP/1.1 transport implemented directly on asyncio streams.
+
+    Connections are kept alive and re-used for subsequent requests to the same scheme, host and
+    port. Each connection carries at most one request at a time and is only returned to the pool
+    once the response has been read in full, so requests are never pipelined. Requests to a
+    re-used connection which the server has since closed are transparently retried on a fresh
+    connection if the request method is idempotent.
+
+    Args:
+        max_connections_per_host: maximum number of simultaneous connections to a single host.
+            Further requests wait for a connection to become free.
+        keep_alive_timeout: idle connections older than this many seconds are not re-used.
+        timeout: time in seconds allowed for each request including connecting.
+        connect_timeout: time in seconds allowed to establish a connection.
+        ssl_context: SSL context used for https URLs. Defaults to the system default context.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        keep_alive_timeout: float = DEFAULT_KEEP_ALIVE_TIMEOUT,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.keep_alive_timeout = keep_alive_timeout
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._ssl_context = ssl_context
+        self._pools: dict[_PoolKey, _Pool] = {}
+        self.connections_opened = 0
+
+    async def __call__(
+        self,
+        url: str,
+        body: Optional[bytes] = None,
+        method: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        method = method.upper() if method is not None else "GET"
+        parsed_url = urlsplit(url)
+        scheme = parsed_url.scheme.lower()
+        if scheme not in {"http", "https"} or parsed_url.hostname is None:
+            raise TransportError(f"Unsupported URL {url!r}")
+        try:
+            port = parsed_url.port or (443 if scheme == "https" else 80)
+        except ValueError:
+            raise TransportError(f"Invalid port in URL {url!r}")
+        key = (scheme, parsed_url.hostname, port)
+        target = parsed_url.path or "/"
+        if parsed_url.query:
+            target = f"{target}?{parsed_url.query}"
+        request = _encode_request(method, target, parsed_url.netloc, body, headers)
+
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _Pool(asyncio.Semaphore(self.max_connections_per_host))
+
+        try:
+            async with asyncio.timeout(
+                min(self.timeout, timeout) if timeout is not None else self.timeout
+            ), pool.semaphore:
+                return await self._send(pool, key, method, request)
+        except TimeoutError:
+            raise TransportError(f"Timed out requesting URL {url!r}")
+        except (OSError, asyncio.IncompleteReadError, _ProtocolError) as e:
+            raise TransportError(f"Error requesting URL {url!r}: {e}")
+
+    async def aclose(self):
+        "Close all idle connections."
+        for pool in self._pools.values():
+            while pool.idle:
+                pool.idle.pop().close()
+
+    async def _send(self, pool: _Pool, key: _PoolKey, method: str, request: bytes) -> Response:
+        while True:
+            connection = self._checkout(pool)
+            is_reused = connection is not None
+            if connection is None:
+                connection = await self._connect(key)
+            try:
+                response, keep_alive = await self._roundtrip(connection, method, request)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                connection.close()
+                # The server may close an idle keep-alive connection at any time. If it did so,
+                # the request was never processed and can be retried on a fresh connection.
+                if is_reused and method in _IDEMPOTENT_METHODS and not getattr(e, "partial", None):
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+
+            if keep_alive:
+                connection.idle_since = time.monotonic()
+                pool.idle.append(connection)
+            else:
+                connection.close()
+            return response
+
+    def _checkout(self, pool: _Pool) -> Optional[_Connection]:
+        while pool.idle:
+            # Most recently used connections are the least likely to have been closed.
+            connection = pool.idle.pop()
+            if connection.is_usable(self.keep_alive_timeout):
+                return connection
+            connection.close()
+        return None
+
+    async def _connect(self, key: _PoolKey) -> _Connection:
+        scheme, host, port = key
+        ssl_context: Optional[ssl.SSLContext] = None
+        if scheme == "https":
+            ssl_context = (
+                self._ssl_context
+                if self._ssl_context is not None
+                else ssl.create_default_context()
+            )
+        async with asyncio.timeout(self.connect_timeout):
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=ssl_context, limit=_MAX_LINE_LENGTH
+            )
+        self.connections_opened += 1
+        return _Connection(reader=reader, writer=writer)
+
+    async def _roundtrip(
+        self, connection: _Connection, method: str, request: bytes
+    ) -> tuple[Response, bool]:
+        connection.request_count += 1
+        connection.writer.write(request)
+        await connection.writer.drain()
+
+        reader = connection.reader
+        while True:
+            version, status_code = _parse_status_line(await _read_line(reader))
+            headers = await _read_headers(reader)
+            # Skip informational responses such as "100 Continue".
+            if not 100 <= status_code < 200:
+                break
+
+        connection_tokens = {
+            token.strip().lower() for token in headers.get("connection", "").split(",")
+        }
+        keep_alive = (
+            "close" not in connection_tokens
+            if version == "HTTP/1.1"
+            else "keep-alive" in connection_tokens
+        )
+
+        transfer_encoding = headers.get("transfer-encoding", "").lower()
+        if method == "HEAD" or status_code in {204, 304}:
+            content = b""
+        elif transfer_encoding != "":
+            if transfer_encoding.split(",")[-1].strip() != "chunked":
+                raise _ProtocolError(f"Unsupported transfer encoding {transfer_encoding!r}")
+            content = await _read_chunked(reader)
+        elif "content-length" in headers:
+            try:
+                content_length = int(headers["content-length"])
+            except ValueError:
+                raise _ProtocolError("Invalid Content-Length header")
+            if content_length < 0:
+                raise _ProtocolError("Invalid Content-Length header")
+            content = await reader.readexactly(content_length)
+        else:
+            # The body is delimited by the server closing the connection.
+            content = await reader.read()
+            keep_alive = False
+
+        return Response(content=content, status_code=status_code, headers=headers), keep_alive
+
+
+def _encode_request(
+    method: str,
+    target: str,
+    host: str,
+    body: Optional[bytes],
+    headers: Optional[Mapping[str, str]],
+) -> bytes:
+    request_headers = {"Host": host, "Accept-Encoding": "identity"}
+    for name, value in (headers or {}).items():
+        # Let caller supplied headers replace our defaults irrespective of case.
+        for default_name in list(request_headers):
+            if default_name.lower() == name.lower():
+                del request_headers[default_name]
+        request_headers[name] = value
+    if body is not None or method in {"POST", "PUT", "PATCH"}:
+        request_headers["Content-Length"] = str(len(body or b""))
+
+    lines = [f"{method} {target} HTTP/1.1"]
+    for name, value in request_headers.items():
+        if any(c in f"{name}{value}" for c in "\r\n"):
+            raise TransportError(f"Invalid header {name!r}")
+        lines.append(f"{name}: {value}")
+    return "\r\n".join(lines + ["", ""]).encode("latin-1") + (body or b"")
+
+
+async def _read_line(reader: asyncio.StreamReader) -> str:
+    try:
+        line = await reader.readuntil(b"\n")
+    except asyncio.LimitOverrunError:
+        raise _ProtocolError("Response line too long")
+    return line.decode("latin-1").rstrip("\r\n")
+
+
+def _parse_status_line(line: str) -> tuple[str, int]:
+    parts = line.split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/1."):
+        raise _ProtocolError(f"Malformed status line {line!r}")
+    try:
+        return parts[0], int(parts[1])
+    except ValueError:
+        raise _ProtocolError(f"Malformed status line {line!r}")
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    "Read response headers. Header names are lower-cased and repeated headers are joined."
+    headers: dict[str, str] = {}
+    for _ in range(_MAX_HEADERS + 1):
+        line = await _read_line(reader)
+        if line == "":
+            return headers
+        name, sep, value = line.partition(":")
+        if sep == "":
+            raise _ProtocolError(f"Malformed header line {line!r}")
+        name, value = name.strip().lower(), value.strip()
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+    raise _ProtocolError("Too many headers in response")
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    chunks = []
+    while True:
+        size_line = await _read_line(reader)
+        try:
+            size = int(size_line.split(";", 1)[0].strip(), 16)
+        except ValueError:
+            raise _ProtocolError(f"Malformed chunk size {size_line!r}")
+        if size == 0:
+            break
+        chunks.append(await reader.readexactly(size))
+        if await _read_line(reader) != "":
+            raise _ProtocolError("Missing chunk terminator")
+    # Discard any trailers.
+    await _read_headers(reader)
+    return b"".join(chunks)
@@ -7,19 +7,40 @@ from requests.exceptions import RequestException
 from ..exceptions import TransportError
 from . import AsyncRequestBase, RequestBase, Response
 
+#: Default time in seconds allowed to establish a connection.
+DEFAULT_CONNECT_TIMEOUT = 5.0
+
+#: Default time in seconds allowed between bytes received from the server.
+DEFAULT_READ_TIMEOUT = 10.0
+
 
 class RequestsSession(RequestBase):
     """
     HTTP transport based on a requests.Session object.
 
+    Requests are always made with a timeout so that an unresponsive server cannot hold the
+    calling thread indefinitely.
+
     Args:
         session: requests.Session to use for HTTP requests. If omitted a new session is created.
+        connect_timeout: time in seconds allowed to establish a connection.
+        read_timeout: time in seconds allowed between bytes received from the server.
     """
 
     session: requests.Session
+    connect_timeout: float
+    read_timeout: float
 
-    def __init__(self, session: Optional[requests.Session] = None):
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        *,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+    ):
         self.session = session if session is not None else requests.Session()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
 
     def __call__(
         self,
@@ -27,9 +48,23 @@ class RequestsSession(RequestBase):
         body: Optional[bytes] = None,
         method: Optional[str] = None,
         headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
+        connect_timeout, read_timeout = self.connect_timeout, self.read_timeout
+        if timeout is not None:
+            if timeout <= 0:
+                raise TransportError(f"Timed out requesting URL {url!r}")
+            connect_timeout, read_timeout = min(connect_timeout, timeout), min(
+                read_timeout, timeout
+            )
         try:
-            r = self.session.get(url, headers={"Accept": "application/json"})
+            r = self.session.request(
+                method or "GET",
+                url,
+                data=body,
+                headers=headers,
+                timeout=(connect_timeout, read_timeout),
+            )
         except RequestException as e:
             raise TransportError(f"Error requesting URL {url!r}: {e}")
         return Response(content=r.content, status_code=r.status_code, headers=r.headers)
@@ -37,7 +72,9 @@ class RequestsSession(RequestBase):
 
 class AsyncRequestsSession(AsyncRequestBase):
     """
-    An asyncio wrapper around RequestsSession.
+    An asyncio wrapper around RequestsSession. Requests are made in a separate thread. Should a
+    request exceed its timeout the caller is released immediately while the thread is bounded by
+    the connect and read timeouts of the underlying RequestsSession.
     """
 
     _sync_request: RequestsSession
@@ -45,8 +82,21 @@ class AsyncRequestsSession(AsyncRequestBase):
     def __init__(self, *args, **kwargs):
         self._sync_request = RequestsSession(*args, **kwargs)
 
-    async def __call__(self, *args, **kwargs) -> Response:
-        return await asyncio.to_thread(self._sync_request, *args, **kwargs)
+    async def __call__(
+        self,
+        url: str,
+        body: Optional[bytes] = None,
+        method: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        try:
+            async with asyncio.timeout(timeout):
+                return await asyncio.to_thread(
+                    self._sync_request, url, body, method, headers, timeout
+                )
+        except TimeoutError:
+            raise TransportError(f"Timed out requesting URL {url!r}")
 
 
 #: RequestsSession object which uses a default requests.Session.
@@ -0,0 +1,125 @@
+"""
+Verification of token signatures on a bounded pool of worker threads.
+
+"""
+
+import asyncio
+import dataclasses
+import functools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TypeVar
+
+from .exceptions import VerificationOverloadedError
+
+T = TypeVar("T")
+
+#: Default number of worker threads.
+DEFAULT_MAX_WORKERS = 4
+
+#: Default maximum number of verifications submitted to the worker threads at any one time.
+DEFAULT_MAX_PENDING = 64
+
+
+@dataclasses.dataclass
+class VerificationExecutorMetrics:
+    "Metrics describing the use of a VerificationExecutor."
+
+    # Number of verifications submitted to the worker threads and not yet complete.
+    in_flight: int = 0
+    # Number of verifications waiting for the number of in-flight verifications to drop.
+    waiting: int = 0
+    # Maximum number of verifications which have been waiting at any one time.
+    max_waiting: int = 0
+    # Number of verifications completed including those which failed.
+    completed: int = 0
+    # Number of verifications rejected because too many were already waiting.
+    rejected: int = 0
+
+
+class VerificationExecutor:
+    """
+    Runs CPU-bound token verification on a bounded pool of worker threads so that a burst of
+    sign-ins does not stall the event loop. Signature checks run in OpenSSL via the cryptography
+    package but parsing tokens, selecting keys and checking claims is Python which holds the GIL.
+    Worker threads are pre-empted by the interpreter at its switch interval and so, unlike
+    verification on the event loop, a long queue of verifications cannot hold up other requests
+    until the whole queue has been processed.
+
+    At most max_pending verifications are submitted to the worker threads at once. Up to
+    max_queued further callers wait on the event loop for a slot to become free. Beyond that,
+    verifications are rejected with VerificationOverloadedError rather than queueing without
+    bound.
+
+    Args:
+        max_workers: number of worker threads.
+        max_pending: maximum number of verifications submitted to the worker threads at once.
+            Must be at least max_workers.
+        max_queued: maximum number of verifications waiting to be submitted. Defaults to
+            max_pending.
+    """
+
+    metrics: VerificationExecutorMetrics
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_queued: Optional[int] = None,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_pending < max_workers:
+            raise ValueError("max_pending must be at least max_workers")
+        if max_queued is not None and max_queued < 0:
+            raise ValueError("max_queued must not be negative")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_queued = max_queued if max_queued is not None else max_pending
+        self.metrics = VerificationExecutorMetrics()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def run(self, f: Callable[..., T], *args) -> T:
+        """
+        Call f with the passed arguments on a worker thread and return the result.
+
+        Raises:
+            VerificationOverloadedError: too many verifications were already waiting
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="token-verification"
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        metrics = self.metrics
+        if self._semaphore.locked() and metrics.waiting >= self.max_queued:
+            metrics.rejected += 1
+            raise VerificationOverloadedError(
+                f"Too many tokens waiting to be verified: {metrics.waiting}"
+            )
+        metrics.waiting += 1
+        metrics.max_waiting = max(metrics.max_waiting, metrics.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            metrics.waiting -= 1
+
+        metrics.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(f, *args)
+            )
+        finally:
+            metrics.in_flight -= 1
+            metrics.completed += 1
+            self._semaphore.release()
+
+    def shutdown(self):
+        "Shut down the worker threads. Queued verifications which have not started are cancelled."
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -2,6 +2,7 @@ import strawberry
 from strawberry.extensions import MaxAliasesLimiter, MaxTokensLimiter, QueryDepthLimiter
 
 from .context import make_context
+from .extensions import ReleaseDbSession
 from .types import Mutation, Query
 
 __all__ = ["schema", "make_context"]
@@ -10,5 +11,10 @@ __all__ = ["schema", "make_context"]
 schema = strawberry.Schema(
     query=Query,
     mutation=Mutation,
-    extensions=[QueryDepthLimiter(max_depth=15), MaxTokensLimiter(1000), MaxAliasesLimiter(10)],
+    extensions=[
+        QueryDepthLimiter(max_depth=15),
+        MaxTokensLimiter(1000),
+        MaxAliasesLimiter(10),
+        ReleaseDbSession,
+    ],
 )
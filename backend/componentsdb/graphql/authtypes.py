@@ -6,6 +6,7 @@ from strawberry.field_extensions import InputMutationExtension
 
 from .. import auth
 from ..db import models as dbm
+from . import context
 from .paginationtypes import Node
 
 
@@ -19,13 +20,6 @@ def _auth_provider(context_: dict[str, Any]) -> auth.AuthenticationProvider:
     return auth_provider
 
 
-def _authenticated_user(context_: dict[str, Any]) -> Optional[dbm.User]:
-    user = context_.get("authenticated_user")
-    if user is not None and not isinstance(user, dbm.User):
-        raise ValueError("authenticated user in context is not a database User model")
-    return user
-
-
 @strawberry.type
 class User(Node):
     db_resource: strawberry.Private[dbm.User]
@@ -63,6 +57,11 @@ class UserCredentials:
         )
 
 
+@strawberry.type
+class RevokedCredentials:
+    revoked_token_count: int
+
+
 @strawberry.type
 class FederatedIdentityProvider:
     name: str
@@ -77,6 +76,7 @@ class AuthErrorType(enum.StrEnum):
     INVALID_CREDENTIAL = enum.auto()
     USER_ALREADY_SIGNED_UP = enum.auto()
     USER_NOT_SIGNED_UP = enum.auto()
+    NOT_AUTHENTICATED = enum.auto()
 
 
 @strawberry.type
@@ -97,8 +97,8 @@ class AuthQueries:
         ]
 
     @strawberry.field
-    def authenticated_user(self, info: strawberry.Info) -> Optional[User]:
-        user = _authenticated_user(info.context)
+    async def authenticated_user(self, info: strawberry.Info) -> Optional[User]:
+        user = await context.get_authenticated_user(info.context)
         if user is None:
             return None
         return User.from_db_model(user)
@@ -143,3 +143,26 @@ class AuthMutations:
             )
         except auth.InvalidRefreshTokenError as e:
             return AuthError(error=AuthErrorType.INVALID_CREDENTIAL, detail=str(e))
+
+    @strawberry.mutation
+    async def revoke_credentials(
+        self, info: strawberry.Info
+    ) -> Annotated[
+        Union[RevokedCredentials, AuthError], strawberry.union("RevokeCredentialsResponse")
+    ]:
+        """
+        Revoke all access and refresh tokens for the authenticated user, signing them out
+        everywhere.
+        """
+        auth_provider = _auth_provider(info.context)
+        try:
+            user = await context.get_authenticated_user(info.context)
+        except auth.AuthError as e:
+            return AuthError(error=AuthErrorType.INVALID_CREDENTIAL, detail=str(e))
+        if user is None:
+            return AuthError(
+                error=AuthErrorType.NOT_AUTHENTICATED, detail="An access token is required"
+            )
+        async with context.get_db(info.context).db_lock:
+            revoked_token_count = await auth_provider.revoke_user_tokens(user.uuid)
+        return RevokedCredentials(revoked_token_count=revoked_token_count)
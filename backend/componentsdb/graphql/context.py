@@ -1,20 +1,24 @@
 import asyncio
+from collections.abc import Awaitable
 from functools import cache
 from typing import Any, Callable, Optional, TypeVar
 
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..auth import AuthenticationProvider
+from .. import rbac
+from ..auth import AuthenticationProvider, AuthError
 from ..db import models as dbm
 from . import rbactypes, types
 from .genericloaders import (
+    AuthorizationPredicate,
     EntityConnectionFactory,
     EntityLoader,
+    ManyToManyRelationshipConnectionFactory,
     OneToManyRelationshipConnectionFactory,
     RelatedEntityLoader,
 )
-from .paginationtypes import PaginationParams
+from .paginationtypes import PaginationParams, Resource
 
 
 def cabinet_node_factory(o: dbm.Cabinet) -> "types.Cabinet":
@@ -80,18 +84,52 @@ class ComponentConnectionFactory(
         ]
 
 
-_R = TypeVar("_R", bound=dbm.ResourceMixin)
+# Cabinet of the drawer holding each collection. The subquery is nested within the authorization
+# predicate and so is explicitly correlated with the collections being filtered.
+_collection_cabinet_id = (
+    sa.select(dbm.Drawer.cabinet_id)
+    .where(dbm.Drawer.id == dbm.Collection.drawer_id)
+    .correlate(dbm.Collection)
+    .scalar_subquery()
+)
+
+_R = TypeVar("_R", bound=Resource)
 _N = TypeVar("_N", bound="types.Node")
 _K = TypeVar("_K")
 
 
+#: Permission needed to see a cabinet and the drawers and collections within it.
+CABINET_READ_PERMISSION = "cabinet.read"
+
+
+#: Callable which ends the transaction of a database session so that its connection is returned
+#: to the pool.
+DbSessionRelease = Callable[[], Awaitable[None]]
+
+
 class DbContext:
     db_session: AsyncSession
     db_lock: asyncio.Lock
+    # Permissions of the user making the request which limit the rows connections may return. If
+    # None, the user has no permissions and connections of cabinets and their contents are empty.
+    permissions: Optional["RequestPermissions"]
 
-    def __init__(self, db_session: AsyncSession):
+    def __init__(self, db_session: AsyncSession, release: Optional[DbSessionRelease] = None):
         self.db_session = db_session
         self.db_lock = asyncio.Lock()
+        self.permissions = None
+        self._release = release
+
+    async def release(self):
+        """
+        End the transaction of the database session, if a means to do so was passed, so that its
+        connection is returned to the pool. The session may still be used afterwards in which case
+        a new transaction is started.
+        """
+        if self._release is None:
+            return
+        async with self.db_lock:
+            await self._release()
 
     def _make_entity_loader(
         self, mapper: Any, node_factory: Callable[[_R], _N]
@@ -104,10 +142,19 @@ class DbContext:
         return RelatedEntityLoader[_R, _N](self.db_session, self.db_lock, mapper, node_factory)
 
     def _make_entity_connection_factory(
-        self, pagination_params: PaginationParams, mapper: Any, node_factory: Callable[[_R], _N]
+        self,
+        pagination_params: PaginationParams,
+        mapper: Any,
+        node_factory: Callable[[_R], _N],
+        authorization: Optional[AuthorizationPredicate] = None,
     ) -> EntityConnectionFactory[_R, _N, _K]:
         return EntityConnectionFactory[_R, _N, _K](
-            self.db_session, self.db_lock, pagination_params, mapper, node_factory
+            self.db_session,
+            self.db_lock,
+            pagination_params,
+            mapper,
+            node_factory,
+            authorization=authorization,
         )
 
     def _make_one_to_many_relationship_connection_factory(
@@ -115,11 +162,48 @@ class DbContext:
         pagination_params: PaginationParams,
         relationship: Any,
         node_factory: Callable[[_R], _N],
+        authorization: Optional[AuthorizationPredicate] = None,
     ) -> OneToManyRelationshipConnectionFactory[_R, _N]:
         return OneToManyRelationshipConnectionFactory[_R, _N](
-            self.db_session, self.db_lock, pagination_params, relationship, node_factory
+            self.db_session,
+            self.db_lock,
+            pagination_params,
+            relationship,
+            node_factory,
+            authorization=authorization,
+        )
+
+    def _make_many_to_many_relationship_connection_factory(
+        self,
+        pagination_params: PaginationParams,
+        relationship: Any,
+        node_factory: Callable[[_R], _N],
+        authorization: Optional[AuthorizationPredicate] = None,
+    ) -> ManyToManyRelationshipConnectionFactory[_R, _N]:
+        return ManyToManyRelationshipConnectionFactory[_R, _N](
+            self.db_session,
+            self.db_lock,
+            pagination_params,
+            relationship,
+            node_factory,
+            authorization=authorization,
         )
 
+    def _cabinet_authorization(
+        self, cabinet_id: sa.ColumnExpressionArgument[int]
+    ) -> AuthorizationPredicate:
+        """
+        Return an authorization predicate which limits rows to those within cabinets the user
+        making the request may read. cabinet_id gives the cabinet of each row.
+        """
+
+        async def predicate():
+            if self.permissions is None:
+                return sa.false()
+            return await self.permissions.cabinet_predicate(CABINET_READ_PERMISSION, cabinet_id)
+
+        return predicate
+
     @cache
     def cabinet(self) -> EntityLoader[dbm.Cabinet, "types.Cabinet"]:
         return self._make_entity_loader(dbm.Cabinet, cabinet_node_factory)
@@ -141,7 +225,10 @@ class DbContext:
         self, pagination_params: PaginationParams
     ) -> EntityConnectionFactory[dbm.Cabinet, "types.Cabinet", None]:
         return self._make_entity_connection_factory(
-            pagination_params, dbm.Cabinet, cabinet_node_factory
+            pagination_params,
+            dbm.Cabinet,
+            cabinet_node_factory,
+            authorization=self._cabinet_authorization(dbm.Cabinet.id),
         )
 
     @cache
@@ -150,7 +237,10 @@ class DbContext:
         pagination_params: PaginationParams,
     ) -> OneToManyRelationshipConnectionFactory[dbm.Drawer, "types.Drawer"]:
         return self._make_one_to_many_relationship_connection_factory(
-            pagination_params, dbm.Cabinet.drawers, drawer_node_factory
+            pagination_params,
+            dbm.Cabinet.drawers,
+            drawer_node_factory,
+            authorization=self._cabinet_authorization(dbm.Drawer.cabinet_id),
         )
 
     @cache
@@ -159,7 +249,10 @@ class DbContext:
         pagination_params: PaginationParams,
     ) -> OneToManyRelationshipConnectionFactory[dbm.Collection, "types.Collection"]:
         return self._make_one_to_many_relationship_connection_factory(
-            pagination_params, dbm.Drawer.collections, collection_node_factory
+            pagination_params,
+            dbm.Drawer.collections,
+            collection_node_factory,
+            authorization=self._cabinet_authorization(_collection_cabinet_id),
         )
 
     @cache
@@ -168,7 +261,10 @@ class DbContext:
         pagination_params: PaginationParams,
     ) -> OneToManyRelationshipConnectionFactory[dbm.Collection, "types.Collection"]:
         return self._make_one_to_many_relationship_connection_factory(
-            pagination_params, dbm.Component.collections, collection_node_factory
+            pagination_params,
+            dbm.Component.collections,
+            collection_node_factory,
+            authorization=self._cabinet_authorization(_collection_cabinet_id),
         )
 
     @cache
@@ -192,16 +288,164 @@ class DbContext:
     ) -> EntityConnectionFactory[dbm.Role, "rbactypes.Role", None]:
         return self._make_entity_connection_factory(pagination_params, dbm.Role, role_node_factory)
 
+    @cache
+    def role_permission_connection(
+        self, pagination_params: PaginationParams
+    ) -> ManyToManyRelationshipConnectionFactory[dbm.Permission, "rbactypes.Permission"]:
+        return self._make_many_to_many_relationship_connection_factory(
+            pagination_params, dbm.Role.permissions, permission_node_factory
+        )
+
+
+class AuthenticatedUser:
+    """
+    The user authenticated by the access token passed with a request. The access token is only
+    verified when a resolver first needs the authenticated user and the result is memoized so that
+    verification happens at most once per request.
+
+    Args:
+        authentication_provider: provider used to verify the access token
+        db_lock: lock which must be held when using the authentication provider's database session
+        access_token: access token passed with the request, if any
+        user: the already authenticated user, if known
+    """
+
+    def __init__(
+        self,
+        authentication_provider: AuthenticationProvider,
+        db_lock: asyncio.Lock,
+        access_token: Optional[str] = None,
+        user: Optional[dbm.User] = None,
+    ):
+        self._authentication_provider = authentication_provider
+        self._db_lock = db_lock
+        self._access_token = access_token
+        self._user = user
+        self._authenticate_task: Optional[asyncio.Task[Optional[dbm.User]]] = None
+
+    async def get(self) -> Optional[dbm.User]:
+        """
+        Return the authenticated user or None if no access token was passed with the request.
+
+        Raises:
+            componentsdb.auth.InvalidAccessTokenError: the access token could not be verified
+        """
+        if self._user is not None or self._access_token is None:
+            return self._user
+        if self._authenticate_task is None:
+            self._authenticate_task = asyncio.create_task(self._authenticate(self._access_token))
+        return await asyncio.shield(self._authenticate_task)
+
+    async def _authenticate(self, access_token: str) -> dbm.User:
+        async with self._db_lock:
+            return await self._authentication_provider.authenticate_user_from_access_token(
+                access_token
+            )
+
+
+class RequestPermissions:
+    """
+    The effective permissions of the user authenticated by the access token passed with a
+    request. Permissions are resolved when a resolver first needs them and the result is memoized
+    so that resolvers may check permissions for each node without making further queries.
+
+    Args:
+        authenticated_user: the user making the request
+        db_session: session used to resolve permissions
+        db_lock: lock which must be held when using the database session
+        cache: cache of permissions shared with other requests, if any
+    """
+
+    def __init__(
+        self,
+        authenticated_user: AuthenticatedUser,
+        db_session: AsyncSession,
+        db_lock: asyncio.Lock,
+        cache: Optional[rbac.EffectivePermissionsCache] = None,
+    ):
+        self._authenticated_user = authenticated_user
+        self._db_session = db_session
+        self._db_lock = db_lock
+        self._cache = cache
+        self._resolve_task: Optional[asyncio.Task[rbac.EffectivePermissions]] = None
+
+    async def get(self) -> rbac.EffectivePermissions:
+        """
+        Return the effective permissions of the authenticated user. Unauthenticated users have no
+        permissions.
+
+        Raises:
+            componentsdb.auth.InvalidAccessTokenError: the access token could not be verified
+        """
+        if self._resolve_task is None:
+            self._resolve_task = asyncio.create_task(self._resolve())
+        return await asyncio.shield(self._resolve_task)
+
+    async def _resolve(self) -> rbac.EffectivePermissions:
+        user = await self._authenticated_user.get()
+        if user is None:
+            return rbac.NO_PERMISSIONS
+        if self._cache is None:
+            async with self._db_lock:
+                return await rbac.effective_permissions(self._db_session, user)
+
+        permissions = self._cache.get(user.id)
+        if permissions is not None:
+            return permissions
+        epoch = self._cache.epoch
+        async with self._db_lock:
+            permissions = await rbac.effective_permissions(self._db_session, user)
+        self._cache.put(user.id, permissions, epoch)
+        return permissions
+
+    async def cabinet_predicate(
+        self, permission: str, cabinet_id: sa.ColumnExpressionArgument[int]
+    ) -> Optional[sa.ColumnElement[bool]]:
+        """
+        Return a SQL expression which is true for rows within cabinets in which the authenticated
+        user has a permission. cabinet_id gives the cabinet of each row. None is returned if the
+        permission is granted globally and so no rows need be filtered. The effective permissions
+        are used to avoid probing the database for users with no permission in any cabinet.
+
+        Raises:
+            componentsdb.auth.InvalidAccessTokenError: the access token could not be verified
+        """
+        permissions = await self.get()
+        if permission in permissions.global_permissions:
+            return None
+        if not any(permission in p for p in permissions.cabinet_permissions.values()):
+            return sa.false()
+        return rbac.cabinet_permission_predicate(
+            await self._authenticated_user.get(), permission, cabinet_id
+        )
+
 
 def make_context(
     db_session: AsyncSession,
     authentication_provider: AuthenticationProvider,
-    authenticated_user: Optional[dbm.User],
+    authenticated_user: Optional[dbm.User] = None,
+    access_token: Optional[str] = None,
+    permissions_cache: Optional[rbac.EffectivePermissionsCache] = None,
+    release_db_session: Optional[DbSessionRelease] = None,
 ):
+    """
+    Make a context for executing GraphQL requests. The user making the request may either be
+    passed directly as authenticated_user or, preferably, as an access token which is only
+    verified if a resolver needs the authenticated user. If a permissions cache is passed, the
+    effective permissions of the user are looked up in it before resolving them. Connections of
+    cabinets and their contents only include rows within cabinets which the user may read. If
+    release_db_session is passed, it is called once the request has been executed.
+    """
+    db = DbContext(db_session, release=release_db_session)
+    user = AuthenticatedUser(
+        authentication_provider, db.db_lock, access_token=access_token, user=authenticated_user
+    )
+    db.permissions = RequestPermissions(user, db_session, db.db_lock, cache=permissions_cache)
     return {
-        "db": DbContext(db_session),
+        "db": db,
         "authentication_provider": authentication_provider,
-        "authenticated_user": authenticated_user,
+        "authenticated_user": user,
+        "permissions": db.permissions,
     }
 
 
@@ -210,3 +454,44 @@ def get_db(context_: dict[str, Any]) -> DbContext:
     if db is None or not isinstance(db, DbContext):
         raise ValueError("context has no DbContext instance available via the 'db' key")
     return db
+
+
+async def get_authenticated_user(context_: dict[str, Any]) -> Optional[dbm.User]:
+    """
+    Return the user authenticated by the access token passed with the request, if any. If the
+    access token is invalid, the HTTP response status, if available, is set to 403 Forbidden.
+
+    Raises:
+        componentsdb.auth.InvalidAccessTokenError: the access token could not be verified
+    """
+    authenticated_user = context_.get("authenticated_user")
+    if authenticated_user is None or not isinstance(authenticated_user, AuthenticatedUser):
+        raise ValueError(
+            "context has no AuthenticatedUser instance available via the 'authenticated_user' key"
+        )
+    try:
+        return await authenticated_user.get()
+    except AuthError:
+        response = context_.get("response")
+        if response is not None:
+            response.status_code = 403
+        raise
+
+
+async def get_permissions(context_: dict[str, Any]) -> rbac.EffectivePermissions:
+    """
+    Return the effective permissions of the user making the request. If the access token is
+    invalid, the HTTP response status, if available, is set to 403 Forbidden.
+
+    Raises:
+        componentsdb.auth.InvalidAccessTokenError: the access token could not be verified
+    """
+    permissions = context_.get("permissions")
+    if permissions is None or not isinstance(permissions, RequestPermissions):
+        raise ValueError(
+            "context has no RequestPermissions instance available via the 'permissions' key"
+        )
+    # Verifying the access token via get_authenticated_user() sets the response status should it
+    # be invalid.
+    await get_authenticated_user(context_)
+    return await permissions.get()
@@ -0,0 +1,14 @@
+from strawberry.extensions import SchemaExtension
+
+from .context import get_db
+
+
+class ReleaseDbSession(SchemaExtension):
+    """
+    Release the database connection used by a request once it has been executed rather than
+    holding it while the response is serialised and sent.
+    """
+
+    async def on_execute(self):
+        yield
+        await get_db(self.execution_context.context).release()
@@ -3,7 +3,7 @@ import base64
 import enum
 from abc import ABCMeta, abstractmethod
 from collections import defaultdict
-from typing import Any, Callable, Generic, Optional, Sequence, TypeVar
+from typing import Any, Awaitable, Callable, Generic, Optional, Sequence, TypeVar
 from uuid import UUID
 
 import sqlalchemy as sa
@@ -13,7 +13,6 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import raiseload
 from strawberry.dataloader import DataLoader
 
-from ..db import models as dbm
 from . import types
 from .paginationtypes import (
     DEFAULT_LIMIT,
@@ -21,14 +20,21 @@ from .paginationtypes import (
     Edge,
     LoadEdgesResult,
     PaginationParams,
+    Resource,
 )
 
-_R = TypeVar("_R", bound=dbm.ResourceMixin)
+_R = TypeVar("_R", bound=Resource)
 _N = TypeVar("_N", bound="types.Node")
 _K = TypeVar("_K")
 
 LOG = structlog.get_logger()
 
+#: Callable returning a SQL expression which rows must satisfy to be visible or None if all rows
+#: are visible. It is awaited each time rows are loaded so that it may depend on the user making
+#: the request. The expression is added to the statements which load pages, counts and page
+#: information so that they only ever consider visible rows.
+AuthorizationPredicate = Callable[[], Awaitable[Optional[sa.ColumnElement[bool]]]]
+
 
 class SelectDirection(enum.Enum):
     BEFORE = enum.auto()
@@ -87,19 +93,29 @@ class ConnectionFactory(Generic[_K, _N], metaclass=ABCMeta):
     _pagination_params: PaginationParams
     _edges_loader: DataLoader[_K, LoadEdgesResult[_N]]
     _count_loader: DataLoader[_K, int]
+    _authorization: Optional[AuthorizationPredicate]
 
     def __init__(
         self,
         session: AsyncSession,
         session_lock: asyncio.Lock,
         pagination_params: PaginationParams,
+        *,
+        authorization: Optional[AuthorizationPredicate] = None,
     ):
         self._session = session
         self._session_lock = session_lock
         self._pagination_params = pagination_params
+        self._authorization = authorization
         self._edges_loader = DataLoader(load_fn=self._load_edges)
         self._count_loader = DataLoader(load_fn=self._load_counts)
 
+    async def _authorization_predicate(self) -> sa.ColumnElement[bool]:
+        "Return the expression which rows must satisfy to be visible."
+        # The predicate is awaited before the session lock is taken since it may need the session.
+        predicate = await self._authorization() if self._authorization is not None else None
+        return predicate if predicate is not None else sa.true()
+
     def cursor_from_entity(self, entity: Any) -> str:
         return cursor_from_uuid(entity.uuid)
 
@@ -139,8 +155,10 @@ class OneToManyRelationshipConnectionFactory(Generic[_R, _N], ConnectionFactory[
         pagination_params: PaginationParams,
         relationship: Any,
         node_factory: Callable[[_R], _N],
+        *,
+        authorization: Optional[AuthorizationPredicate] = None,
     ):
-        super().__init__(session, session_lock, pagination_params)
+        super().__init__(session, session_lock, pagination_params, authorization=authorization)
         self.relationship = sa.inspect(relationship)
         assert isinstance(self.relationship, sa.orm.QueryableAttribute)
         assert isinstance(self.relationship.property, sa.orm.RelationshipProperty)
@@ -158,13 +176,14 @@ class OneToManyRelationshipConnectionFactory(Generic[_R, _N], ConnectionFactory[
             if self._pagination_params.first is not None
             else DEFAULT_LIMIT
         )
+        predicate = await self._authorization_predicate()
         subq = sa.select(
             self.entity_model.id.label("entity_id"),
             self.foreign_key_column.label("key"),
             sa.func.row_number()
             .over(partition_by=self.foreign_key_column, order_by=self.entity_model.id)
             .label("rownum"),
-        )
+        ).where(predicate)
         if self._pagination_params.after is not None:
             subq = select_beyond(
                 self.entity_model,
@@ -188,14 +207,22 @@ class OneToManyRelationshipConnectionFactory(Generic[_R, _N], ConnectionFactory[
                     self.entity_model,
                     entities[0].uuid if len(entities) > 0 else None,
                     direction=SelectDirection.BEFORE,
+                    base_select=base_select,
                 ).exists(),
                 select_beyond(
                     self.entity_model,
                     entities[-1].uuid if len(entities) > 0 else None,
                     direction=SelectDirection.AFTER,
+                    base_select=base_select,
                 ).exists(),
             )
-            for entities in db_entity_pages
+            for entities, base_select in zip(
+                db_entity_pages,
+                (
+                    sa.select(self.entity_model).where(self.foreign_key_column == key, predicate)
+                    for key in keys
+                ),
+            )
         ]
 
         async with self._session_lock:
@@ -217,8 +244,10 @@ class OneToManyRelationshipConnectionFactory(Generic[_R, _N], ConnectionFactory[
         ]
 
     async def _load_counts(self, keys: Sequence[int]) -> Sequence[int]:
+        predicate = await self._authorization_predicate()
         stmt = (
             sa.select(self.foreign_key_column, sa.func.count(self.entity_model.id))
+            .where(predicate)
             .group_by(self.foreign_key_column)
             .having(self.foreign_key_column.in_(keys))
         )
@@ -227,6 +256,131 @@ class OneToManyRelationshipConnectionFactory(Generic[_R, _N], ConnectionFactory[
         return [counts_by_id.get(id_, 0) for id_ in keys]
 
 
+class ManyToManyRelationshipConnectionFactory(Generic[_R, _N], ConnectionFactory[Any, _N]):
+    """
+    A ConnectionFactory which follows many to many relationships through a secondary association
+    table. Keys are the values of the parent's column referenced by the association table.
+
+    Pages for all keys in a batch, along with whether there are further pages before or after
+    them, are loaded by a single windowed statement.
+    """
+
+    relationship: sa.orm.Relationship
+    entity_model: type[_R]
+    secondary: sa.FromClause
+    parent_key_column: sa.ColumnElement
+    node_factory: Callable[[_R], _N]
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        session_lock: asyncio.Lock,
+        pagination_params: PaginationParams,
+        relationship: Any,
+        node_factory: Callable[[_R], _N],
+        *,
+        authorization: Optional[AuthorizationPredicate] = None,
+    ):
+        super().__init__(session, session_lock, pagination_params, authorization=authorization)
+        self.relationship = sa.inspect(relationship)
+        assert isinstance(self.relationship, sa.orm.QueryableAttribute)
+        assert isinstance(self.relationship.property, sa.orm.RelationshipProperty)
+        assert self.relationship.property.direction == sa.orm.RelationshipDirection.MANYTOMANY
+        assert self.relationship.property.secondary is not None
+        assert self.relationship.property.secondaryjoin is not None
+        self.entity_model = self.relationship.property.entity.class_
+        self.secondary = self.relationship.property.secondary
+        self.secondary_join = self.relationship.property.secondaryjoin
+        self.parent_key_column = self.relationship.property.synchronize_pairs[0][1]
+        self.node_factory = node_factory
+
+    async def _load_edges(self, keys: Sequence[Any]) -> Sequence[LoadEdgesResult[_N]]:
+        if len(keys) == 0:
+            return []
+
+        first = (
+            max(1, self._pagination_params.first)
+            if self._pagination_params.first is not None
+            else DEFAULT_LIMIT
+        )
+        predicate = await self._authorization_predicate()
+
+        # Number each related entity within its key and count how many lie at or before the
+        # cursor. A page is then the rows numbered after the cursor and one extra row is fetched to
+        # determine if there is a next page.
+        skipped: sa.ColumnElement[int]
+        if self._pagination_params.after is not None:
+            after_id = (
+                sa.select(self.entity_model.id)
+                .where(
+                    self.entity_model.uuid
+                    == self.entity_key_from_cursor(self._pagination_params.after)
+                )
+                .scalar_subquery()
+            )
+            skipped = (
+                sa.func.count()
+                .filter(self.entity_model.id <= after_id)
+                .over(partition_by=self.parent_key_column)
+            )
+        else:
+            skipped = sa.literal(0)
+        subq = (
+            sa.select(
+                self.entity_model.id.label("entity_id"),
+                self.parent_key_column.label("key"),
+                sa.func.row_number()
+                .over(partition_by=self.parent_key_column, order_by=self.entity_model.id)
+                .label("rownum"),
+                skipped.label("skipped"),
+            )
+            .select_from(self.secondary)
+            .join(self.entity_model, self.secondary_join)
+            .where(self.parent_key_column.in_(keys), predicate)
+            .subquery()
+        )
+        stmt = (
+            sa.select(self.entity_model, subq.c.key, subq.c.skipped)
+            .join(subq, self.entity_model.id == subq.c.entity_id)
+            .where(subq.c.rownum > subq.c.skipped, subq.c.rownum <= subq.c.skipped + first + 1)
+            .order_by(subq.c.key, subq.c.rownum)
+            .options(raiseload("*"))
+        )
+        db_entities_by_key = defaultdict[Any, list[_R]](list)
+        has_previous_page_by_key: dict[Any, bool] = {}
+        async with self._session_lock:
+            for entity, key, skipped_count in await self._session.execute(stmt):
+                db_entities_by_key[key].append(entity)
+                has_previous_page_by_key[key] = skipped_count > 0
+
+        return [
+            LoadEdgesResult(
+                edges=[
+                    Edge(cursor=self.cursor_from_entity(entity), node=self.node_factory(entity))
+                    for entity in db_entities_by_key[key][:first]
+                ],
+                has_next_page=len(db_entities_by_key[key]) > first,
+                has_previous_page=has_previous_page_by_key.get(key, False),
+            )
+            for key in keys
+        ]
+
+    async def _load_counts(self, keys: Sequence[Any]) -> Sequence[int]:
+        predicate = await self._authorization_predicate()
+        stmt = (
+            sa.select(self.parent_key_column, sa.func.count())
+            .select_from(self.secondary)
+            .join(self.entity_model, self.secondary_join)
+            .where(self.parent_key_column.in_(keys), predicate)
+            .group_by(self.parent_key_column)
+        )
+        async with self._session_lock:
+            counts_by_key = {
+                key: count for key, count in (await self._session.execute(stmt)).all()
+            }
+        return [counts_by_key.get(key, 0) for key in keys]
+
+
 class EntityConnectionFactory(Generic[_R, _N, _K], ConnectionFactory[_K, _N]):
     """
     A ConnectionFactory which can load lists of objects from the database.
@@ -241,8 +395,10 @@ class EntityConnectionFactory(Generic[_R, _N, _K], ConnectionFactory[_K, _N]):
         pagination_params: PaginationParams,
         mapper: Any,
         node_factory: Callable[[_R], _N],
+        *,
+        authorization: Optional[AuthorizationPredicate] = None,
     ):
-        super().__init__(session, session_lock, pagination_params)
+        super().__init__(session, session_lock, pagination_params, authorization=authorization)
         self.model = sa.inspect(mapper).entity
         self.node_factory = node_factory
 
@@ -255,13 +411,17 @@ class EntityConnectionFactory(Generic[_R, _N, _K], ConnectionFactory[_K, _N]):
         return [self.model.id for _ in keys]
 
     def filter(self, keys: Sequence[_K], stmt: sa.Select[_R]) -> Sequence[sa.Select[_R]]:
-        "For each key, filter the select statement passed to match the required key."
+        """
+        For each key, filter the select statement passed to match the required key. The statement
+        passed has already been restricted to rows visible to the user.
+        """
         return [stmt for _ in keys]
 
     async def _load_edges(self, keys: Sequence[_K]) -> Sequence[LoadEdgesResult[_N]]:
         rvs: list[LoadEdgesResult[_N]] = []
 
-        filtered_selects = self.filter(keys, sa.select(self.model))
+        predicate = await self._authorization_predicate()
+        filtered_selects = self.filter(keys, sa.select(self.model).where(predicate))
         ordering_keys = self.ordering_keys(keys)
 
         for key, filtered_stmt, ordering_key in zip(keys, filtered_selects, ordering_keys):
@@ -329,7 +489,8 @@ class EntityConnectionFactory(Generic[_R, _N, _K], ConnectionFactory[_K, _N]):
 
     async def _load_counts(self, keys: Sequence[_K]) -> Sequence[int]:
         # TODO: there may be some way to coalesce this into a single statement?
-        count_stmt = sa.select(sa.func.count()).select_from(self.model)
+        predicate = await self._authorization_predicate()
+        count_stmt = sa.select(sa.func.count()).select_from(self.model).where(predicate)
         async with self._session_lock:
             return [
                 (await self._session.execute(stmt)).scalar_one()
@@ -1,16 +1,27 @@
-from typing import Any, Generic, NamedTuple, Optional, Sequence, TypeVar
+from typing import Any, Generic, NamedTuple, Optional, Protocol, Sequence, TypeVar
+from uuid import UUID
 
 import strawberry
+from sqlalchemy.orm import Mapped
 from strawberry.dataloader import DataLoader
 
-from ..db.models import ResourceMixin
-
 DEFAULT_LIMIT = 100
 
 
+class Resource(Protocol):
+    """
+    Database model which may back a node. Rows are ordered by their primary key and identified by
+    their UUID in cursors. Most models are resources but roles and permissions have string primary
+    keys.
+    """
+
+    id: Mapped[Any]
+    uuid: Mapped[UUID]
+
+
 @strawberry.type
 class Node:
-    db_resource: strawberry.Private[ResourceMixin]
+    db_resource: strawberry.Private[Resource]
     id: strawberry.ID
 
 
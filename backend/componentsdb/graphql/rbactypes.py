@@ -2,6 +2,7 @@ from typing import Optional
 
 import strawberry
 
+from ..db import models as dbm
 from . import context
 from .paginationtypes import Connection, Node, PaginationParams
 
@@ -13,11 +14,17 @@ class Permission(Node):
 
 @strawberry.type
 class Role(Node):
+    db_resource: strawberry.Private[dbm.Role]
+
     @strawberry.field
     def permissions(
         self, info: strawberry.Info, after: Optional[str] = None, first: Optional[int] = None
     ) -> "Connection[Permission]":
-        raise NotImplementedError()
+        return (
+            context.get_db(info.context)
+            .role_permission_connection(PaginationParams(after=after, first=first))
+            .make_connection(self.db_resource.id)
+        )
 
 
 @strawberry.type
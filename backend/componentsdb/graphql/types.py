@@ -109,7 +109,13 @@ class Query:
 
     @strawberry.field
     async def cabinet(self, info: strawberry.Info, id: strawberry.ID) -> Optional[Cabinet]:
-        return await context.get_db(info.context).cabinet().load(id)
+        cabinet = await context.get_db(info.context).cabinet().load(id)
+        if cabinet is None:
+            return None
+        permissions = await context.get_permissions(info.context)
+        if not permissions.has_permission(context.CABINET_READ_PERMISSION, cabinet.db_resource):
+            return None
+        return cabinet
 
     @strawberry.field
     def components(
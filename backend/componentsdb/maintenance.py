@@ -0,0 +1,295 @@
+"""
+The componentsdb.maintenance module provides housekeeping tasks which stop the database growing
+without bound, such as removing expired tokens.
+"""
+
+import dataclasses
+import datetime
+import re
+from collections.abc import Sequence
+from datetime import timedelta
+from typing import Any, Optional
+
+import sqlalchemy as sa
+import structlog
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql.expression import bindparam
+
+from .db.models import (
+    AccessToken,
+    FederatedUserCredentialJti,
+    FederatedUserCredentialUse,
+    RefreshToken,
+)
+
+LOG = structlog.get_logger()
+
+DEFAULT_RETENTION = timedelta(days=7)
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_LOCK_TIMEOUT = timedelta(seconds=2)
+DEFAULT_PARTITIONS_AHEAD = timedelta(days=14)
+
+# Federated credential uses are partitioned by UTC day with one partition per day named after the
+# day it covers.
+_CREDENTIAL_USE_PARTITION_NAME_PATTERN = re.compile(
+    r"^federated_user_credential_uses_p(?P<date>[0-9]{8})$"
+)
+
+# Uses for a day without a partition are written to the default partition. It is never dropped and
+# so old uses are deleted from it like tokens.
+_CREDENTIAL_USE_DEFAULT_PARTITION = sa.table(
+    f"{FederatedUserCredentialUse.__tablename__}_default",
+    sa.column("id"),
+    sa.column("created_at"),
+)
+
+
+@dataclasses.dataclass
+class SweepResult:
+    "Number of rows removed from each table by sweep()."
+
+    rows_removed: dict[str, int] = dataclasses.field(default_factory=dict)
+    partitions_created: int = 0
+    partitions_dropped: list[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def total_rows_removed(self) -> int:
+        return sum(self.rows_removed.values())
+
+
+@dataclasses.dataclass
+class _SweepTarget:
+    # Model or table to delete rows from.
+    model: Any
+    # Column which uniquely identifies rows within the model's table.
+    key_column: Any
+    # Indexed timestamp column. Rows are removed once this column is older than the retention
+    # window.
+    expiry_column: Any
+
+
+_SWEEP_TARGETS: Sequence[_SweepTarget] = [
+    _SweepTarget(
+        model=AccessToken,
+        key_column=AccessToken.token,
+        expiry_column=AccessToken.expires_at,
+    ),
+    _SweepTarget(
+        model=RefreshToken,
+        key_column=RefreshToken.token,
+        expiry_column=RefreshToken.expires_at,
+    ),
+    _SweepTarget(
+        model=RefreshToken,
+        key_column=RefreshToken.token,
+        expiry_column=RefreshToken.used_at,
+    ),
+    _SweepTarget(
+        model=FederatedUserCredentialJti,
+        key_column=FederatedUserCredentialJti.id,
+        expiry_column=FederatedUserCredentialJti.expires_at,
+    ),
+    _SweepTarget(
+        model=_CREDENTIAL_USE_DEFAULT_PARTITION,
+        key_column=_CREDENTIAL_USE_DEFAULT_PARTITION.c.id,
+        expiry_column=_CREDENTIAL_USE_DEFAULT_PARTITION.c.created_at,
+    ),
+]
+
+
+async def sweep(
+    engine: AsyncEngine,
+    *,
+    retention: timedelta = DEFAULT_RETENTION,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    lock_timeout: timedelta = DEFAULT_LOCK_TIMEOUT,
+    partitions_ahead: timedelta = DEFAULT_PARTITIONS_AHEAD,
+) -> SweepResult:
+    """
+    Remove expired access tokens, expired or used refresh tokens, the jti claims of expired
+    federated credentials and old federated credential uses from the database.
+
+    Token rows are deleted in small batches ordered by the indexed expiry column, each batch in
+    its own transaction. Rows which are locked by some other transaction are skipped and will be
+    picked up by a subsequent sweep. Sweeping is therefore safe to run concurrently from multiple
+    workers.
+
+    Federated credential uses are partitioned by day. Partitions are created ahead of time and
+    whole partitions are dropped once every use within them is older than the retention window.
+    Uses which were written to the default partition because their day had no partition are
+    deleted once they are older than the retention window.
+    Federated credential jti claims are only needed for replay protection while the credential
+    is still valid and so are removed once the credential has expired. The jti claims of
+    credentials without an expiry are never removed.
+
+    Args:
+        engine: database engine to use. Each batch of deletions is committed separately.
+        retention: rows are only removed once they have been expired for at least this long.
+        batch_size: maximum number of rows deleted within a single transaction.
+        lock_timeout: maximum time each batch will wait for a lock before failing.
+        partitions_ahead: federated credential use partitions are created this far in advance.
+
+    Returns: the number of rows removed from each table and the partitions created and dropped.
+    """
+    result = SweepResult()
+    result.partitions_created = await create_credential_use_partitions(
+        engine, ahead=partitions_ahead
+    )
+    result.partitions_dropped = await _drop_expired_credential_use_partitions(
+        engine, retention=retention, lock_timeout=lock_timeout
+    )
+    for target in _SWEEP_TARGETS:
+        table_name = target.key_column.table.name
+        rows_removed = await _sweep_target(
+            engine,
+            target,
+            retention=retention,
+            batch_size=batch_size,
+            lock_timeout=lock_timeout,
+        )
+        result.rows_removed[table_name] = result.rows_removed.get(table_name, 0) + rows_removed
+    return result
+
+
+async def _sweep_target(
+    engine: AsyncEngine,
+    target: _SweepTarget,
+    *,
+    retention: timedelta,
+    batch_size: int,
+    lock_timeout: timedelta,
+) -> int:
+    cutoff = sa.func.now() - bindparam("retention", retention, sa.Interval(native=True))
+    rows_removed = 0
+    last_expiry: Optional[Any] = None
+
+    while True:
+        # Select the next batch of rows in expiry order starting from where the last batch
+        # finished. Starting from the last seen expiry means we don't re-scan index entries for
+        # rows we deleted in the previous batch but which have not yet been vacuumed.
+        batch_select = (
+            sa.select(target.key_column)
+            .where(target.expiry_column < cutoff)
+            .order_by(target.expiry_column)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if last_expiry is not None:
+            batch_select = batch_select.where(target.expiry_column >= last_expiry)
+
+        stmt = (
+            sa.delete(target.model)
+            .where(target.key_column.in_(batch_select))
+            .returning(target.expiry_column)
+            .execution_options(synchronize_session=False)
+        )
+        async with engine.begin() as conn:
+            await _set_lock_timeout(conn, lock_timeout)
+            deleted_expiries = (await conn.execute(stmt)).scalars().all()
+
+        rows_removed += len(deleted_expiries)
+        LOG.debug(
+            "Swept batch of rows",
+            table=target.key_column.table.name,
+            column=target.expiry_column.key,
+            count=len(deleted_expiries),
+        )
+        if len(deleted_expiries) < batch_size:
+            break
+        last_expiry = max(deleted_expiries)
+
+    return rows_removed
+
+
+async def create_credential_use_partitions(
+    engine: AsyncEngine,
+    *,
+    ahead: timedelta = DEFAULT_PARTITIONS_AHEAD,
+    start: Optional[datetime.date] = None,
+) -> int:
+    """
+    Create any missing daily partitions of the federated credential uses table from the start date
+    up to the current date plus the "ahead" interval. Uses for those days which were written to
+    the default partition are moved into the new partitions. This is safe to call concurrently
+    from multiple workers.
+
+    Args:
+        engine: database engine to use.
+        ahead: create partitions at least this far into the future.
+        start: first day to create a partition for. Defaults to the current UTC date.
+
+    Returns: the number of partitions created.
+    """
+    today = sa.cast(sa.func.timezone("UTC", sa.func.now()), sa.Date)
+    from_date = bindparam("start", start, sa.Date) if start is not None else today
+    to_date = sa.cast(
+        sa.func.timezone("UTC", sa.func.now())
+        + bindparam("ahead", ahead, sa.Interval(native=True))
+        + sa.text("interval '1 day'"),
+        sa.Date,
+    )
+    async with engine.begin() as conn:
+        return (
+            await conn.execute(
+                sa.select(
+                    sa.func.create_federated_user_credential_uses_partitions(from_date, to_date)
+                )
+            )
+        ).scalar_one()
+
+
+async def _drop_expired_credential_use_partitions(
+    engine: AsyncEngine, *, retention: timedelta, lock_timeout: timedelta
+) -> list[str]:
+    async with engine.connect() as conn:
+        partition_names = (
+            await conn.execute(
+                sa.text(
+                    """
+                    SELECT c.relname
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'federated_user_credential_uses'::regclass
+                    """
+                )
+            )
+        ).scalars()
+        cutoff = (
+            await conn.execute(
+                sa.select(
+                    sa.func.timezone("UTC", sa.func.now())
+                    - bindparam("retention", retention, sa.Interval(native=True))
+                )
+            )
+        ).scalar_one()
+
+    # A partition can be dropped once the end of the day it covers is before the cutoff.
+    expired_partition_names = []
+    for name in partition_names:
+        match = _CREDENTIAL_USE_PARTITION_NAME_PATTERN.match(name)
+        if match is None:
+            continue
+        partition_date = datetime.datetime.strptime(match.group("date"), "%Y%m%d")
+        if partition_date + timedelta(days=1) <= cutoff:
+            expired_partition_names.append(name)
+
+    # Dropping a partition requires a brief exclusive lock on the parent table and so each drop
+    # happens in its own transaction with a bounded lock timeout.
+    for name in sorted(expired_partition_names):
+        async with engine.begin() as conn:
+            await _set_lock_timeout(conn, lock_timeout)
+            await conn.execute(sa.text(f'DROP TABLE "{name}"'))
+        LOG.info("Dropped federated credential use partition", partition=name)
+
+    return sorted(expired_partition_names)
+
+
+async def _set_lock_timeout(conn, lock_timeout: timedelta):
+    "Set the lock timeout for the remainder of the current transaction."
+    await conn.execute(
+        sa.select(
+            sa.func.set_config(
+                "lock_timeout", f"{int(lock_timeout.total_seconds() * 1e3)}ms", True
+            )
+        )
+    )
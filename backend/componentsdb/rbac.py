@@ -0,0 +1,355 @@
+"""
+The componentsdb.rbac module evaluates role based access control. Users are granted roles either
+globally, for a single cabinet or for some other target resource. Each role grants a set of
+permissions.
+
+Targets name resources hierarchically as a sequence of elements separated by "/", for example
+"cabinet/<uuid>/drawer/<uuid>". A binding on a target also applies to every target beneath it and
+so a user has a permission on a target if it is granted on the target or on any of its ancestors.
+A cabinet binding counts as a binding on the "cabinet/<uuid>" target of its cabinet.
+"""
+
+import dataclasses
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping
+from typing import Optional, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db.models import Cabinet, User, UserEffectivePermission
+
+#: Separator between the elements of a target.
+TARGET_SEPARATOR = "/"
+
+#: First element of the targets which name cabinets.
+CABINET_TARGET_ELEMENT = "cabinet"
+
+#: Channel on which the id of a user is published whenever their effective permissions change.
+#: The payload "*" means that the permissions of any user may have changed.
+PERMISSION_CHANGE_CHANNEL = "componentsdb_permission_changes"
+
+#: Default maximum number of users whose effective permissions are cached.
+DEFAULT_PERMISSIONS_CACHE_MAX_SIZE = 10000
+
+
+def make_target(*elements: Union[str, uuid.UUID]) -> str:
+    """
+    Return the target made up of the passed elements, for example make_target("cabinet",
+    cabinet.uuid).
+
+    Raises:
+        ValueError: no elements were passed or an element was empty or contained the separator
+    """
+    if len(elements) == 0:
+        raise ValueError("A target must have at least one element")
+    str_elements = [str(e) for e in elements]
+    for e in str_elements:
+        if e == "" or TARGET_SEPARATOR in e:
+            raise ValueError(f"Invalid target element: {e!r}")
+    return TARGET_SEPARATOR.join(str_elements)
+
+
+def target_ancestors(target: str) -> list[str]:
+    """
+    Return a target and all of its ancestors starting with the outermost. For example
+    "cabinet/1/drawer/2" has ancestors "cabinet", "cabinet/1" and "cabinet/1/drawer".
+    """
+    elements = target.split(TARGET_SEPARATOR)
+    return [TARGET_SEPARATOR.join(elements[:n]) for n in range(1, len(elements) + 1)]
+
+
+def _target_cabinet_uuid(target: str) -> Optional[uuid.UUID]:
+    "Return the UUID of the cabinet named by a target or None if the target is not a cabinet."
+    elements = target.split(TARGET_SEPARATOR)
+    if len(elements) != 2 or elements[0] != CABINET_TARGET_ELEMENT:
+        return None
+    try:
+        return uuid.UUID(elements[1])
+    except ValueError:
+        return None
+
+
+@dataclasses.dataclass(frozen=True)
+class EffectivePermissions:
+    """
+    The permissions granted to a user by all of their role bindings. Checking a permission is a
+    set lookup and never touches the database.
+    """
+
+    # Permissions granted everywhere.
+    global_permissions: frozenset[str] = frozenset()
+    # Permissions granted within a cabinet keyed by cabinet id.
+    cabinet_permissions: Mapping[int, frozenset[str]] = dataclasses.field(default_factory=dict)
+    # Permissions granted on a target resource keyed by target. Permissions granted within a
+    # cabinet also appear here keyed by the cabinet's target.
+    target_permissions: Mapping[str, frozenset[str]] = dataclasses.field(default_factory=dict)
+
+    def has_permission(self, permission: str, cabinet: Union[Cabinet, int, None] = None) -> bool:
+        """
+        True if the user has a permission globally or, if a cabinet or cabinet id is passed,
+        within that cabinet.
+        """
+        if permission in self.global_permissions:
+            return True
+        if cabinet is None:
+            return False
+        cabinet_id = cabinet.id if isinstance(cabinet, Cabinet) else cabinet
+        return permission in self.cabinet_permissions.get(cabinet_id, frozenset())
+
+    def has_target_permission(self, permission: str, target: str) -> bool:
+        "True if the user has a permission globally or on the passed target or its ancestors."
+        return permission in self.global_permissions or any(
+            permission in self.target_permissions.get(t, frozenset())
+            for t in target_ancestors(target)
+        )
+
+
+#: Effective permissions of a user with no role bindings, such as an unauthenticated user.
+NO_PERMISSIONS = EffectivePermissions()
+
+
+async def effective_permissions(
+    db_session: AsyncSession, user: Optional[User]
+) -> EffectivePermissions:
+    """
+    Resolve the effective permissions of a user across their global, cabinet and target role
+    bindings in a single query. Unauthenticated users, represented by None, have no permissions
+    and no query is made for them.
+
+    Permissions are read from the user_effective_permissions table which triggers keep up to date
+    as role bindings change.
+    """
+    if user is None:
+        return NO_PERMISSIONS
+
+    global_permissions: set[str] = set()
+    cabinet_permissions: dict[int, set[str]] = {}
+    target_permissions: dict[str, set[str]] = {}
+    rows = await db_session.execute(
+        sa.select(
+            UserEffectivePermission.cabinet_id,
+            Cabinet.uuid,
+            UserEffectivePermission.target,
+            UserEffectivePermission.permission_id,
+        )
+        .outerjoin(Cabinet, Cabinet.id == UserEffectivePermission.cabinet_id)
+        .where(UserEffectivePermission.user_id == user.id)
+    )
+    for cabinet_id, cabinet_uuid, target, permission_id in rows:
+        if cabinet_id is not None:
+            cabinet_permissions.setdefault(cabinet_id, set()).add(permission_id)
+            target_permissions.setdefault(
+                make_target(CABINET_TARGET_ELEMENT, cabinet_uuid), set()
+            ).add(permission_id)
+        elif target is not None:
+            target_permissions.setdefault(target, set()).add(permission_id)
+        else:
+            global_permissions.add(permission_id)
+
+    return EffectivePermissions(
+        global_permissions=frozenset(global_permissions),
+        cabinet_permissions={k: frozenset(v) for k, v in cabinet_permissions.items()},
+        target_permissions={k: frozenset(v) for k, v in target_permissions.items()},
+    )
+
+
+async def rebuild_effective_permissions(db_session: AsyncSession) -> int:
+    """
+    Recompute the user_effective_permissions table for all users from their role bindings,
+    returning the number of permissions granted. The table is normally kept up to date by triggers
+    and so a rebuild is only needed if it has been modified directly.
+    """
+    await db_session.execute(
+        sa.select(
+            sa.func.refresh_user_effective_permissions(
+                sa.select(sa.func.array_agg(User.id)).scalar_subquery()
+            )
+        )
+    )
+    return (
+        await db_session.execute(sa.select(sa.func.count()).select_from(UserEffectivePermission))
+    ).scalar_one()
+
+
+def cabinet_permission_predicate(
+    user: Optional[User], permission: str, cabinet_id: sa.ColumnExpressionArgument[int]
+) -> sa.ColumnElement[bool]:
+    """
+    Return a SQL expression which is true if a user has a permission globally or within the
+    cabinet whose id is given by cabinet_id. The expression is an EXISTS probe of the
+    user_effective_permissions index and so is suitable for filtering large numbers of rows in the
+    database. Unauthenticated users, represented by None, have no permissions.
+
+    cabinet_id is usually a column of the rows being filtered, such as Drawer.cabinet_id, but may
+    be any expression correlated with them.
+    """
+    if user is None:
+        return sa.false()
+    return (
+        sa.select(UserEffectivePermission.id)
+        .where(
+            UserEffectivePermission.user_id == user.id,
+            UserEffectivePermission.permission_id == permission,
+            sa.or_(
+                UserEffectivePermission.cabinet_id == cabinet_id,
+                sa.and_(
+                    UserEffectivePermission.cabinet_id.is_(None),
+                    UserEffectivePermission.target.is_(None),
+                ),
+            ),
+        )
+        .exists()
+    )
+
+
+async def permitted_targets(
+    db_session: AsyncSession, user: Optional[User], permission: str, targets: Iterable[str]
+) -> set[str]:
+    """
+    Return those of the passed targets on which a user has a permission, either globally or via a
+    binding on the target or one of its ancestors. A cabinet binding applies to the cabinet's
+    target and the targets beneath it. All targets are checked in a single statement
+    which probes the index of effective permissions for each ancestor and so this is suitable for
+    checking a page of resources at once. Unauthenticated users, represented by None, have no
+    permissions and no query is made for them.
+    """
+    if user is None:
+        return set()
+
+    # Pair each target with each of its ancestors and, if the ancestor is a cabinet, the cabinet's
+    # UUID so that cabinet bindings may be matched.
+    candidate_targets, candidate_ancestors, candidate_cabinet_uuids = [], [], []
+    for target in targets:
+        for ancestor in target_ancestors(target):
+            candidate_targets.append(target)
+            candidate_ancestors.append(ancestor)
+            candidate_cabinet_uuids.append(_target_cabinet_uuid(ancestor))
+    candidates = (
+        sa.func.unnest(
+            sa.bindparam(
+                "candidate_targets", candidate_targets, type_=postgresql.ARRAY(sa.String)
+            ),
+            sa.bindparam(
+                "candidate_ancestors", candidate_ancestors, type_=postgresql.ARRAY(sa.String)
+            ),
+            sa.bindparam(
+                "candidate_cabinet_uuids",
+                candidate_cabinet_uuids,
+                type_=postgresql.ARRAY(sa.UUID),
+            ),
+        )
+        .table_valued("target", "ancestor", "cabinet_uuid")
+        .render_derived()
+    )
+    if len(candidate_targets) == 0:
+        return set()
+
+    stmt = (
+        sa.select(candidates.c.target)
+        .distinct()
+        .where(
+            sa.select(UserEffectivePermission.id)
+            .where(
+                UserEffectivePermission.user_id == user.id,
+                UserEffectivePermission.permission_id == permission,
+                sa.or_(
+                    UserEffectivePermission.target == candidates.c.ancestor,
+                    UserEffectivePermission.cabinet_id
+                    == sa.select(Cabinet.id)
+                    .where(Cabinet.uuid == candidates.c.cabinet_uuid)
+                    .correlate(candidates)
+                    .scalar_subquery(),
+                    sa.and_(
+                        UserEffectivePermission.cabinet_id.is_(None),
+                        UserEffectivePermission.target.is_(None),
+                    ),
+                ),
+            )
+            .exists()
+        )
+    )
+    return set((await db_session.execute(stmt)).scalars())
+
+
+@dataclasses.dataclass
+class PermissionsCacheMetrics:
+    "Metrics describing the use of an EffectivePermissionsCache."
+
+    # Number of lookups which found cached permissions.
+    hits: int = 0
+    # Number of lookups which found nothing.
+    misses: int = 0
+    # Number of entries evicted to keep the cache within its maximum size.
+    evictions: int = 0
+    # Number of times cached permissions were discarded because they may have changed.
+    invalidations: int = 0
+
+
+class EffectivePermissionsCache:
+    """
+    Bounded least-recently-used cache of effective permissions keyed by user id which is shared
+    by all requests handled by a process. Whoever enables the cache is responsible for calling
+    invalidate() whenever a user's permissions change, usually in response to notifications on
+    PERMISSION_CHANGE_CHANNEL. Nothing is cached while the cache is disabled.
+
+    Permissions resolved while an invalidation happens may already be stale and so callers read
+    epoch before resolving permissions and pass it to put(). Permissions are only cached if no
+    invalidation has happened since.
+
+    Args:
+        max_size: maximum number of cached users. A size of zero disables caching.
+    """
+
+    metrics: PermissionsCacheMetrics
+    # True if cached permissions may be used.
+    enabled: bool
+
+    def __init__(self, *, max_size: int = DEFAULT_PERMISSIONS_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self.metrics = PermissionsCacheMetrics()
+        self.enabled = False
+        self._epoch = 0
+        self._entries: OrderedDict[int, EffectivePermissions] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def epoch(self) -> int:
+        "Counter which changes whenever cached permissions are invalidated."
+        return self._epoch
+
+    def get(self, user_id: int) -> Optional[EffectivePermissions]:
+        "Return the cached permissions of a user or None if there are none."
+        permissions = self._entries.get(user_id) if self.enabled else None
+        if permissions is None:
+            self.metrics.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.metrics.hits += 1
+        return permissions
+
+    def put(self, user_id: int, permissions: EffectivePermissions, epoch: int):
+        """
+        Cache the permissions of a user which were resolved after reading epoch. Permissions are
+        not cached if the cache has since been invalidated or is disabled.
+        """
+        if not self.enabled or self.max_size <= 0 or epoch != self._epoch:
+            return
+        self._entries[user_id] = permissions
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.metrics.evictions += 1
+
+    def invalidate(self, user_id: Optional[int] = None):
+        "Discard the cached permissions of a user or, if user_id is None, of all users."
+        self._epoch += 1
+        self.metrics.invalidations += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
@@ -0,0 +1,16 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@pytest.fixture
+def executed_statements(db_engine: AsyncEngine):
+    "List of SQL statements executed by the database engine while the test runs."
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sa.event.listen(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    sa.event.remove(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
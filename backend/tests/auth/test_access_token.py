@@ -71,3 +71,18 @@ async def test_valid_access_token(
 ):
     user = await authentication_provider.authenticate_user_from_access_token(access_token.token)
     assert user.id == token_user.id
+
+
+@pytest.mark.asyncio
+async def test_authentication_is_single_statement(
+    access_token: dbm.AccessToken,
+    token_user: dbm.User,
+    db_session: AsyncSession,
+    authentication_provider: auth.AuthenticationProvider,
+    executed_statements: list[str],
+):
+    await db_session.flush()
+    executed_statements.clear()
+    user = await authentication_provider.authenticate_user_from_access_token(access_token.token)
+    assert len(executed_statements) == 1
+    assert user.id == token_user.id
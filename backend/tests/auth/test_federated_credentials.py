@@ -1,4 +1,5 @@
 import pytest
+import sqlalchemy as sa
 from faker import Faker
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -148,6 +149,30 @@ async def test_cannot_reuse_credentials_with_jti(
         )
 
 
+@pytest.mark.asyncio
+async def test_jti_without_exp_never_expires(
+    db_session: AsyncSession,
+    federated_identity_provider_name: str,
+    federated_credential_user: dbm.User,
+    make_oidc_token,
+    oidc_claims,
+    authentication_provider: auth.AuthenticationProvider,
+):
+    assert "exp" not in oidc_claims
+    await authentication_provider.user_credentials_from_federated_credential(
+        federated_identity_provider_name, make_oidc_token(oidc_claims)
+    )
+
+    expires_at = (
+        await db_session.execute(
+            sa.select(dbm.FederatedUserCredentialJti.expires_at).where(
+                dbm.FederatedUserCredentialJti.jti == oidc_claims["jti"]
+            )
+        )
+    ).scalar_one()
+    assert expires_at is None
+
+
 @pytest.mark.asyncio
 async def test_credendial_not_jwt(
     faker: Faker,
@@ -187,3 +212,41 @@ async def test_credendial_payload_not_dict(
         await authentication_provider.user_credentials_from_federated_credential(
             federated_identity_provider_name, make_oidc_token("not a dict")
         )
+
+
+@pytest.mark.asyncio
+async def test_sign_in_is_single_statement(
+    db_session: AsyncSession,
+    federated_credential_user: dbm.User,
+    federated_identity_provider_name: str,
+    oidc_token: str,
+    authentication_provider: auth.AuthenticationProvider,
+    executed_statements: list[str],
+):
+    await db_session.flush()
+    executed_statements.clear()
+    await authentication_provider.user_credentials_from_federated_credential(
+        federated_identity_provider_name, oidc_token
+    )
+    assert len(executed_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_sign_up_is_two_statements(
+    db_session: AsyncSession,
+    federated_identity_provider_name: str,
+    oidc_token: str,
+    authentication_provider: auth.AuthenticationProvider,
+    executed_statements: list[str],
+):
+    await db_session.flush()
+    executed_statements.clear()
+    credentials = await authentication_provider.create_user_from_federated_credential(
+        federated_identity_provider_name, oidc_token
+    )
+    assert len(executed_statements) == 2
+
+    authenticated_user = await authentication_provider.authenticate_user_from_access_token(
+        credentials.access_token
+    )
+    assert authenticated_user.id == credentials.user.id
@@ -0,0 +1,58 @@
+import pytest
+from faker import Faker
+from responses import RequestsMock
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from componentsdb import auth
+
+
+@pytest.mark.asyncio
+async def test_registry_shares_key_sets(
+    faker: Faker,
+    db_session: AsyncSession,
+    federated_identity_providers: dict[str, auth.FederatedIdentityProvider],
+    federated_identity_provider_name: str,
+    make_oidc_token,
+    oidc_claims,
+    jwks_uri: str,
+    mocked_responses: RequestsMock,
+):
+    registry = auth.FederatedIdentityIssuerRegistry(federated_identity_providers)
+    for _ in range(3):
+        authentication_provider = auth.AuthenticationProvider(
+            db_session=db_session, issuer_registry=registry
+        )
+        with pytest.raises(auth.NoSuchUser):
+            await authentication_provider.user_credentials_from_federated_credential(
+                federated_identity_provider_name,
+                make_oidc_token({**oidc_claims, "jti": faker.uuid4()}),
+            )
+
+    metrics = registry.issuers[federated_identity_provider_name].jwks_fetch_metrics
+    assert metrics.fetches == 1
+    assert metrics.failures == 0
+    assert metrics.last_success_at is not None
+    assert len([c for c in mocked_responses.calls if c.request.url == jwks_uri]) == 1
+
+
+@pytest.mark.asyncio
+async def test_prepare_all(
+    faker: Faker,
+    federated_identity_providers: dict[str, auth.FederatedIdentityProvider],
+    federated_identity_provider_name: str,
+):
+    bad_provider_name = faker.slug()
+    registry = auth.FederatedIdentityIssuerRegistry(
+        {
+            **federated_identity_providers,
+            bad_provider_name: auth.FederatedIdentityProvider(
+                issuer=faker.url(schemes=["https"]), audience=faker.slug()
+            ),
+        }
+    )
+
+    # Failure to prepare one issuer should not prevent others being prepared.
+    await registry.prepare_all()
+    assert registry.issuers[federated_identity_provider_name].is_prepared
+    assert not registry.issuers[bad_provider_name].is_prepared
+    assert registry.issuers[bad_provider_name].jwks_fetch_metrics.failures == 1
@@ -81,3 +81,20 @@ async def test_used_refresh_token(
 
     with pytest.raises(auth.InvalidRefreshTokenError):
         await authentication_provider.user_credentials_from_refresh_token(refresh_token.token)
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_single_statement(
+    token_user: dbm.User,
+    db_session: AsyncSession,
+    refresh_token: dbm.RefreshToken,
+    authentication_provider: auth.AuthenticationProvider,
+    executed_statements: list[str],
+):
+    await db_session.flush()
+    executed_statements.clear()
+    credentials = await authentication_provider.user_credentials_from_refresh_token(
+        refresh_token.token
+    )
+    assert len(executed_statements) == 1
+    assert credentials.user.id == token_user.id
@@ -0,0 +1,63 @@
+import uuid
+from collections.abc import Sequence
+
+import pytest
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from componentsdb import auth
+from componentsdb.db import models as dbm
+
+
+@pytest.mark.asyncio
+async def test_revoke_user_tokens(
+    faker: Faker,
+    db_session: AsyncSession,
+    users: Sequence[dbm.User],
+    authentication_provider: auth.AuthenticationProvider,
+):
+    user, other_user = faker.random_elements(users, length=2, unique=True)
+    credentials = [await authentication_provider.create_user_credentials(user) for _ in range(3)]
+    other_credentials = await authentication_provider.create_user_credentials(other_user)
+
+    assert await authentication_provider.revoke_user_tokens(user.uuid) == 6
+
+    for c in credentials:
+        with pytest.raises(auth.InvalidAccessTokenError):
+            await authentication_provider.authenticate_user_from_access_token(c.access_token)
+        with pytest.raises(auth.InvalidRefreshTokenError):
+            await authentication_provider.user_credentials_from_refresh_token(c.refresh_token)
+
+    # Other users are unaffected.
+    assert (
+        await authentication_provider.authenticate_user_from_access_token(
+            other_credentials.access_token
+        )
+    ).id == other_user.id
+
+    # Revoking again is harmless.
+    assert await authentication_provider.revoke_user_tokens(user.uuid) == 0
+
+
+@pytest.mark.asyncio
+async def test_revoke_is_single_statement(
+    faker: Faker,
+    db_session: AsyncSession,
+    users: Sequence[dbm.User],
+    authentication_provider: auth.AuthenticationProvider,
+    executed_statements: list[str],
+):
+    user = faker.random_element(users)
+    await authentication_provider.create_user_credentials(user)
+    await db_session.flush()
+    executed_statements.clear()
+    await authentication_provider.revoke_user_tokens(user.uuid)
+    assert len(executed_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_revoke_unknown_user(
+    users: Sequence[dbm.User], authentication_provider: auth.AuthenticationProvider
+):
+    with pytest.raises(auth.NoSuchUser):
+        await authentication_provider.revoke_user_tokens(uuid.uuid4())
@@ -0,0 +1,42 @@
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@pytest_asyncio.fixture
+async def db_engine(db_engine: AsyncEngine):
+    # Logging each statement would dominate the timings.
+    db_engine.echo = False
+    return db_engine
+
+
+@pytest.fixture
+def run_benchmark(capsys: pytest.CaptureFixture):
+    """
+    Call an async function repeatedly and report the number of calls per second along with latency
+    percentiles. The function is passed the iteration number.
+    """
+
+    async def run(name: str, f: Callable[[int], Awaitable], iterations: int = 500) -> float:
+        latencies = []
+        start = time.perf_counter()
+        for iteration in range(iterations):
+            call_start = time.perf_counter()
+            await f(iteration)
+            latencies.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+        rate = iterations / elapsed
+        percentiles = statistics.quantiles(latencies, n=100)
+        with capsys.disabled():
+            print(
+                f"\n{name}: {rate:.1f} per second ({1e3 * elapsed / iterations:.2f} ms each, "
+                f"p50 {1e3 * percentiles[49]:.2f} ms, p95 {1e3 * percentiles[94]:.2f} ms, "
+                f"p99 {1e3 * percentiles[98]:.2f} ms)"
+            )
+        return rate
+
+    return run
@@ -0,0 +1,88 @@
+import time
+from collections.abc import Sequence
+from typing import Any
+
+import pytest
+from faker import Faker
+
+from componentsdb import auth
+from componentsdb.db import models as dbm
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.mark.asyncio
+async def test_federated_credential_sign_in(
+    request: pytest.FixtureRequest,
+    faker: Faker,
+    federated_credential_user: dbm.User,
+    federated_identity_provider_name: str,
+    make_oidc_token,
+    oidc_claims: dict[str, Any],
+    authentication_provider: auth.AuthenticationProvider,
+    run_benchmark,
+):
+    iterations = 500
+
+    # Each sign in uses a fresh credential since credentials with a "jti" claim may only be used
+    # once. Credentials are minted up front so that signing them is not part of the timings.
+    exp = int(time.time()) + 3600
+    credentials = [
+        make_oidc_token({**oidc_claims, "jti": faker.uuid4(), "exp": exp})
+        for _ in range(iterations)
+    ]
+
+    # Fetch the issuer's key set outside of the timed loop.
+    await authentication_provider.federated_identity_providers[
+        federated_identity_provider_name
+    ].prepare()
+
+    async def sign_in(iteration):
+        user_credentials = (
+            await authentication_provider.user_credentials_from_federated_credential(
+                federated_identity_provider_name, credentials[iteration]
+            )
+        )
+        assert user_credentials.user.id == federated_credential_user.id
+
+    alg = request.node.callspec.params["make_oidc_token"]
+    await run_benchmark(f"{alg} federated credential sign in", sign_in, iterations=iterations)
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation(
+    faker: Faker,
+    users: Sequence[dbm.User],
+    authentication_provider: auth.AuthenticationProvider,
+    run_benchmark,
+):
+    credentials = await authentication_provider.create_user_credentials(
+        faker.random_element(users)
+    )
+
+    async def refresh(_):
+        nonlocal credentials
+        credentials = await authentication_provider.user_credentials_from_refresh_token(
+            credentials.refresh_token
+        )
+
+    await run_benchmark("Refresh token rotation", refresh, iterations=1000)
+
+
+@pytest.mark.asyncio
+async def test_access_token_authentication(
+    faker: Faker,
+    users: Sequence[dbm.User],
+    authentication_provider: auth.AuthenticationProvider,
+    run_benchmark,
+):
+    user = faker.random_element(users)
+    credentials = await authentication_provider.create_user_credentials(user)
+
+    async def authenticate(_):
+        authenticated_user = await authentication_provider.authenticate_user_from_access_token(
+            credentials.access_token
+        )
+        assert authenticated_user.id == user.id
+
+    await run_benchmark("Access token authentication", authenticate, iterations=2000)
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from componentsdb.federatedidentity import OIDCTokenIssuer
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.mark.asyncio
+async def test_token_validation(
+    request: pytest.FixtureRequest,
+    oidc_token: str,
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+    run_benchmark,
+):
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+
+    async def validate(_):
+        assert issuer.validate(oidc_token) == oidc_claims
+
+    # Validation is CPU bound and single threaded so this is the rate per core.
+    alg = request.node.callspec.params["make_oidc_token"]
+    await run_benchmark(f"{alg} token validation", validate, iterations=2000)
+
+
+@pytest.mark.asyncio
+async def test_cached_token_validation(
+    request: pytest.FixtureRequest,
+    make_oidc_token,
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+    run_benchmark,
+):
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    claims = {**oidc_claims, "exp": int(time.time()) + 3600}
+    token = make_oidc_token(claims)
+
+    async def validate(_):
+        assert issuer.validate(token) == claims
+
+    alg = request.node.callspec.params["make_oidc_token"]
+    await run_benchmark(f"{alg} cached token validation", validate, iterations=2000)
@@ -171,6 +171,11 @@ async def users(faker: Faker, db_session: AsyncSession, db_session_lock: asyncio
     return users
 
 
+@pytest.fixture
+def user(faker: Faker, users: list[m.User]) -> m.User:
+    return faker.random_element(users)
+
+
 @pytest_asyncio.fixture
 async def access_tokens(
     faker: Faker, db_session: AsyncSession, db_session_lock: asyncio.Lock, users: list[m.User]
@@ -8,7 +8,12 @@ from httpx import ASGITransport, AsyncClient
 from componentsdb.auth import AuthenticationProvider
 from componentsdb.db import models as dbm
 from componentsdb.fastapi import app
-from componentsdb.fastapi.db import get_db_session
+from componentsdb.fastapi.db import (
+    PoolOptions,
+    _get_db_engine,
+    get_db_session,
+    get_db_session_release,
+)
 from componentsdb.fastapi.settings import Settings, load_settings
 
 
@@ -32,6 +37,10 @@ def override_dependencies(faker: Faker, db_session, federated_identity_providers
         yield db_session
         await db_session.flush()
 
+    def _get_db_session_release():
+        # Committing would end the test transaction.
+        return db_session.flush
+
     def _load_settings():
         return TestSettings(
             sqlalchemy_db_url=faker.url(schemes=["postgresql+asyncpg"]),
@@ -39,9 +48,21 @@ def override_dependencies(faker: Faker, db_session, federated_identity_providers
         )
 
     app.dependency_overrides[get_db_session] = _get_db_session
+    app.dependency_overrides[get_db_session_release] = _get_db_session_release
     app.dependency_overrides[load_settings] = _load_settings
 
 
+@pytest_asyncio.fixture
+async def pooled_engine(db_url: str):
+    "Engine with a pool of one connection and one overflow connection which times out quickly."
+    engine = _get_db_engine(
+        db_url, PoolOptions(pool_size=1, max_overflow=1, pool_timeout=0.1, command_timeout=5)
+    )
+    yield engine
+    await engine.dispose()
+    _get_db_engine.cache_clear()
+
+
 @pytest.fixture
 def httpx_client_kwargs():
     return {"transport": ASGITransport(app=app), "base_url": "https://test.invalid"}
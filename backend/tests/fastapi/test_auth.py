@@ -3,6 +3,7 @@ from faker import Faker
 from gql import gql
 from gql.client import AsyncClientSession
 from gql.transport.exceptions import TransportServerError
+from httpx import AsyncClient
 
 
 @pytest.mark.asyncio
@@ -20,13 +21,36 @@ async def test_authenticated(gql_session: AsyncClientSession, authenticated_user
 
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize("scheme", ["Not-Bearer", "Bearer"])
-async def test_bad_auth(scheme: str, faker: Faker, make_gql_client, authenticated_user):
+async def test_bad_auth_scheme(faker: Faker, make_gql_client, authenticated_user):
     with pytest.raises(TransportServerError) as excinfo:
         async with make_gql_client(
             transport_kwargs={
-                "headers": {"Authorization": f"{scheme} {faker.uuid4()}"},
+                "headers": {"Authorization": f"Not-Bearer {faker.uuid4()}"},
             },
         ) as session:
             await session.execute(gql("query { auth { authenticatedUser { id } } }"))
     assert excinfo.value.code == 403
+
+
+@pytest.mark.asyncio
+async def test_bad_access_token(faker: Faker, unauthenticated_client: AsyncClient):
+    r = await unauthenticated_client.post(
+        "/graphql",
+        json={"query": "query { auth { authenticatedUser { id } } }"},
+        headers={"Authorization": f"Bearer {faker.slug()}"},
+    )
+    assert r.status_code == 403
+    assert r.json()["errors"][0]["path"] == ["auth", "authenticatedUser"]
+
+
+@pytest.mark.asyncio
+async def test_access_token_only_verified_when_needed(
+    faker: Faker, unauthenticated_client: AsyncClient
+):
+    r = await unauthenticated_client.post(
+        "/graphql",
+        json={"query": "query { auth { federatedIdentityProviders { name } } }"},
+        headers={"Authorization": f"Bearer {faker.slug()}"},
+    )
+    assert r.status_code == 200
+    assert "errors" not in r.json()
@@ -0,0 +1,70 @@
+import pytest
+import sqlalchemy as sa
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import NullPool
+
+from componentsdb.fastapi import app
+from componentsdb.fastapi.db import (
+    InstrumentedPool,
+    engine_for_settings,
+    get_db_engine,
+    listener_engine_for_settings,
+)
+from componentsdb.fastapi.settings import Settings
+
+
+@pytest.mark.asyncio
+async def test_pool_options(pooled_engine: AsyncEngine):
+    pool = pooled_engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedPool)
+    assert pool.size() == 1
+    assert pool.timeout() == 0.1
+
+
+@pytest.mark.asyncio
+async def test_checkout_metrics(pooled_engine: AsyncEngine):
+    pool = pooled_engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedPool)
+    async with pooled_engine.connect() as first, pooled_engine.connect() as second:
+        assert (await first.execute(sa.select(1))).scalar_one() == 1
+        assert (await second.execute(sa.select(1))).scalar_one() == 1
+        assert pool.checkedout() == 2
+        assert pool.overflow() == 1
+
+        # Both the pool and its overflow are in use and so a third checkout times out.
+        with pytest.raises(sa.exc.TimeoutError):
+            async with pooled_engine.connect():
+                pass
+
+    assert pool.checkedout() == 0
+    assert pool.metrics.checkouts == 2
+    assert pool.metrics.checkout_timeouts == 1
+    assert pool.metrics.max_checkout_wait >= 0.1
+    assert pool.metrics.total_checkout_wait >= pool.metrics.max_checkout_wait
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics(unauthenticated_client: AsyncClient, pooled_engine: AsyncEngine):
+    app.dependency_overrides[get_db_engine] = lambda: pooled_engine
+    try:
+        async with pooled_engine.connect() as connection:
+            await connection.execute(sa.select(1))
+            response = await unauthenticated_client.get("/metrics")
+    finally:
+        del app.dependency_overrides[get_db_engine]
+    assert response.status_code == 200
+    metrics = response.json()["db_pool"]
+    assert metrics["size"] == 1
+    assert metrics["max_overflow"] == 1
+    assert metrics["checked_out"] == 1
+    assert metrics["overflow"] == 0
+    assert metrics["checkouts"] == 1
+    assert metrics["checkout_timeouts"] == 0
+
+
+def test_listener_engine_outside_pool(db_url: str):
+    settings = Settings(sqlalchemy_db_url=db_url)
+    listener_engine = listener_engine_for_settings(settings)
+    assert isinstance(listener_engine.sync_engine.pool, NullPool)
+    assert listener_engine is not engine_for_settings(settings)
@@ -0,0 +1,59 @@
+import pytest
+import sqlalchemy as sa
+from gql import gql
+from gql.client import AsyncClientSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette.requests import Request
+
+from componentsdb.fastapi import app
+from componentsdb.fastapi.db import (
+    InstrumentedPool,
+    get_db_session,
+    get_db_session_release,
+    get_session_maker,
+)
+
+
+@pytest.mark.asyncio
+async def test_connection_checked_out_lazily(pooled_engine: AsyncEngine):
+    pool = pooled_engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedPool)
+    request = Request({"type": "http"})
+    session_generator = get_db_session(request, get_session_maker(pooled_engine))
+    session = await anext(session_generator)
+
+    # No connection is needed until the first statement is executed.
+    assert pool.checkedout() == 0
+    await session.execute(sa.select(1))
+    assert pool.checkedout() == 1
+
+    # Releasing the session returns the connection while the session remains usable.
+    await get_db_session_release(session)()
+    assert pool.checkedout() == 0
+    await session.execute(sa.select(1))
+    assert pool.checkedout() == 1
+
+    with pytest.raises(StopAsyncIteration):
+        await anext(session_generator)
+    assert pool.checkedout() == 0
+    assert request.state.sql_execution_count == 2
+
+
+@pytest.mark.asyncio
+async def test_released_after_execution(
+    db_session: AsyncSession, unauthenticated_gql_session: AsyncClientSession
+):
+    releases = []
+
+    async def release():
+        releases.append(None)
+        await db_session.flush()
+
+    app.dependency_overrides[get_db_session_release] = lambda: release
+    try:
+        await unauthenticated_gql_session.execute(
+            gql("query { auth { authenticatedUser { id } } }")
+        )
+    finally:
+        del app.dependency_overrides[get_db_session_release]
+    assert len(releases) == 1
@@ -0,0 +1,46 @@
+import asyncio
+import gc
+import time
+
+import pytest
+
+from componentsdb.fastapi.eventloop import EventLoopLagMonitor
+from componentsdb.federatedidentity import AsyncOIDCTokenIssuer, VerificationExecutor
+
+
+@pytest.mark.asyncio
+async def test_lag_detected():
+    monitor = EventLoopLagMonitor(sample_interval=0.01, warning_threshold=0.05)
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.05)
+    # Block the event loop.
+    time.sleep(0.2)
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert monitor.max_lag >= 0.15
+    assert monitor.threshold_exceeded_count >= 1
+
+
+@pytest.mark.asyncio
+async def test_sign_in_burst_lag_below_threshold(
+    oidc_token: str, oidc_claims, jwt_issuer: str, oidc_audience: str
+):
+    # Queue the whole burst rather than shedding any of it.
+    executor = VerificationExecutor(max_workers=4, max_pending=16, max_queued=500)
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience, verification_executor=executor)
+    await issuer.prepare()
+    # Garbage left by earlier tests would otherwise be collected during the burst and a full
+    # collection stalls the event loop irrespective of how tokens are verified.
+    gc.collect()
+    monitor = EventLoopLagMonitor(sample_interval=0.01, warning_threshold=0.1)
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.02)
+    try:
+        results = await asyncio.gather(*(issuer.async_validate(oidc_token) for _ in range(500)))
+        # Let the monitor take a sample covering the end of the burst.
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+        executor.shutdown()
+    assert all(r == oidc_claims for r in results)
+    assert monitor.max_lag < monitor.warning_threshold
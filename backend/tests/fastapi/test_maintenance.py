@@ -0,0 +1,44 @@
+import asyncio
+import datetime
+
+import pytest
+import sqlalchemy as sa
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from componentsdb.fastapi.maintenance import (
+    run_periodic_partition_creation,
+    run_periodic_sweep,
+)
+from componentsdb.fastapi.settings import Settings
+
+
+@pytest.mark.asyncio
+async def test_partitions_created_with_sweep_disabled(faker: Faker, db_engine: AsyncEngine):
+    settings = Settings(
+        sqlalchemy_db_url=faker.url(schemes=["postgresql+asyncpg"]),
+        maintenance_sweep_interval=None,
+    )
+    last_day = datetime.datetime.now(datetime.UTC).date() + datetime.timedelta(days=14)
+    partition_name = f"federated_user_credential_uses_p{last_day:%Y%m%d}"
+    async with db_engine.begin() as conn:
+        await conn.execute(sa.text(f"DROP TABLE IF EXISTS {partition_name}"))
+
+    # Sweeping returns immediately when disabled.
+    await run_periodic_sweep(db_engine, settings)
+
+    task = asyncio.create_task(run_periodic_partition_creation(db_engine, settings))
+    try:
+        for _ in range(50):
+            async with db_engine.connect() as conn:
+                partition_exists = (
+                    await conn.execute(sa.select(sa.func.to_regclass(partition_name)))
+                ).scalar_one() is not None
+            if partition_exists:
+                break
+            await asyncio.sleep(0.1)
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    assert partition_exists
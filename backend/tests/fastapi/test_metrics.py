@@ -0,0 +1,67 @@
+import pytest
+from httpx import AsyncClient
+
+from componentsdb.auth import FederatedIdentityIssuerRegistry
+from componentsdb.fastapi import app
+from componentsdb.federatedidentity import VerificationExecutor
+
+
+@pytest.fixture
+def issuer_registry(federated_identity_providers):
+    app.state.issuer_registry = FederatedIdentityIssuerRegistry(federated_identity_providers)
+    yield app.state.issuer_registry
+    del app.state.issuer_registry
+
+
+@pytest.mark.asyncio
+async def test_jwks_fetch_metrics(
+    unauthenticated_client: AsyncClient,
+    issuer_registry: FederatedIdentityIssuerRegistry,
+    federated_identity_provider_name: str,
+    jwt_issuer: str,
+):
+    await issuer_registry.prepare_all()
+    response = await unauthenticated_client.get("/metrics")
+    assert response.status_code == 200
+    metrics = response.json()["jwks_fetches"][federated_identity_provider_name]
+    assert metrics["issuer"] == jwt_issuer
+    assert metrics["prepared"]
+    assert metrics["fetches"] == 1
+    assert metrics["failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_token_verification_metrics(
+    unauthenticated_client: AsyncClient, federated_identity_providers
+):
+    executor = VerificationExecutor(max_workers=2, max_pending=8)
+    app.state.issuer_registry = FederatedIdentityIssuerRegistry(
+        federated_identity_providers, verification_executor=executor
+    )
+    try:
+        response = await unauthenticated_client.get("/metrics")
+    finally:
+        del app.state.issuer_registry
+        executor.shutdown()
+    assert response.status_code == 200
+    metrics = response.json()["token_verification"]
+    assert metrics["max_workers"] == 2
+    assert metrics["max_pending"] == 8
+    assert metrics["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_metrics(
+    unauthenticated_client: AsyncClient,
+    issuer_registry: FederatedIdentityIssuerRegistry,
+    federated_identity_provider_name: str,
+):
+    await issuer_registry.prepare_all()
+    response = await unauthenticated_client.get("/metrics")
+    assert response.status_code == 200
+    metrics = response.json()["circuit_breakers"][federated_identity_provider_name]
+    assert metrics["state"] == "closed"
+    assert metrics["consecutive_failures"] == 0
+    assert metrics["retry_after_seconds"] == 0
+    assert metrics["opened"] == 0
+    assert metrics["rejected"] == 0
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Optional
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from componentsdb.fastapi.notifications import NotificationListener
+
+CHANNEL = "componentsdb_test_notifications"
+
+
+class IntegerListener(NotificationListener[int]):
+    def parse_payload(self, payload: str) -> int:
+        return int(payload)
+
+
+async def _wait_for(predicate, timeout: float = 5.0):
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+async def _notify(db_engine: AsyncEngine, payload: str):
+    async with db_engine.begin() as connection:
+        await connection.execute(sa.select(sa.func.pg_notify(CHANNEL, payload)))
+
+
+@pytest.fixture
+def received() -> list[Optional[int]]:
+    "Values passed to the listener's subscribers."
+    return []
+
+
+@pytest_asyncio.fixture
+async def listener(db_engine: AsyncEngine, received: list[Optional[int]]):
+    listener = IntegerListener(CHANNEL, health_check_interval=0.1, reconnect_interval=0.1)
+    listener.subscribe(received.append)
+    task = asyncio.create_task(listener.run(db_engine))
+    await _wait_for(lambda: listener.is_listening)
+    yield listener
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_state_discarded_when_listening_starts(
+    listener: IntegerListener, received: list[Optional[int]]
+):
+    assert received == [None]
+    assert listener.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_committed_notification_published(
+    db_engine: AsyncEngine, listener: IntegerListener, received: list[Optional[int]]
+):
+    async with db_engine.begin() as connection:
+        await connection.execute(sa.select(sa.func.pg_notify(CHANNEL, "42")))
+
+        # Nothing is published until the transaction is committed.
+        await asyncio.sleep(0.1)
+        assert received == [None]
+
+    await _wait_for(lambda: len(received) == 2)
+    assert received[1] == 42
+    assert listener.notifications_received == 1
+
+
+@pytest.mark.asyncio
+async def test_malformed_notification_ignored(
+    db_engine: AsyncEngine, listener: IntegerListener, received: list[Optional[int]]
+):
+    await _notify(db_engine, "not-an-integer")
+    await _wait_for(lambda: listener.notifications_received == 1)
+    assert received == [None]
+
+
+@pytest.mark.asyncio
+async def test_reconnects_after_connection_lost(
+    db_engine: AsyncEngine, listener: IntegerListener, received: list[Optional[int]]
+):
+    states = []
+    listener.subscribe(lambda _: states.append(listener.is_listening))
+    async with db_engine.begin() as connection:
+        await connection.execute(
+            sa.text(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE pid <> pg_backend_pid() AND usename = current_user "
+                "AND (query ILIKE '%LISTEN%' OR query = 'SELECT 1')"
+            )
+        )
+    await _wait_for(lambda: listener.connections == 2)
+
+    # State is discarded when the connection is lost and again once listening resumes.
+    assert received == [None, None, None]
+    assert states == [False, True]
@@ -0,0 +1,109 @@
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from componentsdb import rbac
+from componentsdb.db import fakes
+from componentsdb.db import models as dbm
+from componentsdb.fastapi.permissions import PermissionChangeListener
+
+PERMISSIONS = rbac.EffectivePermissions(global_permissions=frozenset({"cabinet.read"}))
+
+
+async def _wait_for(predicate, timeout: float = 5.0):
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def listener(db_engine: AsyncEngine):
+    listener = PermissionChangeListener(
+        rbac.EffectivePermissionsCache(), health_check_interval=0.1, reconnect_interval=0.1
+    )
+    task = asyncio.create_task(listener.run(db_engine))
+    await _wait_for(lambda: listener.is_listening)
+    yield listener
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest_asyncio.fixture
+async def user(faker: Faker, db_engine: AsyncEngine) -> AsyncGenerator[dbm.User, None]:
+    user = fakes.fake_user(faker)
+    async with async_sessionmaker(db_engine, expire_on_commit=False).begin() as session:
+        session.add(user)
+    yield user
+    # Migrations remove the seeded roles when downgrading and so bindings to them must be removed.
+    async with db_engine.begin() as connection:
+        await connection.execute(
+            sa.delete(dbm.UserGlobalRoleBinding).where(
+                dbm.UserGlobalRoleBinding.user_id == user.id
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_cache_enabled_while_listening(listener: PermissionChangeListener):
+    assert listener.cache.enabled
+
+
+@pytest.mark.asyncio
+async def test_binding_change_invalidates_user(
+    db_engine: AsyncEngine, listener: PermissionChangeListener, user: dbm.User
+):
+    other_user_id = user.id + 1
+    for user_id in (user.id, other_user_id):
+        listener.cache.put(user_id, PERMISSIONS, listener.cache.epoch)
+
+    async with db_engine.begin() as connection:
+        await connection.execute(
+            sa.insert(dbm.UserGlobalRoleBinding).values(
+                user_id=user.id, role_id="role/cabinetViewer"
+            )
+        )
+        # Nothing is published until the change is committed.
+        await asyncio.sleep(0.1)
+        assert listener.notifications_received == 0
+
+    await _wait_for(lambda: listener.cache.get(user.id) is None)
+    assert listener.cache.get(other_user_id) is PERMISSIONS
+
+
+@pytest.mark.asyncio
+async def test_wildcard_invalidates_all(
+    db_engine: AsyncEngine, listener: PermissionChangeListener
+):
+    listener.cache.put(1, PERMISSIONS, listener.cache.epoch)
+    async with db_engine.begin() as connection:
+        await connection.execute(sa.select(sa.func.pg_notify(rbac.PERMISSION_CHANGE_CHANNEL, "*")))
+    await _wait_for(lambda: len(listener.cache) == 0)
+    assert listener.cache.enabled
+
+
+@pytest.mark.asyncio
+async def test_cache_disabled_when_connection_lost(
+    db_engine: AsyncEngine, listener: PermissionChangeListener
+):
+    listener.cache.put(1, PERMISSIONS, listener.cache.epoch)
+    states = []
+    listener.subscribe(lambda _: states.append((listener.cache.enabled, len(listener.cache))))
+    async with db_engine.begin() as connection:
+        await connection.execute(
+            sa.text(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE pid <> pg_backend_pid() AND usename = current_user "
+                "AND (query ILIKE '%LISTEN%' OR query = 'SELECT 1')"
+            )
+        )
+    await _wait_for(lambda: listener.connections == 2)
+
+    # The cache is emptied and disabled when the connection is lost and re-enabled once listening
+    # resumes.
+    assert states == [(False, 0), (True, 0)]
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from typing import Mapping, Optional
+
+import pytest
+import responses
+from jwcrypto.jwk import JWKSet
+
+from componentsdb.federatedidentity import (
+    AsyncOIDCTokenIssuer,
+    CircuitBreaker,
+    CircuitState,
+    OIDCTokenIssuer,
+)
+from componentsdb.federatedidentity import exceptions as exc
+from componentsdb.federatedidentity.transport import AsyncRequestBase, Response
+
+
+class SlowTransport(AsyncRequestBase):
+    "Transport which never responds in time and records the timeouts it was passed."
+
+    def __init__(self) -> None:
+        self.timeouts: list[Optional[float]] = []
+
+    async def __call__(
+        self,
+        url: str,
+        body: Optional[bytes] = None,
+        method: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        self.timeouts.append(timeout)
+        # Ignore the timeout to check that the issuer enforces its deadline itself.
+        await asyncio.sleep(10)
+        raise AssertionError("unreachable")
+
+
+def test_circuit_opens_after_threshold():
+    durations = []
+
+    def open_duration(n: int) -> float:
+        durations.append(n)
+        return 60
+
+    breaker = CircuitBreaker(failure_threshold=2, open_duration=open_duration)
+    assert breaker.state is CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.metrics.rejected == 1
+    assert breaker.metrics.opened == 1
+    assert 59 < breaker.retry_after() <= 60
+
+    # Once the open period has passed a trial request is allowed. Should it fail the circuit
+    # re-opens for longer.
+    breaker.open_until = time.monotonic()
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.metrics.opened == 2
+    assert durations == [1, 2]
+
+    # A successful trial closes the circuit.
+    breaker.open_until = time.monotonic()
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.consecutive_failures == 0
+    assert breaker.retry_after() == 0
+
+
+def test_invalid_failure_threshold():
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+def test_cached_key_set_used_while_open(
+    oidc_token: str,
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    jwk_set: JWKSet,
+    mocked_responses: responses.RequestsMock,
+):
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    assert issuer._cached_key_set is not None
+    issuer._cached_key_set.fetched_at -= issuer._cached_key_set.max_age
+    mocked_responses.replace("GET", jwks_uri, status=503)
+
+    issuer.prepare()
+    assert issuer.circuit_breaker.state is CircuitState.OPEN
+    mocked_responses.assert_call_count(jwks_uri, 2)
+
+    # While the circuit is open, the issuer is not contacted and the expired key set is used.
+    issuer.prepare()
+    issuer.validate(oidc_token)
+    mocked_responses.assert_call_count(jwks_uri, 2)
+    assert issuer.circuit_breaker.metrics.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_deadline(jwt_issuer: str, oidc_audience: str):
+    transport = SlowTransport()
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience, request=transport, fetch_timeout=0.1)
+    start = time.monotonic()
+    with pytest.raises(exc.TransportError):
+        await issuer.prepare()
+    assert time.monotonic() - start < 1
+    assert len(transport.timeouts) == 1
+    timeout = transport.timeouts[0]
+    assert timeout is not None and 0 < timeout <= 0.1
+    assert issuer.circuit_breaker.state is CircuitState.OPEN
+    assert issuer.jwks_fetch_metrics.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_failure_threshold_honoured(
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    mocked_responses: responses.RequestsMock,
+):
+    mocked_responses.replace("GET", jwks_uri, status=503)
+    issuer = AsyncOIDCTokenIssuer(
+        jwt_issuer, oidc_audience, circuit_breaker=CircuitBreaker(failure_threshold=3)
+    )
+    for _ in range(5):
+        with pytest.raises(exc.TransportError):
+            await issuer.prepare()
+    mocked_responses.assert_call_count(jwks_uri, 3)
+    assert issuer.circuit_breaker.metrics.rejected == 2
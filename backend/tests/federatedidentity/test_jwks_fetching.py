@@ -57,6 +57,22 @@ def test_discovery_doc_not_json(jwt_issuer: str, mocked_responses):
         oidc.fetch_jwks(jwt_issuer, request)
 
 
+@pytest.mark.parametrize("body", ["this is not json", "[]", '{"keys": 3}', '{"keys": [1]}'])
+def test_jwks_malformed(body: str, jwt_issuer: str, jwks_uri: str, mocked_responses):
+    mocked_responses.replace("GET", jwks_uri, body=body, content_type="application/json")
+    with pytest.raises(exceptions.InvalidJWKSError):
+        oidc.fetch_jwks(jwt_issuer, request)
+
+
+@pytest.mark.asyncio
+async def test_jwks_malformed_async(jwt_issuer: str, jwks_uri: str, mocked_responses):
+    mocked_responses.replace(
+        "GET", jwks_uri, body="this is not json", content_type="application/json"
+    )
+    with pytest.raises(exceptions.InvalidJWKSError):
+        await oidc.async_fetch_jwks(jwt_issuer, async_request)
+
+
 def test_mismatched_issuer_in_discovery_doc(faker: Faker, jwt_issuer: str, mocked_responses):
     doc_url = oidc.oidc_discovery_document_url(oidc.validate_issuer(jwt_issuer))
     doc = json.loads(request(doc_url).content)
@@ -0,0 +1,229 @@
+import asyncio
+import time
+
+import pytest
+import responses
+from faker import Faker
+from jwcrypto.jwk import JWK, JWKSet
+
+from componentsdb.federatedidentity import AsyncOIDCTokenIssuer, OIDCTokenIssuer
+from componentsdb.federatedidentity import exceptions as exc
+from componentsdb.federatedidentity import keysetcache
+
+from ..oidcfixtures import make_jwt
+
+
+def _age_key_set(issuer, fraction_of_max_age: float):
+    "Make the issuer's cached key set appear to have been fetched some time ago."
+    cached_key_set = issuer._cached_key_set
+    cached_key_set.fetched_at -= fraction_of_max_age * cached_key_set.max_age
+
+
+def _replace_jwks(mocked_responses: responses.RequestsMock, jwks_uri: str, jwk_set: JWKSet, **kw):
+    mocked_responses.replace(
+        "GET",
+        jwks_uri,
+        body=jwk_set.export(private_keys=False),
+        content_type="application/json",
+        **kw,
+    )
+
+
+@pytest.fixture
+def rotated_jwk(faker: Faker) -> JWK:
+    return JWK.generate(kty="EC", crv="P-256", kid=faker.slug())
+
+
+@pytest.fixture
+def rotated_jwk_set(jwk_set: JWKSet, rotated_jwk: JWK) -> JWKSet:
+    s = JWKSet()
+    for k in jwk_set["keys"]:
+        s["keys"].add(k)
+    s["keys"].add(rotated_jwk)
+    return s
+
+
+def test_cache_control_honoured(
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    jwk_set: JWKSet,
+    mocked_responses: responses.RequestsMock,
+):
+    _replace_jwks(mocked_responses, jwks_uri, jwk_set, headers={"Cache-Control": "max-age=120"})
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    assert issuer._cached_key_set is not None
+    assert issuer._cached_key_set.max_age == 120
+
+
+def test_expired_key_set_refetched(
+    jwt_issuer: str, oidc_audience: str, jwks_uri: str, mocked_responses: responses.RequestsMock
+):
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    issuer.prepare()
+    mocked_responses.assert_call_count(jwks_uri, 1)
+    _age_key_set(issuer, 1.0)
+    issuer.prepare()
+    mocked_responses.assert_call_count(jwks_uri, 2)
+
+
+def test_expired_key_set_used_if_refetch_fails(
+    oidc_token: str,
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    jwk_set: JWKSet,
+    mocked_responses: responses.RequestsMock,
+):
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    _age_key_set(issuer, 1.0)
+    _replace_jwks(mocked_responses, jwks_uri, jwk_set, status=500)
+    issuer.prepare()
+    assert issuer.jwks_fetch_metrics.failures == 1
+    issuer.validate(oidc_token)
+
+
+@pytest.mark.asyncio
+async def test_key_set_refreshed_in_background(
+    jwt_issuer: str, oidc_audience: str, jwks_uri: str, mocked_responses: responses.RequestsMock
+):
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience)
+    await issuer.prepare()
+    previous_key_set = issuer._cached_key_set
+    _age_key_set(issuer, (1 + keysetcache.REFRESH_AHEAD_FRACTION) / 2)
+
+    # Preparing a key set which needs refreshing returns immediately using the existing key set.
+    await issuer.prepare()
+    await issuer.prepare()
+    assert issuer._cached_key_set is previous_key_set
+    assert issuer._refresh_task is not None
+    await asyncio.wait_for(issuer._refresh_task, timeout=5)
+
+    assert issuer._cached_key_set is not previous_key_set
+    assert issuer.jwks_fetch_metrics.background_refreshes == 1
+    mocked_responses.assert_call_count(jwks_uri, 2)
+
+
+@pytest.mark.asyncio
+async def test_kid_miss_refetch(
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    rotated_jwk: JWK,
+    rotated_jwk_set: JWKSet,
+    mocked_responses: responses.RequestsMock,
+):
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience)
+    await issuer.prepare()
+
+    # The issuer rotates to a new key.
+    _replace_jwks(mocked_responses, jwks_uri, rotated_jwk_set)
+    token = make_jwt(oidc_claims, rotated_jwk, "ES256")
+    assert await issuer.async_validate(token) == oidc_claims
+    assert issuer.jwks_fetch_metrics.kid_miss_refetches == 1
+    mocked_responses.assert_call_count(jwks_uri, 2)
+
+    # Re-validating does not require a further fetch.
+    assert await issuer.async_validate(token) == oidc_claims
+    mocked_responses.assert_call_count(jwks_uri, 2)
+
+
+@pytest.mark.asyncio
+async def test_kid_miss_refetch_of_malformed_key_set(
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    rotated_jwk: JWK,
+    mocked_responses: responses.RequestsMock,
+):
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience)
+    await issuer.prepare()
+    previous_key_set = issuer._cached_key_set
+
+    # The refetched key set is malformed and so the token is rejected as having no matching key.
+    mocked_responses.replace("GET", jwks_uri, body="{}", content_type="application/json")
+    with pytest.raises(exc.NoMatchingKeyError):
+        await issuer.async_validate(make_jwt(oidc_claims, rotated_jwk, "ES256"))
+    mocked_responses.assert_call_count(jwks_uri, 2)
+    assert issuer.jwks_fetch_metrics.failures == 1
+    assert issuer.circuit_breaker.consecutive_failures == 1
+    assert issuer._cached_key_set is previous_key_set
+
+
+@pytest.mark.asyncio
+async def test_kid_miss_refetch_rate_limited(
+    faker: Faker,
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    mocked_responses: responses.RequestsMock,
+):
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience)
+    await issuer.prepare()
+
+    for _ in range(3):
+        unknown_jwk = JWK.generate(kty="EC", crv="P-256", kid=faker.slug())
+        with pytest.raises(exc.InvalidTokenError):
+            await issuer.async_validate(make_jwt(oidc_claims, unknown_jwk, "ES256"))
+
+    assert issuer.jwks_fetch_metrics.kid_miss_refetches == 1
+    mocked_responses.assert_call_count(jwks_uri, 2)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_prepare_coalesced(
+    jwt_issuer: str, oidc_audience: str, jwks_uri: str, mocked_responses: responses.RequestsMock
+):
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience)
+    await asyncio.gather(*(issuer.prepare() for _ in range(10)))
+    assert issuer.is_prepared
+    assert issuer.jwks_fetch_metrics.fetches == 1
+    assert issuer.jwks_fetch_metrics.coalesced_fetches == 9
+    mocked_responses.assert_call_count(jwks_uri, 1)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_prepare_does_not_cancel_shared_fetch(
+    jwt_issuer: str, oidc_audience: str, jwks_uri: str, mocked_responses: responses.RequestsMock
+):
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience)
+    cancelled = asyncio.create_task(issuer.prepare())
+    waiting = asyncio.create_task(issuer.prepare())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.wait_for(waiting, timeout=5)
+    assert issuer.is_prepared
+    mocked_responses.assert_call_count(jwks_uri, 1)
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_backs_off(
+    jwt_issuer: str,
+    oidc_audience: str,
+    jwks_uri: str,
+    jwk_set: JWKSet,
+    mocked_responses: responses.RequestsMock,
+):
+    _replace_jwks(mocked_responses, jwks_uri, jwk_set, status=500)
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience)
+    with pytest.raises(exc.TransportError):
+        await issuer.prepare()
+
+    # Further attempts within the backoff period fail without contacting the issuer.
+    for _ in range(3):
+        with pytest.raises(exc.TransportError):
+            await issuer.prepare()
+    mocked_responses.assert_call_count(jwks_uri, 1)
+
+    # Once the backoff period has passed the key set is fetched again.
+    _replace_jwks(mocked_responses, jwks_uri, jwk_set)
+    issuer.circuit_breaker.open_until = time.monotonic()
+    await issuer.prepare()
+    assert issuer.is_prepared
+    mocked_responses.assert_call_count(jwks_uri, 2)
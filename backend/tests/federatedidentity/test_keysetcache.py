@@ -0,0 +1,66 @@
+import email.utils
+
+import pytest
+from jwcrypto.jwk import JWK, JWKSet
+
+from componentsdb.federatedidentity import keysetcache
+
+
+@pytest.mark.parametrize(
+    "headers,expected_max_age",
+    [
+        ({}, keysetcache.DEFAULT_MAX_AGE),
+        ({"Cache-Control": "public, max-age=600"}, 600),
+        ({"cache-control": "max-age=600", "Age": "100"}, 500),
+        ({"Cache-Control": "max-age=1"}, keysetcache.MIN_MAX_AGE),
+        ({"Cache-Control": "max-age=100000000"}, keysetcache.MAX_MAX_AGE),
+        ({"Cache-Control": "no-store"}, keysetcache.MIN_MAX_AGE),
+        ({"Cache-Control": "no-cache, max-age=600"}, keysetcache.MIN_MAX_AGE),
+        ({"Cache-Control": "max-age=not-a-number"}, keysetcache.DEFAULT_MAX_AGE),
+        (
+            {
+                "Date": email.utils.formatdate(1_000_000, usegmt=True),
+                "Expires": email.utils.formatdate(1_000_000 + 900, usegmt=True),
+            },
+            900,
+        ),
+        ({"Expires": "0"}, keysetcache.MIN_MAX_AGE),
+    ],
+)
+def test_max_age_from_headers(headers, expected_max_age):
+    assert keysetcache.max_age_from_headers(headers) == expected_max_age
+
+
+def test_max_age_prefers_cache_control_to_expires():
+    headers = {
+        "Cache-Control": "max-age=300",
+        "Date": email.utils.formatdate(1_000_000, usegmt=True),
+        "Expires": email.utils.formatdate(1_000_000 + 900, usegmt=True),
+    }
+    assert keysetcache.max_age_from_headers(headers) == 300
+
+
+def test_expires_without_date_uses_now():
+    headers = {"Expires": email.utils.formatdate(1_000_000 + 900, usegmt=True)}
+    assert keysetcache.max_age_from_headers(headers, now=1_000_000) == 900
+
+
+@pytest.mark.parametrize("consecutive_failures", [1, 2, 3, 10, 100])
+def test_fetch_failure_backoff(consecutive_failures):
+    expected_max = min(
+        keysetcache.MAX_FETCH_FAILURE_BACKOFF,
+        keysetcache.MIN_FETCH_FAILURE_BACKOFF * 2 ** (consecutive_failures - 1),
+    )
+    for _ in range(20):
+        backoff = keysetcache.fetch_failure_backoff(consecutive_failures)
+        assert 0.5 * expected_max <= backoff <= expected_max
+
+
+def test_signing_keys(jwk_set: JWKSet, ec_jwk: JWK, ec_jwk_kid: str, rsa_jwk: JWK):
+    cached_key_set = keysetcache.CachedKeySet(key_set=jwk_set, fetched_at=0, max_age=60)
+    assert cached_key_set.has_key(ec_jwk_kid)
+    assert not cached_key_set.has_key("not-a-kid")
+    assert cached_key_set.signing_keys(ec_jwk_kid, "ES256") == [ec_jwk]
+    assert cached_key_set.signing_keys(ec_jwk_kid, "RS256") == []
+    assert cached_key_set.signing_keys("not-a-kid", "ES256") == []
+    assert cached_key_set.signing_keys(None, "RS256") == [rsa_jwk]
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import time
+
+import pytest
+import pytest_asyncio
+import responses
+
+from componentsdb.federatedidentity import exceptions as exc
+from componentsdb.federatedidentity.transport.native import AsyncHTTPSession
+from componentsdb.federatedidentity.transport.requests import RequestsSession
+
+
+class StandInServer:
+    """
+    Minimal HTTP/1.1 server used as a stand in for an identity provider. Requests are echoed back
+    as a JSON document. The request path selects some special behaviour:
+
+    * /slow - wait before responding.
+    * /chunked - respond with a chunked body.
+    * /close - ask the client to close the connection after the response.
+    * /hangup - respond and then close the connection without telling the client.
+    """
+
+    def __init__(self):
+        self.connection_count = 0
+        self.active_requests = 0
+        self.max_active_requests = 0
+        self.delay = 0.2
+        self.port = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connection_count += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if request_line == b"":
+                    break
+                method, path, _ = request_line.decode().split(" ")
+                headers = {}
+                while (line := (await reader.readline()).decode().rstrip("\r\n")) != "":
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                self.active_requests += 1
+                self.max_active_requests = max(self.max_active_requests, self.active_requests)
+                if path == "/slow":
+                    await asyncio.sleep(self.delay)
+                self.active_requests -= 1
+
+                content = json.dumps(
+                    {"method": method, "path": path, "headers": headers, "body": body.decode()}
+                ).encode()
+                response_headers = [b"HTTP/1.1 200 OK", b"Content-Type: application/json"]
+                if path == "/chunked":
+                    response_headers.append(b"Transfer-Encoding: chunked")
+                    half = len(content) // 2
+                    content = b"".join(
+                        b"%x\r\n%s\r\n" % (len(chunk), chunk)
+                        for chunk in [content[:half], content[half:]]
+                    )
+                    content += b"0\r\n\r\n"
+                else:
+                    response_headers.append(b"Content-Length: %d" % len(content))
+                if path == "/close":
+                    response_headers.append(b"Connection: close")
+                writer.write(b"\r\n".join(response_headers + [b"", content]))
+                await writer.drain()
+                if path in {"/close", "/hangup"}:
+                    break
+        finally:
+            writer.close()
+
+
+@pytest_asyncio.fixture
+async def server():
+    s = StandInServer()
+    await s.start()
+    yield s
+    await s.stop()
+
+
+@pytest_asyncio.fixture
+async def session():
+    s = AsyncHTTPSession(max_connections_per_host=4)
+    yield s
+    await s.aclose()
+
+
+@pytest.mark.asyncio
+async def test_request_parameters_honoured(server: StandInServer, session: AsyncHTTPSession):
+    r = await session(
+        f"{server.base_url}/echo?x=1",
+        body=b"hello",
+        method="POST",
+        headers={"Accept": "application/json", "X-Test": "yes"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    echo = json.loads(r.content)
+    assert echo["method"] == "POST"
+    assert echo["path"] == "/echo?x=1"
+    assert echo["body"] == "hello"
+    assert echo["headers"]["accept"] == "application/json"
+    assert echo["headers"]["x-test"] == "yes"
+    assert echo["headers"]["host"] == f"127.0.0.1:{server.port}"
+
+
+@pytest.mark.asyncio
+async def test_connection_reused(server: StandInServer, session: AsyncHTTPSession):
+    for _ in range(5):
+        r = await session(f"{server.base_url}/echo")
+        assert json.loads(r.content)["method"] == "GET"
+    assert server.connection_count == 1
+    assert session.connections_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_chunked_response(server: StandInServer, session: AsyncHTTPSession):
+    r = await session(f"{server.base_url}/chunked")
+    assert json.loads(r.content)["path"] == "/chunked"
+
+    # The connection remains usable after a chunked response.
+    await session(f"{server.base_url}/echo")
+    assert server.connection_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests(server: StandInServer, session: AsyncHTTPSession):
+    start = time.monotonic()
+    await asyncio.gather(*(session(f"{server.base_url}/slow") for _ in range(4)))
+    duration = time.monotonic() - start
+
+    # Requests are made concurrently over separate connections.
+    assert server.max_active_requests == 4
+    assert server.connection_count == 4
+    assert duration < 2 * server.delay
+
+    # Subsequent requests re-use the pooled connections.
+    await asyncio.gather(*(session(f"{server.base_url}/slow") for _ in range(4)))
+    assert server.connection_count == 4
+
+
+@pytest.mark.asyncio
+async def test_connections_per_host_limited(server: StandInServer, session: AsyncHTTPSession):
+    await asyncio.gather(*(session(f"{server.base_url}/slow") for _ in range(8)))
+    assert server.max_active_requests == 4
+    assert server.connection_count == 4
+
+
+@pytest.mark.asyncio
+async def test_connection_close_honoured(server: StandInServer, session: AsyncHTTPSession):
+    await session(f"{server.base_url}/close")
+    await session(f"{server.base_url}/echo")
+    assert server.connection_count == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_on_closed_idle_connection(server: StandInServer, session: AsyncHTTPSession):
+    await session(f"{server.base_url}/hangup")
+    # Give the server a chance to close the connection.
+    await asyncio.sleep(0.05)
+    r = await session(f"{server.base_url}/echo")
+    assert r.status_code == 200
+    assert server.connection_count == 2
+
+
+@pytest.mark.asyncio
+async def test_request_timeout(server: StandInServer, session: AsyncHTTPSession):
+    with pytest.raises(exc.TransportError):
+        await session(f"{server.base_url}/slow", timeout=server.delay / 4)
+
+    # The per-request timeout does not affect subsequent requests.
+    r = await session(f"{server.base_url}/slow")
+    assert r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_connection_refused(server: StandInServer, session: AsyncHTTPSession):
+    url = f"{server.base_url}/echo"
+    await server.stop()
+    with pytest.raises(exc.TransportError):
+        await session(url)
+
+
+@pytest.mark.asyncio
+async def test_unsupported_url(session: AsyncHTTPSession):
+    with pytest.raises(exc.TransportError):
+        await session("ftp://example.com/")
+
+
+def test_requests_session_honours_parameters(mocked_responses: responses.RequestsMock):
+    mocked_responses.post(
+        "https://example.com/echo",
+        match=[
+            responses.matchers.header_matcher({"X-Test": "yes"}),
+            responses.matchers.body_matcher("hello"),
+        ],
+        body=b"ok",
+    )
+    r = RequestsSession()(
+        "https://example.com/echo", body=b"hello", method="POST", headers={"X-Test": "yes"}
+    )
+    assert r.status_code == 200
+    assert r.content == b"ok"
+
+
+def test_requests_session_timeouts(mocked_responses: responses.RequestsMock):
+    mocked_responses.get("https://example.com/", body=b"ok")
+    session = RequestsSession(connect_timeout=2, read_timeout=5)
+    session("https://example.com/")
+    session("https://example.com/", timeout=3)
+    # responses records the keyword arguments passed to the adapter on each prepared request.
+    timeouts = [
+        c.request.req_kwargs["timeout"]  # type: ignore[attr-defined]
+        for c in mocked_responses.calls
+    ]
+    assert timeouts == [(2, 5), (2, 3)]
+
+
+def test_requests_session_expired_timeout():
+    with pytest.raises(exc.TransportError):
+        RequestsSession()("https://example.com/", timeout=0)
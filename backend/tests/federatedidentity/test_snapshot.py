@@ -0,0 +1,201 @@
+import json
+import time
+
+import pytest
+import responses
+from jwcrypto.jwk import JWKSet
+
+from componentsdb.federatedidentity import AsyncOIDCTokenIssuer, KeySetSnapshotStore
+from componentsdb.federatedidentity import exceptions as exc
+from componentsdb.federatedidentity import snapshot
+from componentsdb.federatedidentity.keysetcache import CachedKeySet
+
+
+@pytest.fixture
+def snapshot_store(tmp_path) -> KeySetSnapshotStore:
+    return KeySetSnapshotStore(tmp_path / "snapshots")
+
+
+@pytest.fixture
+def cached_key_set(jwk_set: JWKSet, jwks_uri: str) -> CachedKeySet:
+    return CachedKeySet(
+        key_set=jwk_set, fetched_at=time.monotonic() - 100, max_age=3600, jwks_uri=jwks_uri
+    )
+
+
+def _rewrite_payload(store: KeySetSnapshotStore, issuer: str, /, **changes):
+    "Modify a saved snapshot's payload and recompute its digest."
+    path = store.path_for(issuer)
+    document = json.loads(path.read_text())
+    document["payload"].update(changes)
+    document["sha256"] = snapshot._payload_digest(document["payload"])
+    path.write_text(json.dumps(document))
+
+
+def test_round_trip(
+    snapshot_store: KeySetSnapshotStore, cached_key_set: CachedKeySet, jwt_issuer: str
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    s = snapshot_store.load(jwt_issuer)
+    assert s is not None
+    assert s.issuer == jwt_issuer
+    assert s.jwks_uri == cached_key_set.jwks_uri
+    assert {k.thumbprint() for k in s.key_set} == {k.thumbprint() for k in cached_key_set.key_set}
+
+    # The age of the key set is preserved.
+    loaded = s.to_cached_key_set()
+    assert loaded.max_age == 3600
+    assert loaded.age() == pytest.approx(cached_key_set.age(), abs=1)
+
+
+def test_private_keys_not_saved(
+    snapshot_store: KeySetSnapshotStore, cached_key_set: CachedKeySet, jwt_issuer: str
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    for k in json.loads(snapshot_store.path_for(jwt_issuer).read_text())["payload"]["jwks"][
+        "keys"
+    ]:
+        assert "d" not in k
+
+
+def test_missing_snapshot(snapshot_store: KeySetSnapshotStore, jwt_issuer: str):
+    assert snapshot_store.load(jwt_issuer) is None
+
+
+def test_tampered_snapshot_ignored(
+    snapshot_store: KeySetSnapshotStore, cached_key_set: CachedKeySet, jwt_issuer: str
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    path = snapshot_store.path_for(jwt_issuer)
+    document = json.loads(path.read_text())
+    document["payload"]["jwks_uri"] = "https://attacker.invalid/jwks"
+    path.write_text(json.dumps(document))
+    assert snapshot_store.load(jwt_issuer) is None
+
+
+def test_corrupt_snapshot_ignored(
+    snapshot_store: KeySetSnapshotStore, cached_key_set: CachedKeySet, jwt_issuer: str
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    snapshot_store.path_for(jwt_issuer).write_text("{not json")
+    assert snapshot_store.load(jwt_issuer) is None
+
+
+def test_snapshot_for_other_issuer_ignored(
+    snapshot_store: KeySetSnapshotStore, cached_key_set: CachedKeySet, jwt_issuer: str
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    _rewrite_payload(snapshot_store, jwt_issuer, issuer="https://other.invalid/")
+    assert snapshot_store.load(jwt_issuer) is None
+
+
+def test_old_snapshot_ignored(
+    snapshot_store: KeySetSnapshotStore, cached_key_set: CachedKeySet, jwt_issuer: str
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    _rewrite_payload(
+        snapshot_store, jwt_issuer, fetched_at=time.time() - snapshot.MAX_SNAPSHOT_AGE - 1
+    )
+    assert snapshot_store.load(jwt_issuer) is None
+
+
+def test_save_replaces_previous_snapshot(
+    snapshot_store: KeySetSnapshotStore, cached_key_set: CachedKeySet, jwt_issuer: str
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    cached_key_set.max_age = 60
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    s = snapshot_store.load(jwt_issuer)
+    assert s is not None
+    assert s.max_age == 60
+    # No temporary files are left behind.
+    assert list(snapshot_store.directory.iterdir()) == [snapshot_store.path_for(jwt_issuer)]
+
+
+@pytest.mark.asyncio
+async def test_fetched_key_set_saved(
+    snapshot_store: KeySetSnapshotStore,
+    jwt_issuer: str,
+    oidc_audience: str,
+    oidc_token: str,
+):
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience, snapshot_store=snapshot_store)
+    await issuer.prepare()
+    assert snapshot_store.load(jwt_issuer) is not None
+    assert issuer.jwks_fetch_metrics.snapshot_loads == 0
+
+
+@pytest.mark.asyncio
+async def test_prepare_from_snapshot(
+    snapshot_store: KeySetSnapshotStore,
+    cached_key_set: CachedKeySet,
+    jwt_issuer: str,
+    oidc_audience: str,
+    oidc_token: str,
+    jwks_uri: str,
+    mocked_responses: responses.RequestsMock,
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience, snapshot_store=snapshot_store)
+
+    # Tokens are validated using the snapshot before the key set is fetched.
+    await issuer.prepare()
+    assert issuer.jwks_fetch_metrics.snapshot_loads == 1
+    issuer.validate(oidc_token)
+    mocked_responses.assert_call_count(jwks_uri, 0)
+
+    # The key set is re-validated in the background.
+    assert issuer._refresh_task is not None
+    await issuer._refresh_task
+    mocked_responses.assert_call_count(jwks_uri, 1)
+    assert issuer.jwks_fetch_metrics.fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_snapshot_used_while_issuer_unavailable(
+    snapshot_store: KeySetSnapshotStore,
+    cached_key_set: CachedKeySet,
+    jwt_issuer: str,
+    oidc_audience: str,
+    oidc_token: str,
+    mocked_responses: responses.RequestsMock,
+):
+    snapshot_store.save(jwt_issuer, cached_key_set)
+    mocked_responses.replace("GET", f"{jwt_issuer}/.well-known/openid-configuration", status=503)
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience, snapshot_store=snapshot_store)
+    await issuer.async_validate(oidc_token)
+    assert issuer._refresh_task is not None
+    await issuer._refresh_task
+    assert issuer.jwks_fetch_metrics.failures == 1
+    await issuer.async_validate(oidc_token)
+
+
+@pytest.mark.asyncio
+async def test_save_failure_counted(
+    tmp_path,
+    jwt_issuer: str,
+    oidc_audience: str,
+):
+    # A plain file in place of the snapshot directory means that snapshots cannot be written.
+    not_a_directory = tmp_path / "file"
+    not_a_directory.write_text("")
+    issuer = AsyncOIDCTokenIssuer(
+        jwt_issuer, oidc_audience, snapshot_store=KeySetSnapshotStore(not_a_directory)
+    )
+    await issuer.prepare()
+    assert issuer._cached_key_set is not None
+    assert issuer.jwks_fetch_metrics.snapshot_save_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_no_snapshot_fetches(
+    snapshot_store: KeySetSnapshotStore,
+    jwt_issuer: str,
+    oidc_audience: str,
+    mocked_responses: responses.RequestsMock,
+):
+    mocked_responses.replace("GET", f"{jwt_issuer}/.well-known/openid-configuration", status=503)
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience, snapshot_store=snapshot_store)
+    with pytest.raises(exc.FederatedIdentityError):
+        await issuer.prepare()
+    assert issuer.jwks_fetch_metrics.snapshot_loads == 0
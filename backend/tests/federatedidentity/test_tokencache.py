@@ -0,0 +1,126 @@
+import time
+
+import pytest
+from jwcrypto.jwk import JWK
+
+from componentsdb.federatedidentity import OIDCTokenIssuer, TokenValidationCache
+from componentsdb.federatedidentity import exceptions as exc
+from componentsdb.federatedidentity import oidc
+
+from ..oidcfixtures import make_jwt
+
+
+@pytest.fixture
+def verify_count(monkeypatch: pytest.MonkeyPatch):
+    "Count calls to verify_parsed_token."
+    counts = {"verify": 0}
+    verify_parsed_token = oidc.verify_parsed_token
+
+    def counting_verify_parsed_token(*args, **kwargs):
+        counts["verify"] += 1
+        return verify_parsed_token(*args, **kwargs)
+
+    monkeypatch.setattr(oidc, "verify_parsed_token", counting_verify_parsed_token)
+    return counts
+
+
+@pytest.fixture
+def issuer(jwt_issuer: str, oidc_audience: str):
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    return issuer
+
+
+def test_verified_token_cached(make_oidc_token, oidc_claims, issuer, verify_count):
+    claims = {**oidc_claims, "exp": int(time.time()) + 600}
+    token = make_oidc_token(claims)
+    for _ in range(3):
+        assert issuer.validate(token) == claims
+    assert verify_count["verify"] == 1
+    assert issuer.token_cache.metrics.verified_hits == 2
+
+
+def test_token_without_exp_not_cached(oidc_token, oidc_claims, issuer, verify_count):
+    for _ in range(2):
+        assert issuer.validate(oidc_token) == oidc_claims
+    assert verify_count["verify"] == 2
+
+
+def test_rejected_token_cached(oidc_claims, issuer, verify_count, ec_jwk_kid: str):
+    # A token with a known kid but signed by some other key has an invalid signature.
+    forged_jwk = JWK.generate(kty="EC", crv="P-256", kid=ec_jwk_kid)
+    token = make_jwt(oidc_claims, forged_jwk, "ES256")
+    for _ in range(3):
+        with pytest.raises(exc.InvalidTokenError):
+            issuer.validate(token)
+    assert verify_count["verify"] == 1
+    assert issuer.token_cache.metrics.rejected_hits == 2
+
+
+def test_mismatched_audience_cached(make_oidc_token, oidc_claims, issuer, verify_count):
+    token = make_oidc_token({**oidc_claims, "aud": "some-other-audience"})
+    for _ in range(2):
+        with pytest.raises(exc.InvalidClaimsError):
+            issuer.validate(token)
+    assert issuer.token_cache.metrics.rejected_hits == 1
+
+
+def test_unknown_key_not_cached(oidc_claims, issuer, verify_count):
+    token = make_jwt(oidc_claims, JWK.generate(kty="EC", crv="P-256", kid="unknown"), "ES256")
+    for _ in range(2):
+        with pytest.raises(exc.NoMatchingKeyError):
+            issuer.validate(token)
+    assert verify_count["verify"] == 2
+    assert issuer.token_cache.metrics.rejected_hits == 0
+
+
+def test_not_yet_valid_not_cached(make_oidc_token, oidc_claims, issuer, verify_count):
+    token = make_oidc_token({**oidc_claims, "nbf": int(time.time()) + 3600})
+    for _ in range(2):
+        with pytest.raises(exc.TokenNotYetValidError):
+            issuer.validate(token)
+    assert verify_count["verify"] == 2
+
+
+def test_verified_token_expires():
+    cache = TokenValidationCache()
+    cache.put_verified("token", {"exp": time.time() - 1}, kid=None)
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_verified_token_evicted_when_key_removed():
+    cache = TokenValidationCache()
+    claims = {"exp": time.time() + 600}
+    cache.put_verified("token", claims, kid="key-1")
+    assert cache.get("token", has_key=lambda kid: kid == "key-1") == claims
+    assert cache.get("token", has_key=lambda kid: False) is None
+
+
+def test_rejected_token_expires(monkeypatch: pytest.MonkeyPatch):
+    cache = TokenValidationCache(rejected_ttl=10)
+    cache.put_rejected("token", exc.InvalidTokenError("bad token"))
+    with pytest.raises(exc.InvalidTokenError, match="bad token"):
+        cache.get("token")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("token") is None
+
+
+def test_least_recently_used_evicted():
+    cache = TokenValidationCache(max_size=2)
+    exp = time.time() + 600
+    cache.put_verified("a", {"exp": exp}, kid=None)
+    cache.put_verified("b", {"exp": exp}, kid=None)
+    assert cache.get("a") is not None
+    cache.put_verified("c", {"exp": exp}, kid=None)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.metrics.evictions == 1
+
+
+def test_zero_size_disables_cache():
+    cache = TokenValidationCache(max_size=0)
+    cache.put_verified("a", {"exp": time.time() + 600}, kid=None)
+    assert cache.get("a") is None
@@ -1,8 +1,10 @@
 import datetime
+import json
 from typing import Any
 
 import pytest
 from faker import Faker
+from jwcrypto.common import base64url_encode
 from jwcrypto.jwk import JWK
 from jwcrypto.jws import JWS
 from jwcrypto.jwt import JWT
@@ -123,3 +125,46 @@ def test_nbf_claim_in_future(
     token = make_jwt(oidc_claims, jwks[alg], alg)
     with pytest.raises(exc.InvalidTokenError):
         provider.validate(token)
+
+
+def test_unsigned_token_rejected(oidc_claims: dict[str, str], oidc_audience: str, jwt_issuer: str):
+    token = ".".join(
+        [
+            base64url_encode(json.dumps({"alg": "none"})),
+            base64url_encode(json.dumps(oidc_claims)),
+            "",
+        ]
+    )
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    with pytest.raises(exc.InvalidTokenError):
+        issuer.validate(token)
+
+
+def test_token_signed_by_unknown_key_rejected(
+    oidc_claims: dict[str, str], oidc_audience: str, jwt_issuer: str, ec_jwk_kid: str
+):
+    # The unknown key re-uses the kid of a key in the issuer's key set.
+    unknown_jwk = JWK.generate(kty="EC", crv="P-256", kid=ec_jwk_kid)
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    with pytest.raises(exc.InvalidTokenError):
+        issuer.validate(make_jwt(oidc_claims, unknown_jwk, "ES256"))
+
+
+def test_token_parsed_once(
+    monkeypatch: pytest.MonkeyPatch, oidc_token: str, oidc_audience: str, jwt_issuer: str
+):
+    issuer = OIDCTokenIssuer(jwt_issuer, oidc_audience)
+    issuer.prepare()
+    parse_count = 0
+    parse_token = oidc.parse_token
+
+    def counting_parse_token(*args, **kwargs):
+        nonlocal parse_count
+        parse_count += 1
+        return parse_token(*args, **kwargs)
+
+    monkeypatch.setattr(oidc, "parse_token", counting_parse_token)
+    issuer.validate(oidc_token)
+    assert parse_count == 1
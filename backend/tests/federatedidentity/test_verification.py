@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from componentsdb.federatedidentity import AsyncOIDCTokenIssuer, VerificationExecutor
+from componentsdb.federatedidentity import exceptions as exc
+
+
+@pytest.fixture
+def verification_executor():
+    executor = VerificationExecutor(max_workers=2, max_pending=4, max_queued=16)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_async_validate_uses_executor(
+    oidc_token: str,
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+    verification_executor: VerificationExecutor,
+):
+    issuer = AsyncOIDCTokenIssuer(
+        jwt_issuer, oidc_audience, verification_executor=verification_executor
+    )
+    assert await issuer.async_validate(oidc_token) == oidc_claims
+    # Both parsing and verification happen on the executor.
+    assert verification_executor.metrics.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_error_propagated(
+    make_oidc_token,
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+    verification_executor: VerificationExecutor,
+):
+    issuer = AsyncOIDCTokenIssuer(
+        jwt_issuer, oidc_audience, verification_executor=verification_executor
+    )
+    with pytest.raises(exc.InvalidTokenError):
+        await issuer.async_validate(make_oidc_token({**oidc_claims, "exp": 1}))
+    assert verification_executor.metrics.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_pending_verifications_bounded(verification_executor: VerificationExecutor):
+    max_in_flight = 0
+
+    async def sample_in_flight():
+        nonlocal max_in_flight
+        while True:
+            max_in_flight = max(max_in_flight, verification_executor.metrics.in_flight)
+            await asyncio.sleep(0.001)
+
+    sampler = asyncio.create_task(sample_in_flight())
+    await asyncio.gather(*(verification_executor.run(time.sleep, 0.02) for _ in range(16)))
+    sampler.cancel()
+
+    assert max_in_flight <= verification_executor.max_pending
+    assert verification_executor.metrics.max_waiting > 0
+    assert verification_executor.metrics.completed == 16
+    assert verification_executor.metrics.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_verifications_bounded(verification_executor: VerificationExecutor):
+    results = await asyncio.gather(
+        *(verification_executor.run(time.sleep, 0.02) for _ in range(24)), return_exceptions=True
+    )
+    rejected = [r for r in results if isinstance(r, exc.VerificationOverloadedError)]
+    assert (
+        len(rejected) == 24 - verification_executor.max_pending - verification_executor.max_queued
+    )
+    assert verification_executor.metrics.rejected == len(rejected)
+    assert verification_executor.metrics.completed == 24 - len(rejected)
+
+    # Once the backlog clears, verifications are accepted again.
+    await verification_executor.run(time.sleep, 0)
+
+
+@pytest.mark.asyncio
+async def test_overloaded_token_not_remembered(
+    oidc_token: str,
+    oidc_claims,
+    jwt_issuer: str,
+    oidc_audience: str,
+):
+    executor = VerificationExecutor(max_workers=1, max_pending=1, max_queued=0)
+    issuer = AsyncOIDCTokenIssuer(jwt_issuer, oidc_audience, verification_executor=executor)
+    await issuer.prepare()
+    try:
+        blocker = asyncio.create_task(executor.run(time.sleep, 0.1))
+        await asyncio.sleep(0)
+        with pytest.raises(exc.VerificationOverloadedError):
+            await issuer.async_validate(oidc_token)
+        await blocker
+        assert await issuer.async_validate(oidc_token) == oidc_claims
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "max_workers,max_pending,max_queued", [(0, 1, None), (2, 1, None), (1, 1, -1)]
+)
+def test_invalid_limits(max_workers, max_pending, max_queued):
+    with pytest.raises(ValueError):
+        VerificationExecutor(
+            max_workers=max_workers, max_pending=max_pending, max_queued=max_queued
+        )
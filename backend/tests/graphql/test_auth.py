@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from componentsdb import auth
 from componentsdb.db import models as dbm
-from componentsdb.graphql import schema
+from componentsdb.graphql import make_context, schema
 
 
 @pytest.mark.asyncio
@@ -31,6 +31,43 @@ async def test_authenticated_user(authenticated_user, context):
     assert result.data["auth"]["authenticatedUser"]["avatarUrl"] == authenticated_user.avatar_url
 
 
+@pytest.mark.asyncio
+async def test_authenticated_user_from_access_token(
+    authenticated_user: dbm.User,
+    db_session: AsyncSession,
+    authentication_provider: auth.AuthenticationProvider,
+):
+    credentials = await authentication_provider.create_user_credentials(authenticated_user)
+    context = make_context(
+        db_session=db_session,
+        authentication_provider=authentication_provider,
+        access_token=credentials.access_token,
+    )
+    # Multiple resolvers needing the authenticated user share a single verification.
+    query = "query { auth { a: authenticatedUser { id } b: authenticatedUser { id } } }"
+    result = await schema.execute(query, context_value=context)
+    assert result.errors is None
+    assert result.data is not None
+    assert result.data["auth"]["a"]["id"] == str(authenticated_user.uuid)
+    assert result.data["auth"]["b"]["id"] == str(authenticated_user.uuid)
+
+
+@pytest.mark.asyncio
+async def test_invalid_access_token(
+    faker: Faker, db_session: AsyncSession, authentication_provider: auth.AuthenticationProvider
+):
+    context = make_context(
+        db_session=db_session,
+        authentication_provider=authentication_provider,
+        access_token=faker.slug(),
+    )
+    result = await schema.execute(
+        "query { auth { authenticatedUser { id } } }", context_value=context
+    )
+    assert result.errors is not None
+    assert result.errors[0].path == ["auth", "authenticatedUser"]
+
+
 @pytest.mark.asyncio
 async def test_federated_identity_providers(
     federated_identity_provider_name, jwt_issuer, oidc_audience, context
@@ -322,3 +359,51 @@ async def test_user_not_signed_up(
 
     error = result.data["auth"]["credentialsFromFederatedCredential"]
     assert error["error"] == "USER_NOT_SIGNED_UP"
+
+
+@pytest.mark.asyncio
+async def test_revoke_credentials(
+    authenticated_user: dbm.User,
+    db_session: AsyncSession,
+    authentication_provider: auth.AuthenticationProvider,
+):
+    credentials = await authentication_provider.create_user_credentials(authenticated_user)
+    context = make_context(
+        db_session=db_session,
+        authentication_provider=authentication_provider,
+        access_token=credentials.access_token,
+    )
+    query = """
+        mutation {
+            auth {
+                revokeCredentials {
+                    __typename
+                    ... on RevokedCredentials { revokedTokenCount }
+                }
+            }
+        }
+    """
+    result = await schema.execute(query, context_value=context)
+    assert result.errors is None
+    assert result.data is not None
+    assert result.data["auth"]["revokeCredentials"]["revokedTokenCount"] == 2
+    with pytest.raises(auth.InvalidAccessTokenError):
+        await authentication_provider.authenticate_user_from_access_token(credentials.access_token)
+
+
+@pytest.mark.asyncio
+async def test_revoke_credentials_requires_authentication(unauthenticated_context):
+    query = """
+        mutation {
+            auth {
+                revokeCredentials {
+                    __typename
+                    ... on AuthError { error }
+                }
+            }
+        }
+    """
+    result = await schema.execute(query, context_value=unauthenticated_context)
+    assert result.errors is None
+    assert result.data is not None
+    assert result.data["auth"]["revokeCredentials"]["error"] == "NOT_AUTHENTICATED"
@@ -0,0 +1,251 @@
+import asyncio
+from collections.abc import Sequence
+from typing import Optional
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from componentsdb import rbac
+from componentsdb.db import models as dbm
+from componentsdb.graphql import schema, types
+from componentsdb.graphql.context import cabinet_node_factory, drawer_node_factory
+from componentsdb.graphql.genericloaders import (
+    AuthorizationPredicate,
+    EntityConnectionFactory,
+    OneToManyRelationshipConnectionFactory,
+)
+from componentsdb.graphql.paginationtypes import PaginationParams
+
+
+def cabinet_read_authorization(
+    user: Optional[dbm.User], cabinet_id: sa.ColumnExpressionArgument[int]
+) -> AuthorizationPredicate:
+    async def predicate():
+        return rbac.cabinet_permission_predicate(user, "cabinet.read", cabinet_id)
+
+    return predicate
+
+
+@pytest_asyncio.fixture
+async def visible_cabinets(
+    faker: Faker, db_session: AsyncSession, user: dbm.User, cabinets: Sequence[dbm.Cabinet]
+) -> Sequence[dbm.Cabinet]:
+    visible_cabinets = faker.random_elements(cabinets, length=7, unique=True)
+    await db_session.execute(
+        sa.insert(dbm.UserCabinetRoleBinding).values(
+            [
+                {"user_id": user.id, "cabinet_id": c.id, "role_id": "role/cabinetViewer"}
+                for c in visible_cabinets
+            ]
+        )
+    )
+    return visible_cabinets
+
+
+async def _paginate(make_factory, key, first: int) -> tuple[list[str], int]:
+    "Page through a connection returning the ids of all nodes and the connection count."
+    ids: list[str] = []
+    after = None
+    for _ in range(100):
+        connection = make_factory(PaginationParams(after=after, first=first)).make_connection(key)
+        edges = await connection.edges_loader.load(key)
+        ids.extend(str(e.node.id) for e in edges.edges)
+        if not edges.has_next_page:
+            return ids, await connection.count_loader.load(key)
+        assert len(edges.edges) == first
+        after = edges.edges[-1].cursor
+    assert False, "Infinite pagination loop?"
+
+
+@pytest.mark.asyncio
+async def test_entity_connection_only_visible_rows(
+    db_session: AsyncSession,
+    user: dbm.User,
+    visible_cabinets: Sequence[dbm.Cabinet],
+):
+    lock = asyncio.Lock()
+    ids, count = await _paginate(
+        lambda p: EntityConnectionFactory(
+            db_session,
+            lock,
+            p,
+            dbm.Cabinet,
+            cabinet_node_factory,
+            authorization=cabinet_read_authorization(user, dbm.Cabinet.id),
+        ),
+        None,
+        first=3,
+    )
+    assert sorted(ids) == sorted(str(c.uuid) for c in visible_cabinets)
+    assert count == len(visible_cabinets)
+
+
+@pytest.mark.asyncio
+async def test_global_permission_shows_all_rows(
+    db_session: AsyncSession, user: dbm.User, cabinets: Sequence[dbm.Cabinet]
+):
+    await db_session.execute(
+        sa.insert(dbm.UserGlobalRoleBinding).values(user_id=user.id, role_id="role/cabinetViewer")
+    )
+    factory = EntityConnectionFactory[dbm.Cabinet, types.Cabinet, None](
+        db_session,
+        asyncio.Lock(),
+        PaginationParams(),
+        dbm.Cabinet,
+        cabinet_node_factory,
+        authorization=cabinet_read_authorization(user, dbm.Cabinet.id),
+    )
+    assert await factory.make_connection(None).count_loader.load(None) == len(cabinets)
+
+
+@pytest.mark.asyncio
+async def test_unauthenticated_user_sees_nothing(
+    db_session: AsyncSession, cabinets: Sequence[dbm.Cabinet]
+):
+    factory = EntityConnectionFactory[dbm.Cabinet, types.Cabinet, None](
+        db_session,
+        asyncio.Lock(),
+        PaginationParams(),
+        dbm.Cabinet,
+        cabinet_node_factory,
+        authorization=cabinet_read_authorization(None, dbm.Cabinet.id),
+    )
+    connection = factory.make_connection(None)
+    edges = await connection.edges_loader.load(None)
+    assert len(edges.edges) == 0
+    assert not edges.has_next_page
+    assert await connection.count_loader.load(None) == 0
+
+
+@pytest.mark.asyncio
+async def test_one_to_many_connection_only_visible_rows(
+    faker: Faker,
+    db_session: AsyncSession,
+    user: dbm.User,
+    drawers: Sequence[dbm.Drawer],
+):
+    # Grant access to a cabinet with several drawers.
+    drawer_counts: dict[int, int] = {}
+    for d in drawers:
+        drawer_counts[d.cabinet_id] = drawer_counts.get(d.cabinet_id, 0) + 1
+    visible_cabinet_id = max(drawer_counts, key=lambda id_: drawer_counts[id_])
+    hidden_cabinet_id = faker.random_element(set(drawer_counts) - {visible_cabinet_id})
+    await db_session.execute(
+        sa.insert(dbm.UserCabinetRoleBinding).values(
+            user_id=user.id, cabinet_id=visible_cabinet_id, role_id="role/cabinetViewer"
+        )
+    )
+    lock = asyncio.Lock()
+
+    def make_factory(p: PaginationParams):
+        return OneToManyRelationshipConnectionFactory(
+            db_session,
+            lock,
+            p,
+            dbm.Cabinet.drawers,
+            drawer_node_factory,
+            authorization=cabinet_read_authorization(user, dbm.Drawer.cabinet_id),
+        )
+
+    ids, count = await _paginate(make_factory, visible_cabinet_id, first=2)
+    assert sorted(ids) == sorted(
+        str(d.uuid) for d in drawers if d.cabinet_id == visible_cabinet_id
+    )
+    assert count == drawer_counts[visible_cabinet_id]
+
+    ids, count = await _paginate(make_factory, hidden_cabinet_id, first=2)
+    assert ids == []
+    assert count == 0
+
+
+@pytest.mark.asyncio
+async def test_unbound_user_sees_no_cabinets(all_fakes, context):
+    query = """query {
+        cabinets { count nodes { id } pageInfo { hasNextPage } }
+        components(first: 20) { nodes { collections { count nodes { id } } } }
+    }"""
+    result = await schema.execute(query, context_value=context)
+    assert result.errors is None
+    assert result.data is not None
+    assert result.data["cabinets"] == {"count": 0, "nodes": [], "pageInfo": {"hasNextPage": False}}
+    for component in result.data["components"]["nodes"]:
+        assert component["collections"] == {"count": 0, "nodes": []}
+
+
+@pytest.mark.asyncio
+async def test_cabinet_viewer_sees_only_bound_cabinets(
+    faker: Faker,
+    db_session: AsyncSession,
+    authenticated_user: dbm.User,
+    all_fakes,
+    cabinets: Sequence[dbm.Cabinet],
+    collections: Sequence[dbm.Collection],
+    context,
+):
+    visible_cabinets = faker.random_elements(cabinets, length=3, unique=True)
+    await db_session.execute(
+        sa.insert(dbm.UserCabinetRoleBinding).values(
+            [
+                {
+                    "user_id": authenticated_user.id,
+                    "cabinet_id": c.id,
+                    "role_id": "role/cabinetViewer",
+                }
+                for c in visible_cabinets
+            ]
+        )
+    )
+    query = """query {
+        cabinets(first: 2) { count nodes { id drawers { nodes { cabinet { id } } } } }
+        components(first: 200) { nodes { collections { nodes { drawer { cabinet { id } } } } } }
+    }"""
+    result = await schema.execute(query, context_value=context)
+    assert result.errors is None
+    assert result.data is not None
+
+    visible_ids = {str(c.uuid) for c in visible_cabinets}
+    assert result.data["cabinets"]["count"] == len(visible_cabinets)
+    assert len(result.data["cabinets"]["nodes"]) == 2
+    for cabinet in result.data["cabinets"]["nodes"]:
+        assert cabinet["id"] in visible_ids
+        for drawer in cabinet["drawers"]["nodes"]:
+            assert drawer["cabinet"]["id"] == cabinet["id"]
+
+    collection_cabinet_ids = {
+        collection["drawer"]["cabinet"]["id"]
+        for component in result.data["components"]["nodes"]
+        for collection in component["collections"]["nodes"]
+    }
+    assert len(collection_cabinet_ids) > 0
+    assert collection_cabinet_ids <= visible_ids
+
+
+@pytest.mark.asyncio
+async def test_get_cabinet_requires_permission(
+    faker: Faker,
+    db_session: AsyncSession,
+    authenticated_user: dbm.User,
+    cabinets: Sequence[dbm.Cabinet],
+    context,
+):
+    visible_cabinet, hidden_cabinet = faker.random_elements(cabinets, length=2, unique=True)
+    await db_session.execute(
+        sa.insert(dbm.UserCabinetRoleBinding).values(
+            user_id=authenticated_user.id,
+            cabinet_id=visible_cabinet.id,
+            role_id="role/cabinetViewer",
+        )
+    )
+    query = "query ($id: ID!) { cabinet(id: $id) { id } }"
+    for cabinet, expected in [
+        (visible_cabinet, {"id": str(visible_cabinet.uuid)}),
+        (hidden_cabinet, None),
+    ]:
+        result = await schema.execute(
+            query, context_value=context, variable_values={"id": str(cabinet.uuid)}
+        )
+        assert result.errors is None
+        assert result.data == {"cabinet": expected}
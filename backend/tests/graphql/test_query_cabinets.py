@@ -1,18 +1,32 @@
 import uuid
 
 import pytest
+import pytest_asyncio
+import sqlalchemy as sa
 from faker import Faker
 
+from componentsdb.db import models as dbm
 from componentsdb.graphql import schema
 
 from ..asserts import expected_sql_query_count, expected_sql_query_maximum_count
 
 
+@pytest_asyncio.fixture(autouse=True)
+async def cabinet_viewer(db_session, authenticated_user):
+    # Allow the authenticated user to read all cabinets. Their permissions are resolved by one
+    # further query in each request.
+    await db_session.execute(
+        sa.insert(dbm.UserGlobalRoleBinding).values(
+            user_id=authenticated_user.id, role_id="role/cabinetViewer"
+        )
+    )
+
+
 @pytest.mark.asyncio
 async def test_basic_list(db_session, cabinets, context):
     cabinets = sorted(cabinets, key=lambda c: c.id)
     query = "query { cabinets { nodes { id } edges { cursor node { id } } } }"
-    with expected_sql_query_count(db_session, 2):
+    with expected_sql_query_count(db_session, 3):
         result = await schema.execute(query, context_value=context)
         assert result.errors is None
     nodes = result.data["cabinets"]["nodes"]
@@ -29,7 +43,7 @@ async def test_basic_list(db_session, cabinets, context):
 @pytest.mark.asyncio
 async def test_count(db_session, cabinets, context):
     query = "query { cabinets { count } }"
-    with expected_sql_query_count(db_session, 1):
+    with expected_sql_query_count(db_session, 2):
         result = await schema.execute(query, context_value=context)
         assert result.errors is None
     assert len(cabinets) == result.data["cabinets"]["count"]
@@ -49,7 +63,7 @@ async def test_pagination(db_session, cabinets, context):
     """
     actual_ids = set()
     for _ in range(200):
-        with expected_sql_query_maximum_count(db_session, 2):
+        with expected_sql_query_maximum_count(db_session, 3):
             result = await schema.execute(
                 query, context_value=context, variable_values={"after": after, "first": first}
             )
@@ -145,7 +159,7 @@ async def test_paginated_drawers_query(db_session, cabinets, drawers, context, f
 async def test_basic_get(db_session, cabinets, context):
     cabinet = cabinets[len(cabinets) >> 1]
     query = "query ($id: ID!) { cabinet(id: $id) { id name } }"
-    with expected_sql_query_count(db_session, 1):
+    with expected_sql_query_count(db_session, 2):
         result = await schema.execute(
             query, context_value=context, variable_values={"id": str(cabinet.uuid)}
         )
@@ -185,7 +199,7 @@ async def test_single_cabinet_paginated_drawers_query(db_session, cabinets, draw
     """
     actual_ids = set()
     for _ in range(200):
-        with expected_sql_query_maximum_count(db_session, 3):
+        with expected_sql_query_maximum_count(db_session, 4):
             result = await schema.execute(
                 query,
                 context_value=context,
@@ -219,7 +233,7 @@ async def test_single_cabinet_drawer_count(db_session, cabinets, drawers, contex
             }
         }
     """
-    with expected_sql_query_maximum_count(db_session, 2):
+    with expected_sql_query_maximum_count(db_session, 3):
         result = await schema.execute(
             query, context_value=context, variable_values={"id": str(cabinet.uuid)}
         )
@@ -245,7 +259,7 @@ async def test_single_cabinet_no_drawers(db_session, cabinets, context):
             }
         }
     """
-    with expected_sql_query_maximum_count(db_session, 4):
+    with expected_sql_query_maximum_count(db_session, 5):
         result = await schema.execute(
             query, context_value=context, variable_values={"id": str(cabinet.uuid)}
         )
@@ -275,7 +289,7 @@ async def test_cabinet_drawers_backref(db_session, cabinets, drawers, context):
         }
     }
     """
-    with expected_sql_query_maximum_count(db_session, 5):
+    with expected_sql_query_maximum_count(db_session, 6):
         result = await schema.execute(query, context_value=context)
         assert result.errors is None
         assert result.data is not None
@@ -1,4 +1,5 @@
 import pytest
+import pytest_asyncio
 import sqlalchemy as sa
 import sqlalchemy.orm as saorm
 
@@ -34,11 +35,12 @@ async def test_basic_roles_list(db_session, context):
     assert expected_role_ids == set(r["id"] for r in result.data["rbac"]["roles"]["nodes"])
 
 
-@pytest.mark.skip(reason="not yet implemented")
 @pytest.mark.asyncio
 async def test_role_permissions_list(db_session, context):
     query = "query { rbac { roles { nodes { id permissions { nodes { id } } } } } }"
-    with expected_sql_query_maximum_count(db_session, 2):
+    # One statement for the page of roles, one for their page info and one for the permissions of
+    # all roles.
+    with expected_sql_query_maximum_count(db_session, 3):
         result = await schema.execute(query, context_value=context)
         assert result.errors is None
 
@@ -61,3 +63,56 @@ async def test_role_permissions_list(db_session, context):
     for r in result.data["rbac"]["roles"]["nodes"]:
         expected_permission_ids = {p.id for p in all_roles_by_id[r["id"]].permissions}
         assert expected_permission_ids == {p["id"] for p in r["permissions"]["nodes"]}
+
+
+@pytest_asyncio.fixture
+async def role_with_many_permissions(faker, db_session):
+    permissions = [dbm.Permission(id=f"test.{faker.unique.word()}") for _ in range(7)]
+    role = dbm.Role(id="role/test", permissions=permissions)
+    db_session.add(role)
+    await db_session.flush()
+    return role
+
+
+@pytest.mark.asyncio
+async def test_paginated_role_permissions(db_session, context, role_with_many_permissions):
+    query = """
+        query ($after: String, $first: Int) {
+            rbac {
+                roles {
+                    nodes {
+                        id
+                        permissions(after: $after, first: $first) {
+                            count
+                            nodes { id }
+                            pageInfo { endCursor hasNextPage hasPreviousPage }
+                        }
+                    }
+                }
+            }
+        }
+    """
+    after, first = None, 3
+    pages = []
+    for _ in range(10):
+        with expected_sql_query_maximum_count(db_session, 4):
+            result = await schema.execute(
+                query, context_value=context, variable_values={"after": after, "first": first}
+            )
+            assert result.errors is None
+        (connection,) = [
+            r["permissions"]
+            for r in result.data["rbac"]["roles"]["nodes"]
+            if r["id"] == role_with_many_permissions.id
+        ]
+        assert connection["count"] == len(role_with_many_permissions.permissions)
+        assert connection["pageInfo"]["hasPreviousPage"] == (after is not None)
+        pages.append([n["id"] for n in connection["nodes"]])
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        after = connection["pageInfo"]["endCursor"]
+    else:
+        assert False, "Infinite pagination loop?"
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert sum(pages, []) == sorted(p.id for p in role_with_many_permissions.permissions)
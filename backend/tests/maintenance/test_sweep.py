@@ -0,0 +1,258 @@
+import asyncio
+import datetime
+import secrets
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from componentsdb import auth, maintenance
+from componentsdb.db import fakes as f
+from componentsdb.db import models as m
+
+
+def _now():
+    return datetime.datetime.now(datetime.UTC)
+
+
+@pytest_asyncio.fixture
+async def swept_rows(faker: Faker, db_engine: AsyncEngine):
+    "Create a mix of expired and unexpired rows, returning the tokens which should be swept."
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with session_maker.begin() as session:
+        user = f.fake_user(faker)
+        session.add(user)
+        expired_access_tokens = [
+            m.AccessToken(
+                token=secrets.token_urlsafe(),
+                user=user,
+                expires_at=_now() - datetime.timedelta(hours=1),
+            )
+            for _ in range(25)
+        ]
+        live_access_tokens = [
+            m.AccessToken(
+                token=secrets.token_urlsafe(),
+                user=user,
+                expires_at=_now() + datetime.timedelta(hours=1),
+            )
+            for _ in range(5)
+        ]
+        expired_refresh_tokens = [
+            m.RefreshToken(
+                token=secrets.token_urlsafe(),
+                user=user,
+                expires_at=_now() - datetime.timedelta(hours=1),
+            )
+            for _ in range(10)
+        ]
+        used_refresh_tokens = [
+            m.RefreshToken(
+                token=secrets.token_urlsafe(),
+                user=user,
+                expires_at=_now() + datetime.timedelta(hours=1),
+                used_at=_now() - datetime.timedelta(minutes=1),
+            )
+            for _ in range(10)
+        ]
+        live_refresh_tokens = [
+            m.RefreshToken(
+                token=secrets.token_urlsafe(),
+                user=user,
+                expires_at=_now() + datetime.timedelta(hours=1),
+            )
+            for _ in range(5)
+        ]
+        expired_jtis = [
+            m.FederatedUserCredentialJti(
+                issuer=faker.url(),
+                jti=secrets.token_urlsafe(),
+                expires_at=_now() - datetime.timedelta(hours=1),
+            )
+            for _ in range(3)
+        ]
+        live_jtis = [
+            m.FederatedUserCredentialJti(
+                issuer=faker.url(),
+                jti=secrets.token_urlsafe(),
+                expires_at=_now() + datetime.timedelta(hours=1),
+            )
+            for _ in range(2)
+        ]
+        # Credentials without an "exp" claim never expire.
+        live_jtis.append(
+            m.FederatedUserCredentialJti(
+                issuer=faker.url(), jti=secrets.token_urlsafe(), expires_at=None
+            )
+        )
+        session.add_all(expired_access_tokens + live_access_tokens)
+        session.add_all(expired_jtis + live_jtis)
+        session.add_all(expired_refresh_tokens + used_refresh_tokens + live_refresh_tokens)
+    return {
+        "access_tokens": {t.token for t in live_access_tokens},
+        "refresh_tokens": {t.token for t in live_refresh_tokens},
+        "jtis": {t.jti for t in live_jtis},
+    }
+
+
+async def _remaining_tokens(db_engine: AsyncEngine, model):
+    async with db_engine.connect() as conn:
+        return set((await conn.execute(sa.select(model.token))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_sweep(db_engine: AsyncEngine, swept_rows):
+    result = await maintenance.sweep(db_engine, retention=datetime.timedelta(0), batch_size=7)
+    assert result.rows_removed["access_tokens"] == 25
+    assert result.rows_removed["refresh_tokens"] == 20
+    assert result.rows_removed["federated_user_credential_jtis"] == 3
+    assert result.total_rows_removed == 48
+
+    assert await _remaining_tokens(db_engine, m.AccessToken) == swept_rows["access_tokens"]
+    assert await _remaining_tokens(db_engine, m.RefreshToken) == swept_rows["refresh_tokens"]
+    async with db_engine.connect() as conn:
+        remaining_jtis = set(
+            (await conn.execute(sa.select(m.FederatedUserCredentialJti.jti))).scalars()
+        )
+    assert remaining_jtis == swept_rows["jtis"]
+
+
+@pytest.mark.asyncio
+async def test_sweep_respects_retention(db_engine: AsyncEngine, swept_rows):
+    result = await maintenance.sweep(db_engine, retention=datetime.timedelta(days=365))
+    assert result.total_rows_removed == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_drops_old_federated_credential_use_partitions(db_engine: AsyncEngine):
+    old_date = (_now() - datetime.timedelta(days=3)).date()
+    await maintenance.create_credential_use_partitions(db_engine, start=old_date)
+
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with session_maker.begin() as session:
+        session.add_all(
+            [
+                m.FederatedUserCredentialUse(
+                    claims={}, created_at=_now() - datetime.timedelta(days=3)
+                ),
+                m.FederatedUserCredentialUse(claims={}),
+            ]
+        )
+
+    result = await maintenance.sweep(db_engine, retention=datetime.timedelta(days=1))
+    assert f"federated_user_credential_uses_p{old_date:%Y%m%d}" in result.partitions_dropped
+    assert len(result.partitions_dropped) == 2
+
+    async with db_engine.connect() as conn:
+        remaining = (
+            await conn.execute(sa.select(sa.func.count(m.FederatedUserCredentialUse.id)))
+        ).scalar_one()
+    assert remaining == 1
+
+
+@pytest.mark.asyncio
+async def test_create_credential_use_partitions_is_idempotent(db_engine: AsyncEngine):
+    await maintenance.create_credential_use_partitions(db_engine)
+    assert await maintenance.create_credential_use_partitions(db_engine) == 0
+    assert (
+        await maintenance.create_credential_use_partitions(
+            db_engine, ahead=datetime.timedelta(days=30)
+        )
+        > 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_credential_without_exp_cannot_be_replayed_after_sweep(
+    faker: Faker,
+    db_engine: AsyncEngine,
+    federated_identity_providers: dict[str, auth.FederatedIdentityProvider],
+    federated_identity_provider_name: str,
+    make_oidc_token,
+    oidc_claims,
+):
+    # A credential issued long ago which never expires.
+    issued_at = _now() - datetime.timedelta(days=30)
+    assert "exp" not in oidc_claims
+    token = make_oidc_token({**oidc_claims, "iat": int(issued_at.timestamp())})
+
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with session_maker.begin() as session:
+        user = f.fake_user(faker)
+        credential = f.fake_federated_user_credential(faker, user)
+        credential.audience = oidc_claims["aud"]
+        credential.issuer = oidc_claims["iss"]
+        credential.subject = oidc_claims["sub"]
+        session.add(credential)
+    async with session_maker.begin() as session:
+        await auth.AuthenticationProvider(
+            db_session=session, federated_identity_providers=federated_identity_providers
+        ).user_credentials_from_federated_credential(federated_identity_provider_name, token)
+
+    await maintenance.sweep(db_engine, retention=datetime.timedelta(0))
+
+    async with session_maker.begin() as session:
+        with pytest.raises(auth.InvalidFederatedCredential):
+            await auth.AuthenticationProvider(
+                db_session=session, federated_identity_providers=federated_identity_providers
+            ).user_credentials_from_federated_credential(federated_identity_provider_name, token)
+
+
+async def _count_credential_uses(db_engine: AsyncEngine, table_name: str) -> int:
+    async with db_engine.connect() as conn:
+        return (await conn.execute(sa.text(f"SELECT count(*) FROM {table_name}"))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_create_credential_use_partitions_concurrently(db_engine: AsyncEngine):
+    ahead = datetime.timedelta(days=30)
+    created = await asyncio.gather(
+        *[maintenance.create_credential_use_partitions(db_engine, ahead=ahead) for _ in range(4)]
+    )
+    assert sum(created) > 0
+    assert await maintenance.create_credential_use_partitions(db_engine, ahead=ahead) == 0
+
+
+@pytest.mark.asyncio
+async def test_uses_without_partition_written_to_default_partition(db_engine: AsyncEngine):
+    future_date = (_now() + datetime.timedelta(days=60)).date()
+    partition_name = f"federated_user_credential_uses_p{future_date:%Y%m%d}"
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with session_maker.begin() as session:
+        session.add(
+            m.FederatedUserCredentialUse(
+                claims={}, created_at=_now() + datetime.timedelta(days=60)
+            )
+        )
+    assert await _count_credential_uses(db_engine, "federated_user_credential_uses_default") == 1
+
+    # Creating the partition for the day moves the use out of the default partition.
+    await maintenance.create_credential_use_partitions(
+        db_engine, ahead=datetime.timedelta(days=61)
+    )
+    assert await _count_credential_uses(db_engine, "federated_user_credential_uses_default") == 0
+    assert await _count_credential_uses(db_engine, partition_name) == 1
+
+
+@pytest.mark.asyncio
+async def test_sweep_removes_old_uses_from_default_partition(db_engine: AsyncEngine):
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with session_maker.begin() as session:
+        session.add_all(
+            [
+                m.FederatedUserCredentialUse(
+                    claims={}, created_at=_now() - datetime.timedelta(days=30)
+                ),
+                m.FederatedUserCredentialUse(claims={}),
+            ]
+        )
+
+    result = await maintenance.sweep(db_engine, retention=datetime.timedelta(days=1))
+    assert result.rows_removed["federated_user_credential_uses_default"] == 1
+    async with db_engine.connect() as conn:
+        remaining = (
+            await conn.execute(sa.select(sa.func.count(m.FederatedUserCredentialUse.id)))
+        ).scalar_one()
+    assert remaining == 1
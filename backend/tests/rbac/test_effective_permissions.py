@@ -0,0 +1,177 @@
+import asyncio
+from collections.abc import Sequence
+
+import pytest
+import sqlalchemy as sa
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from componentsdb import auth, rbac
+from componentsdb.db import models as dbm
+from componentsdb.graphql import make_context
+from componentsdb.graphql.context import get_permissions
+
+from ..asserts import expected_sql_query_count
+
+
+@pytest.mark.asyncio
+async def test_no_bindings(db_session: AsyncSession, user: dbm.User):
+    permissions = await rbac.effective_permissions(db_session, user)
+    assert permissions == rbac.NO_PERMISSIONS
+    assert not permissions.has_permission("cabinet.read")
+
+
+@pytest.mark.asyncio
+async def test_unauthenticated_user_makes_no_query(db_session: AsyncSession):
+    with expected_sql_query_count(db_session, 0):
+        assert await rbac.effective_permissions(db_session, None) is rbac.NO_PERMISSIONS
+
+
+@pytest.mark.asyncio
+async def test_all_bindings_resolved_in_one_query(
+    faker: Faker,
+    db_session: AsyncSession,
+    user: dbm.User,
+    cabinets: Sequence[dbm.Cabinet],
+):
+    owned_cabinet, viewed_cabinet, other_cabinet = faker.random_elements(
+        cabinets, length=3, unique=True
+    )
+    target = faker.uri()
+    await db_session.execute(
+        sa.insert(dbm.UserCabinetRoleBinding).values(
+            [
+                {
+                    "user_id": user.id,
+                    "cabinet_id": owned_cabinet.id,
+                    "role_id": "role/cabinetOwner",
+                },
+                {
+                    "user_id": user.id,
+                    "cabinet_id": viewed_cabinet.id,
+                    "role_id": "role/cabinetViewer",
+                },
+            ]
+        )
+    )
+    await db_session.execute(
+        sa.insert(dbm.UserRoleBinding).values(
+            user_id=user.id, role_id="role/cabinetOwner", target=target
+        )
+    )
+
+    with expected_sql_query_count(db_session, 1):
+        permissions = await rbac.effective_permissions(db_session, user)
+
+    assert permissions.has_permission("cabinet.write", owned_cabinet)
+    assert permissions.has_permission("cabinet.read", owned_cabinet.id)
+    assert permissions.has_permission("cabinet.read", viewed_cabinet)
+    assert not permissions.has_permission("cabinet.write", viewed_cabinet)
+    assert not permissions.has_permission("cabinet.read", other_cabinet)
+    assert not permissions.has_permission("cabinet.read")
+    assert permissions.has_target_permission("cabinet.write", target)
+    assert not permissions.has_target_permission("cabinet.read", faker.uri())
+
+
+@pytest.mark.asyncio
+async def test_global_bindings_apply_everywhere(
+    faker: Faker,
+    db_session: AsyncSession,
+    user: dbm.User,
+    cabinets: Sequence[dbm.Cabinet],
+):
+    await db_session.execute(
+        sa.insert(dbm.UserGlobalRoleBinding).values(user_id=user.id, role_id="role/cabinetViewer")
+    )
+
+    permissions = await rbac.effective_permissions(db_session, user)
+    assert permissions.global_permissions == {"cabinet.read"}
+    assert permissions.has_permission("cabinet.read")
+    assert permissions.has_permission("cabinet.read", faker.random_element(cabinets))
+    assert permissions.has_target_permission("cabinet.read", faker.uri())
+    assert not permissions.has_permission("cabinet.write")
+
+
+@pytest.mark.asyncio
+async def test_permissions_memoized_per_request(
+    db_session: AsyncSession,
+    user: dbm.User,
+    authentication_provider: auth.AuthenticationProvider,
+):
+    await db_session.execute(
+        sa.insert(dbm.UserGlobalRoleBinding).values(user_id=user.id, role_id="role/cabinetOwner")
+    )
+    context = make_context(
+        db_session=db_session,
+        authentication_provider=authentication_provider,
+        authenticated_user=user,
+    )
+
+    with expected_sql_query_count(db_session, 1):
+        results = await asyncio.gather(*(get_permissions(context) for _ in range(5)))
+        results.append(await get_permissions(context))
+
+    assert all(r is results[0] for r in results)
+    assert results[0].has_permission("cabinet.write")
+
+
+@pytest.mark.asyncio
+async def test_unauthenticated_request_has_no_permissions(
+    db_session: AsyncSession, authentication_provider: auth.AuthenticationProvider
+):
+    context = make_context(db_session=db_session, authentication_provider=authentication_provider)
+    with expected_sql_query_count(db_session, 0):
+        assert await get_permissions(context) is rbac.NO_PERMISSIONS
+
+
+@pytest.mark.asyncio
+async def test_role_permission_changes_propagate(
+    faker: Faker,
+    db_session: AsyncSession,
+    user: dbm.User,
+    cabinets: Sequence[dbm.Cabinet],
+):
+    cabinet = faker.random_element(cabinets)
+    await db_session.execute(
+        sa.insert(dbm.UserCabinetRoleBinding).values(
+            user_id=user.id, cabinet_id=cabinet.id, role_id="role/cabinetViewer"
+        )
+    )
+    assert not (await rbac.effective_permissions(db_session, user)).has_permission(
+        "cabinet.write", cabinet
+    )
+
+    await db_session.execute(
+        sa.insert(dbm.RolePermissionBinding).values(
+            role_id="role/cabinetViewer", permission_id="cabinet.write"
+        )
+    )
+    assert (await rbac.effective_permissions(db_session, user)).has_permission(
+        "cabinet.write", cabinet
+    )
+
+    await db_session.execute(
+        sa.delete(dbm.UserCabinetRoleBinding).where(dbm.UserCabinetRoleBinding.user_id == user.id)
+    )
+    assert await rbac.effective_permissions(db_session, user) == rbac.NO_PERMISSIONS
+
+
+@pytest.mark.asyncio
+async def test_rebuild_effective_permissions(
+    db_session: AsyncSession,
+    users: Sequence[dbm.User],
+):
+    await db_session.execute(
+        sa.insert(dbm.UserGlobalRoleBinding).values(
+            [{"user_id": u.id, "role_id": "role/cabinetOwner"} for u in users]
+        )
+    )
+    expected = {u.id: await rbac.effective_permissions(db_session, u) for u in users}
+
+    # Simulate the table having been modified directly.
+    await db_session.execute(sa.delete(dbm.UserEffectivePermission))
+    assert await rbac.effective_permissions(db_session, users[0]) == rbac.NO_PERMISSIONS
+
+    assert await rbac.rebuild_effective_permissions(db_session) == 2 * len(users)
+    for u in users:
+        assert await rbac.effective_permissions(db_session, u) == expected[u.id]
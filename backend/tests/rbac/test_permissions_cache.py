@@ -0,0 +1,103 @@
+from collections.abc import Sequence
+
+import pytest
+import sqlalchemy as sa
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from componentsdb import auth, rbac
+from componentsdb.db import models as dbm
+from componentsdb.graphql import make_context
+from componentsdb.graphql.context import get_permissions
+
+from ..asserts import expected_sql_query_count
+
+PERMISSIONS = rbac.EffectivePermissions(global_permissions=frozenset({"cabinet.read"}))
+
+
+@pytest.fixture
+def cache() -> rbac.EffectivePermissionsCache:
+    cache = rbac.EffectivePermissionsCache(max_size=2)
+    cache.enabled = True
+    return cache
+
+
+def test_disabled_cache_stores_nothing():
+    cache = rbac.EffectivePermissionsCache()
+    cache.put(1, PERMISSIONS, cache.epoch)
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_get_and_put(cache: rbac.EffectivePermissionsCache):
+    assert cache.get(1) is None
+    cache.put(1, PERMISSIONS, cache.epoch)
+    assert cache.get(1) is PERMISSIONS
+    assert cache.metrics.hits == 1
+    assert cache.metrics.misses == 1
+
+    # Disabling the cache stops cached permissions being served.
+    cache.enabled = False
+    assert cache.get(1) is None
+
+
+def test_least_recently_used_evicted(cache: rbac.EffectivePermissionsCache):
+    for user_id in (1, 2):
+        cache.put(user_id, PERMISSIONS, cache.epoch)
+    cache.get(1)
+    cache.put(3, PERMISSIONS, cache.epoch)
+    assert cache.get(2) is None
+    assert cache.get(1) is PERMISSIONS
+    assert cache.metrics.evictions == 1
+
+
+def test_invalidate(cache: rbac.EffectivePermissionsCache):
+    for user_id in (1, 2):
+        cache.put(user_id, PERMISSIONS, cache.epoch)
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.get(2) is PERMISSIONS
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.metrics.invalidations == 2
+
+
+def test_permissions_resolved_before_invalidation_not_cached(
+    cache: rbac.EffectivePermissionsCache,
+):
+    epoch = cache.epoch
+    cache.invalidate(1)
+    cache.put(1, PERMISSIONS, epoch)
+    assert cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_requests_share_cached_permissions(
+    faker: Faker,
+    db_session: AsyncSession,
+    users: Sequence[dbm.User],
+    authentication_provider: auth.AuthenticationProvider,
+    cache: rbac.EffectivePermissionsCache,
+):
+    user = faker.random_element(users)
+    await db_session.execute(
+        sa.insert(dbm.UserGlobalRoleBinding).values(user_id=user.id, role_id="role/cabinetViewer")
+    )
+
+    def _make_context():
+        return make_context(
+            db_session=db_session,
+            authentication_provider=authentication_provider,
+            authenticated_user=user,
+            permissions_cache=cache,
+        )
+
+    with expected_sql_query_count(db_session, 1):
+        permissions = await get_permissions(_make_context())
+    with expected_sql_query_count(db_session, 0):
+        assert await get_permissions(_make_context()) is permissions
+    assert permissions.has_permission("cabinet.read")
+
+    cache.invalidate(user.id)
+    with expected_sql_query_count(db_session, 1):
+        await get_permissions(_make_context())
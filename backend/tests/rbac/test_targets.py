@@ -0,0 +1,123 @@
+import uuid
+from collections.abc import Sequence
+
+import pytest
+import sqlalchemy as sa
+from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from componentsdb import rbac
+from componentsdb.db import models as dbm
+
+from ..asserts import expected_sql_query_count
+
+
+def test_make_target():
+    cabinet_uuid, drawer_uuid = uuid.uuid4(), uuid.uuid4()
+    assert (
+        rbac.make_target("cabinet", cabinet_uuid, "drawer", drawer_uuid)
+        == f"cabinet/{cabinet_uuid}/drawer/{drawer_uuid}"
+    )
+
+
+@pytest.mark.parametrize("elements", [(), ("cabinet", ""), ("cabinet/1",)])
+def test_make_target_invalid(elements):
+    with pytest.raises(ValueError):
+        rbac.make_target(*elements)
+
+
+def test_target_ancestors():
+    assert rbac.target_ancestors("cabinet/1/drawer/2") == [
+        "cabinet",
+        "cabinet/1",
+        "cabinet/1/drawer",
+        "cabinet/1/drawer/2",
+    ]
+    assert rbac.target_ancestors("cabinet") == ["cabinet"]
+
+
+def test_ancestor_binding_covers_descendants():
+    permissions = rbac.EffectivePermissions(
+        target_permissions={"cabinet/1": frozenset({"cabinet.read"})}
+    )
+    assert permissions.has_target_permission("cabinet.read", "cabinet/1")
+    assert permissions.has_target_permission("cabinet.read", "cabinet/1/drawer/2")
+    assert not permissions.has_target_permission("cabinet.read", "cabinet")
+    assert not permissions.has_target_permission("cabinet.read", "cabinet/10/drawer/2")
+
+
+@pytest.mark.asyncio
+async def test_permitted_targets(db_session: AsyncSession, user: dbm.User):
+    cabinet_uuid, other_cabinet_uuid = uuid.uuid4(), uuid.uuid4()
+    cabinet_target = rbac.make_target("cabinet", cabinet_uuid)
+    other_cabinet_target = rbac.make_target("cabinet", other_cabinet_uuid)
+    await db_session.execute(
+        sa.insert(dbm.UserRoleBinding).values(
+            user_id=user.id, role_id="role/cabinetViewer", target=cabinet_target
+        )
+    )
+    drawer_targets = [
+        rbac.make_target("cabinet", cabinet_uuid, "drawer", uuid.uuid4()) for _ in range(10)
+    ]
+    other_drawer_targets = [
+        rbac.make_target("cabinet", other_cabinet_uuid, "drawer", uuid.uuid4()) for _ in range(10)
+    ]
+
+    with expected_sql_query_count(db_session, 1):
+        permitted = await rbac.permitted_targets(
+            db_session,
+            user,
+            "cabinet.read",
+            drawer_targets + other_drawer_targets + [cabinet_target, other_cabinet_target],
+        )
+    assert permitted == set(drawer_targets) | {cabinet_target}
+
+    assert await rbac.permitted_targets(db_session, user, "cabinet.write", drawer_targets) == set()
+
+
+@pytest.mark.asyncio
+async def test_permitted_targets_global_binding(db_session: AsyncSession, user: dbm.User):
+    await db_session.execute(
+        sa.insert(dbm.UserGlobalRoleBinding).values(user_id=user.id, role_id="role/cabinetViewer")
+    )
+    targets = {rbac.make_target("cabinet", uuid.uuid4()) for _ in range(5)}
+    assert await rbac.permitted_targets(db_session, user, "cabinet.read", targets) == targets
+
+
+@pytest.mark.asyncio
+async def test_cabinet_binding_covers_cabinet_targets(
+    faker: Faker, db_session: AsyncSession, user: dbm.User, cabinets: Sequence[dbm.Cabinet]
+):
+    cabinet, other_cabinet = faker.random_elements(cabinets, length=2, unique=True)
+    await db_session.execute(
+        sa.insert(dbm.UserCabinetRoleBinding).values(
+            user_id=user.id, cabinet_id=cabinet.id, role_id="role/cabinetViewer"
+        )
+    )
+    cabinet_target = rbac.make_target("cabinet", cabinet.uuid)
+    drawer_target = rbac.make_target("cabinet", cabinet.uuid, "drawer", uuid.uuid4())
+    other_targets = [
+        rbac.make_target("cabinet", other_cabinet.uuid),
+        rbac.make_target("cabinet", other_cabinet.uuid, "drawer", uuid.uuid4()),
+        rbac.make_target("cabinet", "not-a-uuid"),
+        "cabinet",
+    ]
+
+    permissions = await rbac.effective_permissions(db_session, user)
+    assert permissions.has_target_permission("cabinet.read", cabinet_target)
+    assert permissions.has_target_permission("cabinet.read", drawer_target)
+    assert not permissions.has_target_permission("cabinet.write", drawer_target)
+    for target in other_targets:
+        assert not permissions.has_target_permission("cabinet.read", target)
+
+    with expected_sql_query_count(db_session, 1):
+        permitted = await rbac.permitted_targets(
+            db_session, user, "cabinet.read", [cabinet_target, drawer_target] + other_targets
+        )
+    assert permitted == {cabinet_target, drawer_target}
+
+
+@pytest.mark.asyncio
+async def test_permitted_targets_no_query_needed(db_session: AsyncSession):
+    with expected_sql_query_count(db_session, 0):
+        assert await rbac.permitted_targets(db_session, None, "cabinet.read", ["cabinet"]) == set()
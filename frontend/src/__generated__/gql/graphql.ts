@@ -28,6 +28,7 @@ export enum AuthErrorType {
   InvalidCredential = 'INVALID_CREDENTIAL',
   InvalidFederatedCredential = 'INVALID_FEDERATED_CREDENTIAL',
   NoSuchFederatedIdentityProvider = 'NO_SUCH_FEDERATED_IDENTITY_PROVIDER',
+  NotAuthenticated = 'NOT_AUTHENTICATED',
   UserAlreadySignedUp = 'USER_ALREADY_SIGNED_UP',
   UserNotSignedUp = 'USER_NOT_SIGNED_UP'
 }
@@ -36,6 +37,7 @@ export type AuthMutations = {
   __typename?: 'AuthMutations';
   credentialsFromFederatedCredential: AuthCredentialsResponse;
   refreshCredentials: AuthCredentialsResponse;
+  revokeCredentials: RevokeCredentialsResponse;
 };
 
 
@@ -186,12 +188,32 @@ export type PageInfo = {
   startCursor?: Maybe<Scalars['String']['output']>;
 };
 
+export type Permission = {
+  __typename?: 'Permission';
+  id: Scalars['ID']['output'];
+};
+
+export type PermissionConnection = {
+  __typename?: 'PermissionConnection';
+  count: Scalars['Int']['output'];
+  edges: Array<PermissionEdge>;
+  nodes: Array<Permission>;
+  pageInfo: PageInfo;
+};
+
+export type PermissionEdge = {
+  __typename?: 'PermissionEdge';
+  cursor: Scalars['String']['output'];
+  node: Permission;
+};
+
 export type Query = {
   __typename?: 'Query';
   auth: AuthQueries;
   cabinet?: Maybe<Cabinet>;
   cabinets: CabinetConnection;
   components: ComponentConnection;
+  rbac: RbacQueries;
 };
 
 
@@ -212,10 +234,61 @@ export type QueryComponentsArgs = {
   search?: InputMaybe<Scalars['String']['input']>;
 };
 
+export type RbacQueries = {
+  __typename?: 'RBACQueries';
+  permissions: PermissionConnection;
+  roles: RoleConnection;
+};
+
+
+export type RbacQueriesPermissionsArgs = {
+  after?: InputMaybe<Scalars['String']['input']>;
+  first?: InputMaybe<Scalars['Int']['input']>;
+};
+
+
+export type RbacQueriesRolesArgs = {
+  after?: InputMaybe<Scalars['String']['input']>;
+  first?: InputMaybe<Scalars['Int']['input']>;
+};
+
 export type RefreshCredentialsInput = {
   refreshToken: Scalars['String']['input'];
 };
 
+export type RevokeCredentialsResponse = AuthError | RevokedCredentials;
+
+export type RevokedCredentials = {
+  __typename?: 'RevokedCredentials';
+  revokedTokenCount: Scalars['Int']['output'];
+};
+
+export type Role = {
+  __typename?: 'Role';
+  id: Scalars['ID']['output'];
+  permissions: PermissionConnection;
+};
+
+
+export type RolePermissionsArgs = {
+  after?: InputMaybe<Scalars['String']['input']>;
+  first?: InputMaybe<Scalars['Int']['input']>;
+};
+
+export type RoleConnection = {
+  __typename?: 'RoleConnection';
+  count: Scalars['Int']['output'];
+  edges: Array<RoleEdge>;
+  nodes: Array<Role>;
+  pageInfo: PageInfo;
+};
+
+export type RoleEdge = {
+  __typename?: 'RoleEdge';
+  cursor: Scalars['String']['output'];
+  node: Role;
+};
+
 export type User = {
   __typename?: 'User';
   avatarUrl?: Maybe<Scalars['String']['output']>;